@@ -70,10 +70,11 @@ const AnalysisContent = () => {
         uniqueIPs.add(log.ip);
       }
 
-      let attackType = "Unknown";
+      // Structured events carry the category of the rule that fired on the server
+      let attackType = log.attackType || "Unknown";
       
-      // Ensure logString is a string before using regex
-      if (typeof logString === 'string') {
+      // Older text logs: re-derive the category from the message
+      if (!log.attackType && typeof logString === 'string') {
         // Check for SQL injection patterns
         if (/union\s+select|union\s*all\s*select|union\+\s*select/i.test(logString)) attackType = "Union-Based SQLi";
         else if (/error\s+in\s+your\s+sql|updatexml|extractvalue|mysql_error|pg_error|ORA-|database\s+error/i.test(logString)) attackType = "Error-Based SQLi";
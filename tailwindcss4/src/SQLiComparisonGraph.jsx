@@ -15,51 +15,45 @@ const SQLiComparisonGraph = () => {
     lastUpdate: "--:--:--"
   });
   
-  // Get websocket context
-  const { logs, socketStatus } = useWebSocket();
+  // Get websocket context; per-minute and per-hour counts by level come from the server's aggregates
+  const { socketStatus, aggregates } = useWebSocket();
   
   useEffect(() => {
-    // Process logs when they change
-    if (logs && logs.length > 0) {
-      // Extract the most recent 50 logs
-      const recentLogs = logs.slice(0, 50);
-      
-      // Extract timestamps
-      const newTimestamps = recentLogs.map(log => log.time || "");
-      
-      // Count SQLi attempts and failed logins
-      let sqliCount = 0;
-      let failedLoginCount = 0;
-      const newSqliAttempts = [];
-      const newFailedLogins = [];
-      
-      recentLogs.forEach(log => {
-        const status = log.status ? log.status.toLowerCase() : "";
-        
-        if (status.includes("sqli") || status.includes("sql injection")) {
-          sqliCount++;
-        } else if (status.includes("failed login")) {
-          failedLoginCount++;
-        }
-        
-        newSqliAttempts.push(sqliCount);
-        newFailedLogins.push(failedLoginCount);
-      });
-      
-      // Update state
-      setTimestamps(newTimestamps.reverse()); // Reverse to show oldest to newest
-      setSqliAttempts(newSqliAttempts.reverse());
-      setFailedLogins(newFailedLogins.reverse());
-      
-      // Update stats
-      setStats({
-        totalSQLi: sqliCount,
-        totalFailedLogins: failedLoginCount,
-        ratio: sqliCount > 0 ? (failedLoginCount / sqliCount).toFixed(2) : 0,
-        lastUpdate: new Date().toLocaleTimeString()
-      });
-    }
-  }, [logs]);
+    if (!aggregates) return;
+
+    // Real-time: the last hour by minute; historical: every hour the server keeps
+    const buckets = dataSource === "historical"
+      ? aggregates.hour
+      : aggregates.minute.filter(bucket => bucket.time >= Date.now() / 1000 - 60 * 60);
+    const active = buckets.filter(bucket => bucket.counts["SQLI ATTEMPT"] || bucket.counts["FAILED LOGIN"]);
+
+    // Running totals over the window, oldest to newest
+    let sqliCount = 0;
+    let failedLoginCount = 0;
+    const newSqliAttempts = [];
+    const newFailedLogins = [];
+    active.forEach(bucket => {
+      sqliCount += bucket.counts["SQLI ATTEMPT"] || 0;
+      failedLoginCount += bucket.counts["FAILED LOGIN"] || 0;
+      newSqliAttempts.push(sqliCount);
+      newFailedLogins.push(failedLoginCount);
+    });
+
+    const label = (time) => (dataSource === "historical"
+      ? new Date(time * 1000).toLocaleString([], { month: "short", day: "numeric", hour: "2-digit", minute: "2-digit" })
+      : new Date(time * 1000).toLocaleTimeString());
+    setTimestamps(active.map(bucket => label(bucket.time)));
+    setSqliAttempts(newSqliAttempts);
+    setFailedLogins(newFailedLogins);
+
+    // Update stats
+    setStats({
+      totalSQLi: sqliCount,
+      totalFailedLogins: failedLoginCount,
+      ratio: sqliCount > 0 ? (failedLoginCount / sqliCount).toFixed(2) : 0,
+      lastUpdate: new Date().toLocaleTimeString()
+    });
+  }, [aggregates, dataSource]);
   
   // Generate appropriate plot data based on viewMode
   const getPlotData = () => {
@@ -140,8 +134,6 @@ const SQLiComparisonGraph = () => {
   // Handle data source change
   const handleDataSourceChange = (source) => {
     setDataSource(source);
-    // In a real implementation, you might fetch historical data here
-    // or switch to real-time mode
   };
   
   return (
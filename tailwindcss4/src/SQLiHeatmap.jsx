@@ -1,178 +1,80 @@
-import React, { useState, useEffect, useCallback } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import Plot from "react-plotly.js";
-import { useWebSocket } from "./context/WebSocketContext"; // Import the WebSocket context
+import { useWebSocket, AGGREGATE_TOP_IPS } from "./context/WebSocketContext"; // Import the WebSocket context
 
-const SQLiHeatmap = () => {
-  // Grid size configuration
-  const GRID_ROWS = 10;
-  const GRID_COLS = 10;
+// Grid size configuration
+const GRID_ROWS = 10;
+const GRID_COLS = 10;
 
-  // Initialize a 2D array for attack intensity
-  const createEmptyGrid = () => Array(GRID_ROWS).fill().map(() => Array(GRID_COLS).fill(0));
-  
+// Initialize a 2D array for attack intensity
+const createEmptyGrid = () => Array(GRID_ROWS).fill().map(() => Array(GRID_COLS).fill(0));
+
+// Use a logarithmic-style scale for intensity to prevent outliers from dominating:
+// one step per attack up to 5, then half steps, capped at 20
+const intensity = (count) => (count <= 5 ? count : Math.min(20, 5 + (count - 5) * 0.5));
+
+const SQLiHeatmap = () => {
   const [heatmapData, setHeatmapData] = useState(createEmptyGrid());
   const [totalAttacks, setTotalAttacks] = useState(0);
+  const [sourceCount, setSourceCount] = useState(0);
   const [lastUpdated, setLastUpdated] = useState("--:--:--");
-  const [attackSources, setAttackSources] = useState(new Map());
-  
-  // Get the WebSocket context
-  const { logs, socketStatus, hasNewLogs, setHasNewLogs } = useWebSocket();
 
-  // Generate a position from an IP address with better distribution
-  const getPositionFromIP = useCallback((ip) => {
-    if (!ip) return { row: Math.floor(Math.random() * GRID_ROWS), col: Math.floor(Math.random() * GRID_COLS) };
-    
-    // For a local environment where all IPs might be the same (like 127.0.0.1)
-    // We need to ensure the attacks are distributed across the grid
-    const existingSource = attackSources.get(ip);
-    
-    if (existingSource) {
-      // Increment intensity at the existing position for this IP
-      return existingSource;
-    } else {
-      // Find a cell with the least intensity to place a new source
-      let minIntensity = Number.MAX_VALUE;
-      let position = { row: 0, col: 0 };
-      
-      for (let r = 0; r < GRID_ROWS; r++) {
-        for (let c = 0; c < GRID_COLS; c++) {
-          if (heatmapData[r][c] < minIntensity) {
-            minIntensity = heatmapData[r][c];
-            position = { row: r, col: c };
-          }
-        }
-      }
-      
-      // If many cells have the same minimum, choose one randomly
-      const minCells = [];
-      for (let r = 0; r < GRID_ROWS; r++) {
-        for (let c = 0; c < GRID_COLS; c++) {
-          if (heatmapData[r][c] === minIntensity) {
-            minCells.push({ row: r, col: c });
-          }
-        }
-      }
-      
-      if (minCells.length > 0) {
-        position = minCells[Math.floor(Math.random() * minCells.length)];
-      }
-      
-      // Save this IP's position for future attacks
-      setAttackSources(prev => {
-        const newMap = new Map(prev);
-        newMap.set(ip, position);
-        return newMap;
-      });
-      
-      return position;
-    }
-  }, [heatmapData, attackSources]);
-  
-  // Function to update heatmap based on a log entry
-  const updateHeatmapFromLog = useCallback((log) => {
-    // Only process SQL injection logs
-    const isSQLi = log.status && log.status.toLowerCase().includes("sqli");
-    
-    if (isSQLi) {
-      // Get the source IP (default to a unique identifier if IP is missing)
-      const sourceIP = log.ip || `unknown-${Date.now()}`;
-      
-      // Generate position in the heatmap grid based on IP
-      const { row, col } = getPositionFromIP(sourceIP);
-      
-      // Update attack intensity
-      setHeatmapData(prevGrid => {
-        const newGrid = prevGrid.map(r => [...r]);
-        // Increase intensity, but ensure it scales properly
-        const currentValue = newGrid[row][col];
-        
-        // Use a logarithmic scale for intensity to prevent outliers from dominating
-        // This ensures the visualization remains useful even with many attacks from one source
-        newGrid[row][col] = currentValue < 5 ? currentValue + 1 : Math.min(20, currentValue + 0.5);
-        
-        return newGrid;
-      });
-      
-      setTotalAttacks(prev => prev + 1);
-      setLastUpdated(new Date().toLocaleTimeString());
-    }
-  }, [getPositionFromIP]);
-  
-  // Process logs when they change - real-time updates
-  useEffect(() => {
-    if (hasNewLogs && logs.length > 0) {
-      // Process only the newest log (at index 0)
-      updateHeatmapFromLog(logs[0]);
-      setHasNewLogs(false);
-    }
-  }, [logs, hasNewLogs, setHasNewLogs, updateHeatmapFromLog]);
-  
-  // Initial processing of all existing logs
+  // Each source IP keeps its cell while it stays among the server's top sources
+  const positionsRef = useRef(new Map());
+  // Counts at the last "Reset View", subtracted from the server's totals
+  const baselineRef = useRef({ total: 0, ips: new Map() });
+
+  // Get the WebSocket context; per-IP SQLi counts come from the server's aggregates
+  const { socketStatus, aggregates } = useWebSocket();
+
+  // Lay the server's top attack sources out on the grid
   useEffect(() => {
-    // Clear previous data
-    setHeatmapData(createEmptyGrid());
-    setAttackSources(new Map());
-    
-    // Process existing logs to build initial heatmap
-    let attackCount = 0;
-    const ipPositions = new Map();
+    if (!aggregates) return;
+
+    const baseline = baselineRef.current;
+    const sources = aggregates.top_ips
+      .map(({ ip, count }) => ({ ip, count: count - (baseline.ips.get(ip) || 0) }))
+      .filter(source => source.count > 0);
+
+    // Free the cells of sources that dropped out, then give new sources the first free cell
+    const positions = positionsRef.current;
+    const current = new Set(sources.map(source => source.ip));
+    [...positions.keys()].forEach(ip => { if (!current.has(ip)) positions.delete(ip); });
+    const taken = new Set([...positions.values()].map(({ row, col }) => row * GRID_COLS + col));
+    let free = 0;
+    sources.forEach(({ ip }) => {
+      if (positions.has(ip)) return;
+      while (taken.has(free)) free++;
+      if (free >= GRID_ROWS * GRID_COLS) return;
+      taken.add(free);
+      positions.set(ip, { row: Math.floor(free / GRID_COLS), col: free % GRID_COLS });
+    });
+
     const newGrid = createEmptyGrid();
-    
-    logs.forEach(log => {
-      if (log.status && log.status.toLowerCase().includes("sqli")) {
-        attackCount++;
-        
-        // Get the source IP
-        const sourceIP = log.ip || `unknown-${log.id || attackCount}`;
-        
-        // If this IP already has a position, use it
-        let position;
-        if (ipPositions.has(sourceIP)) {
-          position = ipPositions.get(sourceIP);
-        } else {
-          // Find the cell with minimum intensity for a new IP
-          let minIntensity = Number.MAX_VALUE;
-          let minPositions = [];
-          
-          for (let r = 0; r < GRID_ROWS; r++) {
-            for (let c = 0; c < GRID_COLS; c++) {
-              if (newGrid[r][c] < minIntensity) {
-                minIntensity = newGrid[r][c];
-                minPositions = [{ row: r, col: c }];
-              } else if (newGrid[r][c] === minIntensity) {
-                minPositions.push({ row: r, col: c });
-              }
-            }
-          }
-          
-          // Choose a random position from the cells with minimum intensity
-          position = minPositions[Math.floor(Math.random() * minPositions.length)];
-          ipPositions.set(sourceIP, position);
-        }
-        
-        // Increment intensity with proper scaling
-        const { row, col } = position;
-        const currentValue = newGrid[row][col];
-        newGrid[row][col] = currentValue < 5 ? currentValue + 1 : Math.min(20, currentValue + 0.5);
-      }
+    sources.forEach(({ ip, count }) => {
+      const position = positions.get(ip);
+      if (position) newGrid[position.row][position.col] = intensity(count);
     });
-    
-    if (attackCount > 0) {
-      setHeatmapData(newGrid);
-      setAttackSources(ipPositions);
-      setTotalAttacks(attackCount);
-      setLastUpdated(new Date().toLocaleTimeString());
-    }
-  }, []); // Run once on component mount
-  
-  // Handle reset view
+
+    setHeatmapData(newGrid);
+    setSourceCount(sources.length);
+    setTotalAttacks((aggregates.levels["SQLI ATTEMPT"] || 0) - baseline.total);
+    setLastUpdated(new Date().toLocaleTimeString());
+  }, [aggregates]);
+
+  // Handle reset view: start counting again from the server's current totals
   const handleResetView = () => {
+    baselineRef.current = {
+      total: aggregates ? aggregates.levels["SQLI ATTEMPT"] || 0 : 0,
+      ips: new Map(aggregates ? aggregates.top_ips.map(({ ip, count }) => [ip, count]) : [])
+    };
+    positionsRef.current = new Map();
     setHeatmapData(createEmptyGrid());
-    setAttackSources(new Map());
+    setSourceCount(0);
     setTotalAttacks(0);
     setLastUpdated("--:--:--");
   };
-  
+
   // Calculate max value for proper color scaling
   const maxValue = Math.max(...heatmapData.flat());
   
@@ -187,7 +89,7 @@ const SQLiHeatmap = () => {
           </div>
           <div className="bg-slate-700 px-3 py-1 rounded-md">
             <span className="text-gray-400 text-xs">UNIQUE SOURCES</span>
-            <p className="text-white font-bold">{attackSources.size}</p>
+            <p className="text-white font-bold">{sourceCount >= AGGREGATE_TOP_IPS ? `${AGGREGATE_TOP_IPS}+` : sourceCount}</p>
           </div>
           <div className="bg-slate-700 px-3 py-1 rounded-md">
             <span className="text-gray-400 text-xs">LAST UPDATE</span>
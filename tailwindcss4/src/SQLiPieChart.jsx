@@ -41,7 +41,7 @@ const CustomTooltip = ({ active, payload }) => {
 
 const SQLiPieChart = () => {
   // Get logs directly from the WebSocket context instead of props
-  const { logs } = useWebSocket();
+  const { logs, aggregates } = useWebSocket();
   
   const [sqlData, setSqlData] = useState([
     { name: "Union-Based SQLi", value: 0 },
@@ -57,9 +57,18 @@ const SQLiPieChart = () => {
     { name: "Other SQLi", value: 0 }
   ]);
 
-  // Process logs and update data
+  // Use the server's counters (classified by the rule that fired) once they have loaded
   useEffect(() => {
-    if (!logs || logs.length === 0) return;
+    if (!aggregates) return;
+    const total = Object.values(aggregates.attack_types).reduce((sum, count) => sum + count, 0);
+    setSqlData(Object.entries(aggregates.attack_types)
+      .map(([name, value]) => ({ name, value, total }))
+      .filter(item => item.value > 0));
+  }, [aggregates]);
+
+  // Process logs and update data (until the server's counters arrive)
+  useEffect(() => {
+    if (aggregates || !logs || logs.length === 0) return;
 
     // Initialize counters
     const newCounts = Object.fromEntries(sqlData.map(item => [item.name, 0]));
@@ -75,7 +84,11 @@ const SQLiPieChart = () => {
       const isSQLi = (typeof logString === 'string' && logString.includes("SQL Injection detected!")) || 
                     (log.status && typeof log.status === 'string' && log.status.toLowerCase().includes("sqli attempt"));
                     
-      if (isSQLi) {
+      if (isSQLi && log.attackType) {
+        // Structured events carry the category of the rule that fired on the server
+        newCounts[log.attackType in newCounts ? log.attackType : "Other SQLi"]++;
+        total++;
+      } else if (isSQLi) {
         let matched = false;
         
         // Check against each pattern
@@ -102,7 +115,7 @@ const SQLiPieChart = () => {
       .filter(item => item.value > 0); // Only include non-zero values
     
     setSqlData(newData);
-  }, [logs]);
+  }, [logs, aggregates]);
 
   // Custom rendering of labels
   const renderCustomizedLabel = ({ cx, cy, midAngle, innerRadius, outerRadius, percent, index, name }) => {
@@ -14,7 +14,8 @@ const SQLiTrendGraph = () => {
   const { 
     logs, 
     socketStatus, 
-    hasNewLogs 
+    hasNewLogs,
+    aggregates
   } = useWebSocket();
   
   // Store all received logs
@@ -41,9 +42,22 @@ const SQLiTrendGraph = () => {
     }
   }, [logs, hasNewLogs]);
   
-  // Filter and process logs based on selected timeframe
+  // Per-minute SQLi counts kept by the server, once they have loaded
   useEffect(() => {
-    if (allLogs.length === 0) return;
+    if (!aggregates) return;
+
+    const hours = { "1h": 1, "12h": 12, "24h": 24 }[timeframe] || 1;
+    const since = Date.now() / 1000 - hours * 60 * 60;
+    const buckets = aggregates.minute.filter(bucket => bucket.time >= since && bucket.counts["SQLI ATTEMPT"]);
+
+    let cumulative = 0;
+    setTimestamps(buckets.map(bucket => new Date(bucket.time * 1000).toLocaleTimeString()));
+    setAttackCounts(buckets.map(bucket => (cumulative += bucket.counts["SQLI ATTEMPT"])));
+  }, [aggregates, timeframe]);
+
+  // Filter and process logs based on selected timeframe (until the server's counters arrive)
+  useEffect(() => {
+    if (aggregates || allLogs.length === 0) return;
     
     const currentTime = new Date();
     let timeLimit;
@@ -92,7 +106,7 @@ const SQLiTrendGraph = () => {
     
     setTimestamps(newTimestamps);
     setAttackCounts(newCounts);
-  }, [allLogs, timeframe]);
+  }, [allLogs, timeframe, aggregates]);
   
   // Handle timeframe changes
   const handleTimeframeChange = (newTimeframe) => {
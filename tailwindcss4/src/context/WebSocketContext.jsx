@@ -13,6 +13,9 @@ const SOCKET_OPTIONS = {
   timeout: 20000,
 };
 
+// Source IPs kept in the aggregates, enough for every cell of the SQLiHeatmap grid
+export const AGGREGATE_TOP_IPS = 100;
+
 // Create the context
 const WebSocketContext = createContext(null);
 
@@ -27,6 +30,16 @@ export const useWebSocket = () => {
 
 // Parse incoming log data
 const parseLog = (log) => {
+  // Structured (JSON-lines) events arrive as objects with the fields already split out
+  if (log && typeof log === "object") {
+    const [date, time] = (log.timestamp || "").split(" ");
+    return {
+      date, time, ip: log.ip, status: log.level, remarks: log.message,
+      username: log.username, sessionId: log.session_id, ruleId: log.rule_id,
+      attackType: log.attack_type, detectorMs: log.detector_ms,
+      timestamp: new Date().getTime()
+    };
+  }
   const logPattern = /\[(.*?) (.*?)\] \[IP: (.*?)\] \[(.*?)\] (.*)/;
   const match = log.match(logPattern);
   if (match) {
@@ -37,6 +50,42 @@ const parseLog = (log) => {
   return null;
 };
 
+// Apply one `aggregates` increment from a new_logs frame to the /aggregates snapshot
+const mergeBuckets = (buckets, delta) => {
+  const merged = new Map(buckets.map(bucket => [bucket.time, { ...bucket.counts }]));
+  Object.entries(delta).forEach(([time, counts]) => {
+    const bucket = merged.get(Number(time)) || {};
+    Object.entries(counts).forEach(([level, count]) => { bucket[level] = (bucket[level] || 0) + count; });
+    merged.set(Number(time), bucket);
+  });
+  return [...merged.entries()].sort((a, b) => a[0] - b[0]).map(([time, counts]) => ({ time, counts }));
+};
+
+const addCounts = (totals, delta) => {
+  const merged = { ...totals };
+  Object.entries(delta).forEach(([key, count]) => { merged[key] = (merged[key] || 0) + count; });
+  return merged;
+};
+
+const mergeAggregates = (current, delta) => {
+  const ips = addCounts(Object.fromEntries(current.top_ips.map(({ ip, count }) => [ip, count])), delta.ips);
+  const heatmap = current.heatmap.map(row => [...row]);
+  delta.heatmap.forEach(([day, hour, count]) => { heatmap[day][hour] += count; });
+  return {
+    ...current,
+    seq: delta.seq,
+    minute: mergeBuckets(current.minute, delta.minute),
+    hour: mergeBuckets(current.hour, delta.hour),
+    levels: addCounts(current.levels, delta.levels),
+    attack_types: addCounts(current.attack_types, delta.attack_types),
+    top_ips: Object.entries(ips)
+      .map(([ip, count]) => ({ ip, count }))
+      .sort((a, b) => b.count - a.count)
+      .slice(0, AGGREGATE_TOP_IPS),
+    heatmap
+  };
+};
+
 export const WebSocketProvider = ({ children }) => {
   // Socket reference
   const socketRef = useRef(null);
@@ -59,6 +108,48 @@ export const WebSocketProvider = ({ children }) => {
   const reconnectTimerRef = useRef(null);
   const [hasNewLogs, setHasNewLogs] = useState(false);
 
+  // Server-side chart counters: fetched on connect, then kept current from frame deltas.
+  // Snapshots and deltas are numbered; deltas at or below the snapshot's seq are already in it
+  const [aggregates, setAggregates] = useState(null);
+  const snapshotSeqRef = useRef(null);
+  // Deltas that arrive while a snapshot request is in flight, applied once it lands
+  const bufferedDeltasRef = useRef(null);
+
+  const fetchAggregates = useCallback(() => {
+    bufferedDeltasRef.current = bufferedDeltasRef.current || [];
+    fetch(`${SOCKET_SERVER_URL}/aggregates?minutes=1440&hours=720&top=${AGGREGATE_TOP_IPS}`)
+      .then(response => response.json())
+      .then(data => {
+        const buffered = bufferedDeltasRef.current || [];
+        bufferedDeltasRef.current = null;
+        snapshotSeqRef.current = data.seq;
+        // A merged delta from a skipped summary may straddle the snapshot; it can't be split, so start over
+        if (buffered.some(delta => delta.seq > data.seq && (delta.first_seq ?? delta.seq) <= data.seq)) {
+          fetchAggregates();
+          return;
+        }
+        setAggregates(buffered.filter(delta => delta.seq > data.seq).reduce(mergeAggregates, data));
+      })
+      .catch(error => {
+        bufferedDeltasRef.current = null;
+        console.error("Failed to load aggregates:", error);
+      });
+  }, []);
+
+  const applyAggregatesDelta = useCallback((delta) => {
+    if (bufferedDeltasRef.current) {
+      bufferedDeltasRef.current.push(delta);
+      return;
+    }
+    const snapshotSeq = snapshotSeqRef.current;
+    if (snapshotSeq === null || delta.seq <= snapshotSeq) return;
+    if ((delta.first_seq ?? delta.seq) <= snapshotSeq) {
+      fetchAggregates();
+      return;
+    }
+    setAggregates(prev => (prev ? mergeAggregates(prev, delta) : prev));
+  }, [fetchAggregates]);
+
   // Persist logs to localStorage whenever they change
   useEffect(() => {
     localStorage.setItem("securityLogs", JSON.stringify(logs));
@@ -109,74 +200,112 @@ export const WebSocketProvider = ({ children }) => {
     }
   }, []);
 
-  // Handle new logs received from the server
-  const handleNewLog = useCallback((data) => {
-    console.log("New log received:", data);
+  // Handle a batch of logs received from the server (one frame per ~100 ms)
+  const handleNewLogs = useCallback((data, ack) => {
+    // Acknowledge right away so the server keeps sending us full frames
+    if (typeof ack === "function") ack();
+
     setSocketStatus(prev => ({ 
       ...prev, 
       connected: true, 
       error: null, 
       lastMessage: new Date() 
     }));
-    
-    if (data.log) {
-      const parsedLog = parseLog(data.log);
-      if (parsedLog) {
-        // Check if this log is already in our logs (to prevent duplicates)
-        setLogs(prevLogs => {
-          // Simple duplicate check based on timestamp and content
-          const isDuplicate = prevLogs.some(
-            existingLog => 
-              existingLog.date === parsedLog.date && 
-              existingLog.time === parsedLog.time && 
-              existingLog.ip === parsedLog.ip && 
-              existingLog.remarks === parsedLog.remarks
-          );
-          
-          if (isDuplicate) {
-            return prevLogs; // Don't add duplicate logs
-          }
-          
-          setHasNewLogs(true); // Indicate we have new logs
-          
-          // Add new log at the beginning
-          return [parsedLog, ...prevLogs];
-        });
-        
-        // Create alerts based on log status
-        const lowerStatus = parsedLog.status.toLowerCase();
-        if (lowerStatus.includes("sqli attempt")) {
-          createAlert("danger", "SQL Injection Attempt Detected!", parsedLog);
-        } else if (lowerStatus.includes("failed login")) {
-          createAlert("warning", "Failed Login Attempt", parsedLog);
-        } else if (lowerStatus.includes("successful login")) {
-          createAlert("success", "Successful Login", parsedLog);
-        }
+
+    // The increments from frames we were skipped for come first, merged into the summary
+    if (data && data.skipped && data.skipped.aggregates) {
+      applyAggregatesDelta(data.skipped.aggregates);
+    }
+    if (data && data.aggregates) {
+      applyAggregatesDelta(data.aggregates);
+    }
+
+    if (data && data.skipped) {
+      console.warn("Server skipped log events while we were slow:", data.skipped);
+      createAlert("warning", `${data.skipped.total} events skipped while catching up`, {
+        remarks: Object.entries(data.skipped.by_level).map(([level, count]) => `${level}: ${count}`).join(", ")
+      });
+    }
+
+    const parsedLogs = (data && Array.isArray(data.logs) ? data.logs : [])
+      .map(log => parseLog(log))
+      .filter(log => log !== null);
+    if (parsedLogs.length === 0) return;
+
+    // Apply the whole frame in one state update (and one localStorage write)
+    setLogs(prevLogs => {
+      // Simple duplicate check based on timestamp and content
+      const seen = new Set(prevLogs.map(log => `${log.date} ${log.time} ${log.ip} ${log.remarks}`));
+      const freshLogs = parsedLogs.filter(log => {
+        const key = `${log.date} ${log.time} ${log.ip} ${log.remarks}`;
+        if (seen.has(key)) return false;
+        seen.add(key);
+        return true;
+      });
+
+      if (freshLogs.length === 0) {
+        return prevLogs; // Don't add duplicate logs
       }
+
+      setHasNewLogs(true); // Indicate we have new logs
+
+      // Add new logs at the beginning, newest first
+      return [...freshLogs.reverse(), ...prevLogs];
+    });
+
+    // Raise one alert per frame for the most severe event in it
+    const statuses = parsedLogs.map(log => log.status.toLowerCase());
+    const countOf = (status) => statuses.filter(s => s.includes(status)).length;
+    const latestOf = (status) => parsedLogs.filter(log => log.status.toLowerCase().includes(status)).pop();
+    const suffix = (count) => (count > 1 ? ` (${count})` : "");
+
+    if (countOf("sqli attempt")) {
+      createAlert("danger", `SQL Injection Attempt Detected!${suffix(countOf("sqli attempt"))}`, latestOf("sqli attempt"));
+    } else if (countOf("failed login")) {
+      createAlert("warning", `Failed Login Attempt${suffix(countOf("failed login"))}`, latestOf("failed login"));
+    } else if (countOf("successful login")) {
+      createAlert("success", `Successful Login${suffix(countOf("successful login"))}`, latestOf("successful login"));
     }
-  }, [createAlert]);
+  }, [createAlert, applyAggregatesDelta]);
+
+  // Cursor from the last history request, so a reconnect only fetches the delta
+  const cursorRef = useRef(localStorage.getItem("securityLogsCursor"));
 
   // Request historical logs from server
-  const fetchHistoricalLogs = useCallback(() => {
-    // Only fetch historical logs if we don't already have some
-    if (logs.length === 0 && socketRef.current && socketRef.current.connected) {
-      socketRef.current.emit("get_historical_logs", { limit: 50 }, (response) => {
-        if (response && response.logs && Array.isArray(response.logs)) {
-          const parsedLogs = response.logs
-            .map(log => parseLog(log))
-            .filter(log => log !== null)
-            .reverse();
-          
-          setLogs(parsedLogs);
-          console.log("Historical logs loaded:", parsedLogs.length);
-        } else {
-          console.warn("Invalid historical logs response:", response);
-        }
-      });
-    } else {
-      // We already have logs, no need to fetch
+  const fetchHistoricalLogs = useCallback((reconnected = false) => {
+    if (!socketRef.current || !socketRef.current.connected) return;
+
+    // First load gets the latest 50 entries; a reconnect only fetches what we missed
+    const catchingUp = reconnected && logs.length > 0 && cursorRef.current !== null;
+    if (logs.length > 0 && !catchingUp) {
       console.log("Using existing logs:", logs.length);
+      return;
     }
+    const query = catchingUp ? { since: Number(cursorRef.current), limit: 500 } : { limit: 50 };
+
+    socketRef.current.emit("get_historical_logs", query, (response) => {
+      if (response && response.logs && Array.isArray(response.logs)) {
+        const parsedLogs = response.logs
+          .map(log => parseLog(log))
+          .filter(log => log !== null)
+          .reverse();
+
+        if (catchingUp) {
+          setLogs(prevLogs => {
+            const seen = new Set(prevLogs.map(log => `${log.date} ${log.time} ${log.ip} ${log.remarks}`));
+            const missed = parsedLogs.filter(log => !seen.has(`${log.date} ${log.time} ${log.ip} ${log.remarks}`));
+            return missed.length ? [...missed, ...prevLogs] : prevLogs;
+          });
+        } else {
+          setLogs(parsedLogs);
+        }
+        cursorRef.current = String(response.cursor);
+        localStorage.setItem("securityLogsCursor", cursorRef.current);
+        console.log(catchingUp ? "Missed logs loaded:" : "Historical logs loaded:", parsedLogs.length);
+      } else {
+        console.warn("Invalid historical logs response:", response);
+      }
+    });
   }, [logs.length]);
 
   // Clear all logs
@@ -203,8 +332,9 @@ export const WebSocketProvider = ({ children }) => {
         reconnecting: false
       }));
       
-      // Request historical logs
-      fetchHistoricalLogs();
+      // Request historical logs, or the delta since our cursor
+      fetchHistoricalLogs(true);
+      fetchAggregates();
       
       if (reconnectTimerRef.current) {
         clearTimeout(reconnectTimerRef.current);
@@ -247,7 +377,7 @@ export const WebSocketProvider = ({ children }) => {
     socket.on("disconnect", handleDisconnect);
     socket.on("error", handleError);
     socket.on("connect_error", handleConnectError);
-    socket.on("new_log", handleNewLog);
+    socket.on("new_logs", handleNewLogs);
     
     // Additional event for historical logs
     socket.on("historical_logs", (data) => {
@@ -284,14 +414,14 @@ export const WebSocketProvider = ({ children }) => {
       socket.off("disconnect", handleDisconnect);
       socket.off("error", handleError);
       socket.off("connect_error", handleConnectError);
-      socket.off("new_log", handleNewLog);
+      socket.off("new_logs", handleNewLogs);
       socket.off("historical_logs");
       
       if (reconnectTimerRef.current) {
         clearTimeout(reconnectTimerRef.current);
       }
     };
-  }, [handleNewLog, fetchHistoricalLogs, logs.length]);
+  }, [handleNewLogs, fetchHistoricalLogs, fetchAggregates, logs.length]);
 
   // Context value
   const value = {
@@ -304,6 +434,7 @@ export const WebSocketProvider = ({ children }) => {
     socketStatus,
     hasNewLogs,
     setHasNewLogs,
+    aggregates,
     handleManualReconnect
   };
 
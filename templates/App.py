@@ -1,10 +1,11 @@
 import logging
-import re
+import atexit
 import datetime
 import os
-import urllib.parse
 import random
 import json
+import threading
+import time
 from flask import Flask, request, jsonify, session
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
@@ -13,6 +14,17 @@ import hashlib
 import binascii
 import os
 from werkzeug.middleware.proxy_fix import ProxyFix
+from hashing_pool import HashingPool, PoolSaturated
+from state_backend import MemoryBackend, make_backend
+from rate_limiter import SlidingWindowLimiter
+from user_cache import UserCache
+from settings_store import SettingsStore
+from log_writer import LogWriter, LogWriterHandler, ForwardingLogWriter
+from log_broadcast import LogBroadcaster
+from log_index import LogIndex, DASHBOARD_LEVELS
+from log_events import build_event, format_event, parse_line
+from aggregates import RollingAggregates, parse_entry, classify_logged_attack
+from detection import DANGEROUS_PATTERNS, detect_sql_injection, match_sql_injection, describe_rule, attack_type, verdict_cache, shadow_stats, detect_batch, set_max_input_length, get_batch_pool
 
 # Initialize Flask App
 app = Flask(__name__)
@@ -31,9 +43,52 @@ CORS(app, resources={r"/*": {"origins": ["http://localhost:3000", "http://localh
 # Initialize WebSockets with CORS allowed
 socketio = SocketIO(app, cors_allowed_origins=["http://localhost:3000", "http://localhost:5173"], async_mode="threading")
 
+# Where security state lives: "memory" (this process only) or "sqlite:<path>", which
+# lets several worker processes (SQLI_WORKER_ID 0..N-1, see serve_workers.py) share
+# rate limits, blocks and OTPs and see each other's log events. Worker 0 owns requests.log.
+state_backend = make_backend(os.environ.get('SQLI_STATE_BACKEND', 'memory'), os.environ.get('SQLI_WORKER_ID', '0'))
+
+# Coalesce log events into batched `new_logs` frames for the /logs namespace
+def emit_to_dashboard(event, data, to, callback):
+    socketio.emit(event, data, namespace='/logs', to=to, callback=callback)
+
+# Chart counters; each frame carries the increments since the previous one
+aggregates = RollingAggregates(minutes=24 * 60, hours=30 * 24, max_ips=1000)
+
+def aggregates_delta():
+    delta = aggregates.drain_delta()
+    return {"aggregates": delta} if delta else None
+
+def merge_aggregates_deltas(older, newer):
+    return {"aggregates": RollingAggregates.merge_deltas(older["aggregates"], newer["aggregates"])}
+
+log_broadcaster = LogBroadcaster(emit_to_dashboard, window=0.1, max_batch=200, max_inflight=4, extras=aggregates_delta,
+                                 merge_extras=merge_aggregates_deltas)
+
 # Configure logging
 LOG_FILE = 'requests.log'
-logging.basicConfig(filename=LOG_FILE, level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# requests.log is rotated at this size or once its oldest event is this old (seconds);
+# closed segments are compressed ("gzip", "lzma" or None) and the newest LOG_KEEP_SEGMENTS kept
+LOG_ROTATE_BYTES = 10 * 1024 * 1024
+LOG_ROTATE_AGE = 24 * 60 * 60
+LOG_COMPRESSION = 'gzip'
+LOG_KEEP_SEGMENTS = 30
+LOG_KEEP_DAYS = None  # e.g. 90 to also drop segments by age
+
+# Offsets, levels and timestamps of every event line, kept in requests.log.idx for /logs
+# (opened by create_app)
+log_index = LogIndex(LOG_FILE, max_bytes=LOG_ROTATE_BYTES, max_age=LOG_ROTATE_AGE, compression=LOG_COMPRESSION,
+                     keep_segments=LOG_KEEP_SEGMENTS, keep_days=LOG_KEEP_DAYS)
+
+if state_backend.owns_log:
+    # One background writer owns requests.log; fsync policy is "always", "interval" or "never"
+    log_writer = LogWriter(LOG_FILE, max_queue=10000, batch_size=256, flush_interval=0.2, fsync='interval',
+                           on_batch=log_index.append, rotator=log_index)
+else:
+    # Other workers read the index the owner keeps and send it their lines
+    log_writer = ForwardingLogWriter(state_backend.events)
+logging.basicConfig(handlers=[LogWriterHandler(log_writer)], level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # Database Configuration
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///users.db'
@@ -46,165 +101,257 @@ class User(db.Model):
     username = db.Column(db.String(80), unique=True, nullable=False)
     password = db.Column(db.String(128), nullable=False)  # Increased length for hash
 
-login_attempts = {}  
-blocked_sessions = set()  
-otp_store = {}  
+# Username -> (id, password hash) in front of the User query; a Bloom filter of every
+# username turns away unknown-user floods without a database round trip
+def load_user(username):
+    ensure_db()
+    return User.query.filter_by(username=username).first()
+
+def load_usernames():
+    return (username for (username,) in db.session.query(User.username))
+
+def user_table_signature():
+    ensure_db()
+    return tuple(db.session.query(db.func.count(User.id), db.func.max(User.id)).one())
+
+user_cache = UserCache(load_user, load_usernames, user_table_signature, max_entries=10000, ttl=300, negative_ttl=60)
+
+@db.event.listens_for(User, 'after_insert')
+@db.event.listens_for(User, 'after_update')
+@db.event.listens_for(User, 'after_delete')
+def invalidate_cached_user(mapper, connection, target):
+    user_cache.invalidate(target.username)
+    db.session.info.setdefault('changed_users', set()).add(target.username)
+
+# The signature only notices users being added or removed, so password changes (the
+# login-time rehash included) are announced to the other workers once they are committed
+@db.event.listens_for(db.session, 'after_commit')
+def publish_changed_users(session):
+    changed = session.info.pop('changed_users', None)
+    if not changed:
+        return
+    for username in changed:
+        # Again, in case a lookup cached the old row between the flush and the commit
+        user_cache.invalidate(username)
+    if state_backend.events is not None:
+        state_backend.events.publish({"invalidate_users": sorted(changed)})
+
+@db.event.listens_for(db.session, 'after_rollback')
+def forget_changed_users(session):
+    session.info.pop('changed_users', None)
+
+# Expiring, size-capped login state; lifetimes come from security_settings.json:
+# failed-attempt counters (for the CAPTCHA trigger) last rate_limiting.window_minutes,
+# session blocks and OTPs last session.timeout_minutes
+login_attempts = state_backend.store('login_attempts', max_entries=100000)
+blocked_sessions = state_backend.store('blocked_sessions', max_entries=100000)
+otp_store = state_backend.store('otp_store', max_entries=10000)
+
+# Sliding-window login limits per IP, per username and per IP+username
+rate_limiter = SlidingWindowLimiter(state_backend.store('rate_limits', max_entries=200000))
+
+def login_limits(ip, username, rate_settings):
+    """Returns the (key, limit, window) triples a login attempt is counted against."""
+    window = rate_settings['window_minutes'] * 60
+    return [
+        (("ip_user", ip, username), rate_settings['max_attempts'], window),
+        (("user", username), rate_settings.get('username_max_attempts', 10), window),
+        (("ip", ip), rate_settings.get('ip_max_attempts', 30), window),
+    ]
+
+# PBKDF2 cost for new hashes; lower it (e.g. SQLI_PBKDF2_ITERATIONS=1000) for tests and benchmarks.
+# Hashes made at another cost still verify and are redone at this one on the next successful login.
+PBKDF2_ITERATIONS = int(os.environ.get('SQLI_PBKDF2_ITERATIONS', 100000))
+# Hashes stored before the cost was recorded alongside them
+LEGACY_PBKDF2_ITERATIONS = 100000
 
 # Password hashing functions
-def hash_password(password):
-    """Hash a password using PBKDF2 with SHA-256."""
+def hash_password(password, iterations=None):
+    """Hash a password using PBKDF2 with SHA-256, stored as `pbkdf2$<iterations>$<salt>$<hash>`."""
+    iterations = iterations or PBKDF2_ITERATIONS
     # Generate a random salt
-    salt = hashlib.sha256(os.urandom(60)).hexdigest().encode('ascii')
+    salt = binascii.hexlify(os.urandom(16)).decode('ascii')
     # Hash password using PBKDF2
-    pwdhash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 100000)
-    pwdhash = binascii.hexlify(pwdhash)
-    # Return the salt + hash
-    return (salt + pwdhash).decode('ascii')
+    pwdhash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('ascii'), iterations)
+    pwdhash = binascii.hexlify(pwdhash).decode('ascii')
+    return f"pbkdf2${iterations}${salt}${pwdhash}"
+
+def parse_password_hash(stored_password):
+    """Returns (iterations, salt, hash); legacy hashes are a 64-character salt followed by the hash."""
+    if stored_password.startswith('pbkdf2$'):
+        _, iterations, salt, stored_hash = stored_password.split('$')
+        return int(iterations), salt, stored_hash
+    return LEGACY_PBKDF2_ITERATIONS, stored_password[:64], stored_password[64:]
 
 def verify_password(stored_password, provided_password):
     """Verify a stored password against one provided by user."""
-    # Extract the salt
-    salt = stored_password[:64]
-    # Extract the stored hash
-    stored_hash = stored_password[64:]
-    # Hash the provided password with the same salt
-    pwdhash = hashlib.pbkdf2_hmac('sha256', provided_password.encode('utf-8'), salt.encode('ascii'), 100000)
+    iterations, salt, stored_hash = parse_password_hash(stored_password)
+    # Hash the provided password with the same salt and cost
+    pwdhash = hashlib.pbkdf2_hmac('sha256', provided_password.encode('utf-8'), salt.encode('ascii'), iterations)
     pwdhash = binascii.hexlify(pwdhash).decode('ascii')
     # Compare the calculated hash with the stored hash
     return pwdhash == stored_hash
 
-# Function to initialize database
-def init_db():
-    with app.app_context():
-        db.create_all()
-        if not User.query.first():  # Add users only if none exist
-            users = [
-                User(username='alice', password=hash_password('password1')),
-                User(username='bob', password=hash_password('password2')),
-                User(username='charlie', password=hash_password('password3')),
-                User(username='dave', password=hash_password('password4')),
-                User(username='eve', password=hash_password('password5')),
-            ]
-            db.session.bulk_save_objects(users)
-            db.session.commit()
-
-init_db()
-
-# SQL Injection detection patterns (unchanged)
-DANGEROUS_PATTERNS = [
-    # SQL Keywords & Commands
-    r"(?i)\bselect\b\s*\**\s*\bfrom\b", r"(?i)\bunion\b\s*\bselect\b", r"(?i)\border by\b\s*\d+", 
-    r"(?i)\bcase when\b", r"(?i)\binsert into\b", r"(?i)\bupdate\b\s*\bset\b", 
-    r"(?i)\bdelete from\b", r"(?i)\bdrop table\b", r"(?i)\bexec\b", r"(?i)\breplace into\b", 
-    r"(?i)\balter table\b", r"(?i)\btruncate\b", r"(?i)\bcreate\b\s*\btable\b",
-
-    # Logical Conditions (Bypass Authentication)
-    r"(?i)\band\s*\d+=\d+\b", r"(?i)\bor\s*\d+=\d+\b", r"(?i)\bsleep\s*\(\d+\)", r"(?i)\bwaitfor delay\b",
-    r"(?i)\bif\s*\(.*=.*\)", r"(?i)\btrue\b.*\bfalse\b", r"(?i)\bnull is null\b",
-
-    # Obfuscation Tricks
-    r"(?i)\bselect\s*/\*\*/\s*\*?\s*from\b",  # Inline comments (`SELECT/**/FROM`)
-    r"(?i)\bunion\s*/\*\*/\s*select\b",  # `UNION/**/SELECT`
-    r"(?i)\bunion%20select\b", r"(?i)\bunion%09select\b",  # URL encoding tricks
-    r"(?i)\bselect%20from\b", r"(?i)\bselect%09from\b",  # `SELECT%20FROM`
-    r"(?i)or\s*1\s*=\s*1", r"(?i)and\s*1\s*=\s*1", r"(?i)1=1", r"(?i)\bnull is null\b",
-
-    # System Access & OOB SQLi
-    r"(?i)\bxp_cmdshell\b", r"(?i)\bsystem_user\b", r"(?i)\bcurrent_user\b", r"(?i)\buser\b\(\)", 
-    r"(?i)\bpg_sleep\b", r"(?i)\bschema_name\b", r"(?i)\btable_name\b", r"(?i)\bcolumn_name\b",
-
-    # Encoded SQL Injection Bypasses
-    r"(?i)0x[0-9A-Fa-f]+",  # Hex encoding
-    r"(?i)char\([0-9,]+\)", r"(?i)concat\(", r"(?i)union all select", r"(?i)case when",
-    r"(?i)base64_decode\(", r"(?i)unhex\(",  
-
-    # SQL Comment Injection
-    r"--", r"#", r"/\*", r"\*/", r";", r"'",  
-
-    # Nested Queries and Subqueries
-    r"(?i)\bexists\s*\(", r"(?i)\bnot exists\s*\(", r"(?i)\bselect.*\bfrom\s*\(.*select",
-
-    # Mixed Casing Obfuscation
-    r"(?i)[Ss][Ee][Ll][Ee][Cc][T]", r"(?i)[Uu][Nn][Ii][Oo][N]", r"(?i)[Oo][Rr][Dd][Ee][R]",
-]
-
-def detect_sql_injection(data):
-    """Detects SQL Injection patterns and ensures security."""
-
-    if not data:
-        return False
-
-    # Decode URL-encoded payloads & Normalize Input
-    data = urllib.parse.unquote(data)  
-    data = data.replace("+", " ")  
-    data = re.sub(r"\s+", " ", data).strip().lower()  # Normalize Whitespace & Case
-
-    # Remove ALL spaces between characters
-    compressed_data = re.sub(r"\s+", "", data)  # Example: `select     union` → `selectunion`
+def password_needs_rehash(stored_password):
+    return parse_password_hash(stored_password)[0] != PBKDF2_ITERATIONS
 
-    # Allow Only Safe Inputs (Strict Alphanumeric Check)
-    if re.fullmatch(r"^[a-z0-9_]+$", data):
-        return False  
+# Password verification runs on its own bounded pool so bad-login floods can't starve request threads
+password_pool = HashingPool(workers=4, max_queue=32)
 
-    # Check Against Dangerous SQL Patterns
-    for pattern in DANGEROUS_PATTERNS:
-        if re.search(pattern, data) or re.search(pattern, compressed_data):
-            return True  
-
-    return False  # No SQL Injection Detected
+def rehash_password(user_id, password):
+    """Re-hashes a user's password at the current PBKDF2 cost."""
+    try:
+        new_hash = password_pool.run(hash_password, password)
+    except PoolSaturated:
+        # Busy; the next successful login tries again
+        return
+    user = db.session.get(User, user_id)
+    if user is not None:
+        user.password = new_hash
+        db.session.commit()
+
+DEMO_USERS = [
+    ('alice', 'password1'),
+    ('bob', 'password2'),
+    ('charlie', 'password3'),
+    ('dave', 'password4'),
+    ('eve', 'password5'),
+]
 
-def log_event(level, message):
-    """Logs events with timestamp and IP address, and sends to WebSocket for React Dashboards."""
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    ip_address = request.remote_addr or "Unknown IP"
-    log_entry = f"[{timestamp}] [IP: {ip_address}] [{level}] {message}"
+# The database is created on first use rather than at import
+db_ready = False
+db_lock = threading.Lock()
+
+def ensure_db():
+    global db_ready
+    if db_ready:
+        return
+    with db_lock:
+        if not db_ready:
+            db.create_all()
+            if not User.query.first():
+                logging.warning("users.db has no users; run `flask --app App seed` to add the demo accounts")
+            db_ready = True
+
+def seed_users():
+    """Adds the demo accounts if there are no users yet. Returns how many were added."""
+    ensure_db()
+    if User.query.first():
+        return 0
+    db.session.add_all([User(username=username, password=hash_password(password)) for username, password in DEMO_USERS])
+    db.session.commit()
+    return len(DEMO_USERS)
+
+@app.cli.command('seed')
+def seed_command():
+    """Create the database and the demo users."""
+    print(f"Added {seed_users()} demo users")
+
+def log_event(level, message, **fields):
+    """Logs events with timestamp and IP address, and sends to WebSocket for React Dashboards.
+
+    Extra fields (username, rule_id, attack_type, detector_ms) are only written
+    when the "logging.format" setting is "json"; see log_events.EVENT_SCHEMA.
+    """
+    now = datetime.datetime.now()
+    event = build_event(
+        timestamp=now.strftime("%Y-%m-%d %H:%M:%S"),
+        ip=request.remote_addr or "Unknown IP",
+        level=level,
+        message=message,
+        session_id=session.get('id'),
+        **fields
+    )
+    log_format = load_security_settings().get('logging', {}).get('format', 'text')
+    log_entry = format_event(event, log_format)
     
-    # Write to log file
-    with open(LOG_FILE, "a") as f:
-        f.write(log_entry + "\n")
+    # Queue for the background log writer (never blocks the request)
+    log_writer.write(log_entry)
+
+    # Count before publishing so the frame carrying this entry also carries its increments
+    aggregates.add(now.timestamp(), level, event['ip'], event['attack_type'])
+
+    # Send real-time update to React Dashboards (batched by the broadcaster)
+    published = event if log_format == 'json' else log_entry
+    log_broadcaster.publish(level, published)
+
+    # ...and to the dashboards connected to the other workers
+    if state_backend.events is not None:
+        state_backend.events.publish({"level": level, "entry": published,
+                                      "aggregate": [now.timestamp(), level, event['ip'], event['attack_type']]})
+
+def handle_worker_event(message):
+    """Applies a log line or event published by another worker process."""
+    if 'invalidate_users' in message:
+        for username in message['invalidate_users']:
+            user_cache.invalidate(username)
+        return
+    if 'line' in message:
+        if state_backend.owns_log:
+            log_writer.write(message['line'])
+        return
+    aggregates.add(*message['aggregate'])
+    log_broadcaster.publish(message['level'], message['entry'])
+
+# Defaults used when security_settings.json does not exist
+DEFAULT_SECURITY_SETTINGS = {
+    "captcha": {
+        "enabled": True,
+        "trigger_threshold": 2  # After 2 failed attempts
+    },
+    "rate_limiting": {
+        "enabled": True,
+        "max_attempts": 5,  # Per IP+username
+        "username_max_attempts": 10,  # Per username, across all IPs
+        "ip_max_attempts": 30,  # Per IP, across all usernames
+        "window_minutes": 15
+    },
+    "two_factor": {
+        "enabled": True,
+        "method": "email"  # Could be "email", "sms", "app"
+    },
+    "password_policy": {
+        "min_length": 8,
+        "require_special": True,
+        "require_numbers": True,
+        "require_uppercase": True
+    },
+    "session": {
+        "timeout_minutes": 30,
+        "remember_me_days": 7
+    },
+    "detection": {
+        "max_input_length": 1024,  # Longest input the detector inspects
+        "oversize_action": "reject",  # "reject" or "truncate" (inspect only the first max_input_length chars)
+        "engine": "regex",  # "regex" or "lexer"
+        "shadow": False  # Run both engines and record where they disagree
+    },
+    "logging": {
+        "format": "text"  # "text" or "json" (one structured event per line)
+    }
+}
+
+def apply_detection_settings(settings):
+    """Hands the settings that detection.py's own callers need to the detection module."""
+    set_max_input_length(settings.get('detection', {}).get('max_input_length', 1024))
 
-    # Send real-time update to React Dashboards
-    socketio.emit('new_log', {'log': log_entry}, namespace='/logs')
+# Re-applied whenever a snapshot loads, including after another worker saves the file
+settings_store = SettingsStore('security_settings.json', DEFAULT_SECURITY_SETTINGS,
+                               on_change=apply_detection_settings)
 
 def load_security_settings():
-    try:
-        if os.path.exists('security_settings.json'):
-            with open('security_settings.json', 'r') as f:
-                return json.load(f)
-    except Exception as e:
-        logging.error(f"Error loading security settings: {e}")
-    
-    return {
-        "captcha": {
-            "enabled": True,
-            "trigger_threshold": 2  # After 2 failed attempts
-        },
-        "rate_limiting": {
-            "enabled": True,
-            "max_attempts": 5,
-            "window_minutes": 15
-        },
-        "two_factor": {
-            "enabled": True,
-            "method": "email"  # Could be "email", "sms", "app"
-        },
-        "password_policy": {
-            "min_length": 8,
-            "require_special": True,
-            "require_numbers": True,
-            "require_uppercase": True
-        },
-        "session": {
-            "timeout_minutes": 30,
-            "remember_me_days": 7
-        }
-    }
+    """Returns an immutable snapshot of the cached security settings."""
+    return settings_store.snapshot()
+
+@app.before_request
+def refresh_security_settings():
+    # Picks up a file changed by another worker before this request reads detection's copy
+    load_security_settings()
 
 # Save settings to JSON file
 def save_security_settings(settings):
     try:
-        with open('security_settings.json', 'w') as f:
-            json.dump(settings, f, indent=4)
+        settings_store.save(settings)
         log_event("SETTINGS", f"Security settings updated")
         return True
     except Exception as e:
@@ -216,7 +363,7 @@ def save_security_settings(settings):
 # Route to get security settings
 @app.route('/settings', methods=['GET'])
 def get_settings():
-    settings = load_security_settings()
+    settings = settings_store.as_dict()
     return jsonify(settings)
 
 # Route to update security settings (admin only)
@@ -227,7 +374,7 @@ def update_settings():
     
     try:
         new_settings = request.json
-        current_settings = load_security_settings()
+        current_settings = settings_store.as_dict()
         
         # Update only valid fields
         for category in current_settings:
@@ -266,97 +413,123 @@ def login():
         if not username or not password:
             return jsonify({"message": "Both fields are required.", "success": False}), 400
 
+        # Input length budget for the detector
+        detection_settings = security_settings.get('detection', {})
+        max_length = detection_settings.get('max_input_length', 1024)
+        inspected_username, inspected_password = username, password
+        if len(username) > max_length or len(password) > max_length:
+            if detection_settings.get('oversize_action', 'reject') == 'truncate':
+                inspected_username, inspected_password = username[:max_length], password[:max_length]
+            else:
+                log_event("OVERSIZE INPUT", f"Rejected {max(len(username), len(password))}-character input for user '{username[:80]}'", username=username[:80])
+                return jsonify({"message": "Input too long.", "success": False}), 413
+
         # SQL Injection check
-        if detect_sql_injection(username) or detect_sql_injection(password):
-            log_event("SQLI ATTEMPT", f"SQL Injection detected! Username: '{username}', Password: '{password}'")
+        engine_name = detection_settings.get('engine', 'regex')
+        shadow = detection_settings.get('shadow', False)
+        detect_started = time.perf_counter()
+        rule_id = match_sql_injection(inspected_username, engine_name, shadow, 'username')
+        if rule_id is None:
+            rule_id = match_sql_injection(inspected_password, engine_name, shadow, 'password')
+        detector_ms = round((time.perf_counter() - detect_started) * 1000, 3)
+        if rule_id is not None:
+            logging.info(f"Detection rule {rule_id} fired: {describe_rule(rule_id)}")
+            log_event("SQLI ATTEMPT", f"SQL Injection detected! Username: '{username}', Password: '{password}'",
+                      username=username, rule_id=rule_id, attack_type=attack_type(rule_id), detector_ms=detector_ms)
             return jsonify({"message": "SQL Injection detected!", "success": False}), 400
 
         # CAPTCHA validation if enabled
         if security_settings['captcha']['enabled'] and captcha_response:
             expected_captcha = data.get('expected_captcha')
             if captcha_response != expected_captcha:
-                log_event("FAILED CAPTCHA", f"Invalid CAPTCHA for user '{username}'")
+                log_event("FAILED CAPTCHA", f"Invalid CAPTCHA for user '{username}'", username=username)
                 return jsonify({"message": "Invalid CAPTCHA response", "success": False, "requireCaptcha": True}), 401
 
-        # Rate limiting check if enabled
-        if security_settings['rate_limiting']['enabled']:
+        # Rate limiting check if enabled (before any DB or PBKDF2 work)
+        rate_settings = security_settings['rate_limiting']
+        attempt_window = rate_settings['window_minutes'] * 60
+        session_lifetime = security_settings['session']['timeout_minutes'] * 60
+        ip = request.remote_addr or "Unknown IP"
+        limits = login_limits(ip, username, rate_settings)
+        if rate_settings['enabled']:
             session_id = session.get('id')
             
             # Check if the session is blocked
             if session_id in blocked_sessions:
-                log_event("BLOCKED SESSION", f"Blocked session '{session_id}' attempted login")
+                log_event("BLOCKED SESSION", f"Blocked session '{session_id}' attempted login", username=username)
                 return jsonify({"message": "Your session has been blocked due to too many failed attempts.", "success": False}), 403
             
-            # Check rate limits for this username
-            if username in login_attempts:
-                attempts, first_attempt_time = login_attempts[username]
-                window_minutes = security_settings['rate_limiting']['window_minutes']
-                max_attempts = security_settings['rate_limiting']['max_attempts']
-                
-                # If within time window, check attempt count
-                if (datetime.datetime.now() - first_attempt_time).total_seconds() < (window_minutes * 60):
-                    if attempts >= max_attempts:
-                        log_event("RATE LIMITED", f"Rate limit exceeded for user '{username}'")
-                        blocked_sessions.add(session_id)
-                        return jsonify({"message": f"Too many login attempts. Please try again later.", "success": False}), 429
-                else:
-                    # Reset counter if outside time window
-                    login_attempts[username] = (0, datetime.datetime.now())
-            else:
-                # Initialize counter for first attempt
-                login_attempts[username] = (0, datetime.datetime.now())
+            # Count the attempt against every limit; a rejected attempt counts against none
+            exceeded = rate_limiter.hit(limits)
+            if exceeded:
+                key, retry_after = exceeded
+                log_event("RATE LIMITED", f"Rate limit exceeded for user '{username}' ({key[0]} limit)", username=username)
+                blocked_sessions.set(session_id, True, session_lifetime)
+                return jsonify({"message": f"Too many login attempts. Please try again later.", "success": False}), 429, {"Retry-After": str(max(1, int(retry_after + 0.999)))}
 
         # Verify user credentials
-        user = User.query.filter_by(username=username).first()
+        user = user_cache.lookup(username)
+        try:
+            password_ok = user is not None and password_pool.run(verify_password, user.password, password)
+        except PoolSaturated as e:
+            logging.warning(f"Password verification pool saturated, shedding login for '{username}'")
+            return jsonify({"message": "Server busy, please retry shortly.", "success": False}), 503, {"Retry-After": str(e.retry_after)}
         
         # If credentials are wrong
-        if not user or not verify_password(user.password, password):
+        if not password_ok:
             message = "Invalid credentials."
             status_code = 401
             
             # Increment failed attempt counter
-            if username in login_attempts:
-                attempts, first_attempt = login_attempts[username]
-                login_attempts[username] = (attempts + 1, first_attempt)
-            else:
-                login_attempts[username] = (1, datetime.datetime.now())
+            failed_attempts = login_attempts.increment(username, attempt_window)
             
             if user:
-                log_event("FAILED LOGIN", f"Incorrect password attempt for user '{username}'")
+                log_event("FAILED LOGIN", f"Incorrect password attempt for user '{username}'", username=username, detector_ms=detector_ms)
             else:
-                log_event("FAILED LOGIN", f"Unknown user '{username}' attempted to log in")
+                log_event("FAILED LOGIN", f"Unknown user '{username}' attempted to log in", username=username, detector_ms=detector_ms)
                 
             # Check if we should trigger CAPTCHA
             captcha_threshold = security_settings['captcha']['trigger_threshold']
-            if security_settings['captcha']['enabled'] and login_attempts.get(username, (0, None))[0] >= captcha_threshold:
+            if security_settings['captcha']['enabled'] and failed_attempts >= captcha_threshold:
                 return jsonify({"message": message, "success": False, "requireCaptcha": True}), status_code
                 
             return jsonify({"message": message, "success": False}), status_code
 
+        # Only failed password checks count towards the limits
+        if rate_settings['enabled']:
+            for key, _, window in limits:
+                if key[0] == "ip":
+                    rate_limiter.refund(key, window)
+                else:
+                    rate_limiter.reset(key)
+
+        # Upgrade hashes made at a different PBKDF2 cost
+        if password_needs_rehash(user.password):
+            rehash_password(user.id, password)
+
         # Check for 2FA if enabled
         if security_settings['two_factor']['enabled'] and not otp:
             # In a real app, you'd generate and send the OTP here
             # For demo, we'll just create a random 6-digit code
             generated_otp = str(random.randint(100000, 999999))
-            otp_store[username] = generated_otp
-            log_event("2FA", f"Generated OTP for user '{username}': {generated_otp}")
+            otp_store.set(username, generated_otp, session_lifetime)
+            log_event("2FA", f"Generated OTP for user '{username}': {generated_otp}", username=username)
             return jsonify({"message": "Please enter the verification code", "success": False, "require2FA": True}), 200
             
         # Verify OTP if 2FA is enabled
         if security_settings['two_factor']['enabled'] and otp:
             stored_otp = otp_store.get(username)
             if not stored_otp or otp != stored_otp:
-                log_event("FAILED 2FA", f"Invalid OTP for user '{username}'")
+                log_event("FAILED 2FA", f"Invalid OTP for user '{username}'", username=username)
                 return jsonify({"message": "Invalid verification code", "success": False, "require2FA": True}), 401
             # Clear OTP after successful verification
-            del otp_store[username]
+            otp_store.pop(username)
 
         # Successful login
-        log_event("SUCCESSFUL LOGIN", f"User '{username}' logged in successfully.")
+        log_event("SUCCESSFUL LOGIN", f"User '{username}' logged in successfully.", username=username, detector_ms=detector_ms)
         
         # Reset rate limiting counter on successful login
-        if username in login_attempts:
-            login_attempts[username] = (0, datetime.datetime.now())
+        login_attempts.pop(username)
             
         return jsonify({"message": "Login successful!", "success": True}), 200
 
@@ -370,21 +543,151 @@ def reset_blocks():
     """Reset all blocked sessions"""
     blocked_sessions.clear()
     login_attempts.clear()
+    otp_store.clear()
+    rate_limiter.clear()
     log_event("SECURITY", "All blocks and rate limits reset")
     return jsonify({"message": "All blocks reset successfully"}), 200
 
+# Page size limits for /logs and the dashboard's history requests
+DEFAULT_LOG_LIMIT = 500
+MAX_LOG_LIMIT = 5000
+
+def parse_log_time(value):
+    """Accepts a unix timestamp or an ISO date/time and returns a unix timestamp."""
+    try:
+        return int(float(value))
+    except ValueError:
+        return int(datetime.datetime.fromisoformat(value).timestamp())
+
+def query_logs(args):
+    """Runs a /logs query from request arguments; raises ValueError on bad input."""
+    since = args.get('since')
+    offset = args.get('offset')
+    limit = int(args.get('limit', DEFAULT_LOG_LIMIT))
+    if limit < 1:
+        raise ValueError("'limit' must be positive")
+
+    levels = args.get('level')
+    if levels is None:
+        levels = DASHBOARD_LEVELS
+    elif isinstance(levels, str):
+        levels = None if levels.lower() == 'all' else [level.strip().upper() for level in levels.split(',')]
+
+    start, end = args.get('start'), args.get('end')
+    result = log_index.query(
+        since=int(since) if since is not None else None,
+        offset=int(offset) if offset is not None else None,
+        limit=min(limit, MAX_LOG_LIMIT),
+        levels=levels,
+        start=parse_log_time(str(start)) if start is not None else None,
+        end=parse_log_time(str(end)) if end is not None else None
+    )
+    # Structured events are served as objects, older text lines as strings
+    result["logs"] = [parse_line(line) for line in result["logs"]]
+    return result
+
 @app.route('/logs', methods=['GET'])
 def get_logs():
-    """Fetch only login and SQL injection logs for the React Dashboard."""
-    if not os.path.exists(LOG_FILE):
-        return jsonify({"logs": []}), 200  # Return an empty JSON array if no logs exist
+    """Fetch login and SQL injection logs for the React Dashboard.
 
-    with open(LOG_FILE, "r", encoding="utf-8") as f:
-        logs = f.readlines()
+    Without `since` this returns the newest `limit` entries; pass the returned
+    `cursor` back as `since` to get only what was logged after it.
+    """
+    try:
+        result = query_logs(request.args)
+    except ValueError as e:
+        return jsonify({"message": f"Invalid log query: {e}", "success": False}), 400
+    return jsonify(result), 200
+
+# Rolling counters for the dashboard charts; live increments arrive with each `new_logs` frame
+@app.route('/aggregates', methods=['GET'])
+def get_aggregates():
+    try:
+        minutes = int(request.args.get('minutes', 60))
+        hours = int(request.args.get('hours', 24))
+        top = int(request.args.get('top', 10))
+    except ValueError:
+        return jsonify({"message": "'minutes', 'hours' and 'top' must be integers.", "success": False}), 400
+    return jsonify(aggregates.snapshot(minutes=minutes, hours=hours, top=top)), 200
+
+# Largest number of inputs accepted by /detect/batch
+MAX_BATCH_SIZE = 50000
+
+# Classify many strings at once for the WAF sidecar and offline replay jobs
+@app.route('/detect/batch', methods=['POST'])
+def detect_batch_route():
+    data = request.get_json(silent=True) or {}
+    inputs = data.get('inputs')
+
+    if not isinstance(inputs, list) or not all(isinstance(item, str) for item in inputs):
+        return jsonify({"message": "'inputs' must be a list of strings.", "success": False}), 400
+    if len(inputs) > MAX_BATCH_SIZE:
+        return jsonify({"message": f"At most {MAX_BATCH_SIZE} inputs per batch.", "success": False}), 413
+
+    detection_settings = load_security_settings().get('detection', {})
+    engine_name = data.get('engine', detection_settings.get('engine', 'regex'))
+    if engine_name not in ('regex', 'lexer'):
+        return jsonify({"message": "'engine' must be 'regex' or 'lexer'.", "success": False}), 400
+    max_length = detection_settings.get('max_input_length', 1024)
+
+    oversize = [i for i, item in enumerate(inputs) if len(item) > max_length]
+    if oversize and detection_settings.get('oversize_action', 'reject') != 'truncate':
+        return jsonify({"message": "Input too long.", "success": False, "oversize": oversize[:100]}), 413
+
+    rule_ids = detect_batch(inputs, engine_name, max_length)
+    return jsonify({
+        "success": True,
+        "engine": engine_name,
+        "results": [{"detected": rule_id is not None, "rule_id": rule_id} for rule_id in rule_ids],
+        "rules": {str(rule_id): describe_rule(rule_id) for rule_id in set(rule_ids) if rule_id is not None},
+        "unique_inputs": len(set(inputs))
+    }), 200
+
+# User lookup cache hit rates
+@app.route('/user-cache', methods=['GET'])
+def user_cache_stats():
+    return jsonify(user_cache.stats())
+
+# Detection verdict cache counters
+@app.route('/detection/cache', methods=['GET'])
+def detection_cache_stats():
+    return jsonify(verdict_cache.stats())
+
+# Regex vs lexer engine comparison from shadow mode
+@app.route('/detection/shadow', methods=['GET'])
+def detection_shadow_stats():
+    return jsonify(shadow_stats.stats())
+
+# Password verification pool queue depth, wait and hash times
+@app.route('/password-pool', methods=['GET'])
+def password_pool_stats():
+    return jsonify(password_pool.stats())
+
+# Background log writer queue, batch and drop counters
+@app.route('/log-writer', methods=['GET'])
+def log_writer_stats():
+    return jsonify(log_writer.stats())
+
+# Size, expiry and eviction counters of the expiring login state
+@app.route('/security-state', methods=['GET'])
+def security_state_stats():
+    return jsonify({
+        "login_attempts": login_attempts.stats(),
+        "blocked_sessions": blocked_sessions.stats(),
+        "otp_store": otp_store.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "backend": state_backend.stats()
+    })
 
-    logs = [log.strip() for log in logs if "SUCCESSFUL LOGIN" in log or "FAILED LOGIN" in log or "SQLI ATTEMPT" in log or "RATE LIMITED" in log or "BLOCKED SESSION" in log or "SETTINGS" in log]
+# Log index size, segments and per-level counts for the active file
+@app.route('/log-index', methods=['GET'])
+def log_index_stats():
+    return jsonify(log_index.stats())
 
-    return jsonify({"logs": logs}), 200
+# Websocket fan-out frames, coalescing and slow-client counters
+@app.route('/log-broadcast', methods=['GET'])
+def log_broadcast_stats():
+    return jsonify(log_broadcaster.stats())
 
 # Health check endpoint 
 @app.route('/health', methods=['GET'])
@@ -398,7 +701,67 @@ def health_check():
 # WebSocket Event for React Dashboards
 @socketio.on('connect', namespace='/logs')
 def handle_connect():
+    log_broadcaster.add_client(request.sid)
     emit('message', {'data': 'Connected to WebSocket'})
 
+@socketio.on('disconnect', namespace='/logs')
+def handle_disconnect(*args):
+    log_broadcaster.remove_client(request.sid)
+
+# History and reconnect deltas for the dashboard; the return value is the ack
+@socketio.on('get_historical_logs', namespace='/logs')
+def handle_historical_logs(data=None):
+    try:
+        return query_logs(data or {})
+    except (ValueError, TypeError) as e:
+        return {"logs": [], "error": f"Invalid log query: {e}"}
+
+# ===== STARTUP =====
+
+startup_lock = threading.Lock()
+started = False
+
+def create_app():
+    """Opens the log, starts the background threads and returns the app.
+
+    Importing this module only defines things, so tests and tools that import
+    it pay nothing up front; whatever serves requests calls this once (`python
+    App.py`, `flask --app "App:create_app()" run`). Later calls just return the app.
+    """
+    global started
+    with startup_lock:
+        if started:
+            return app
+        # Loads the settings file, applying the detection settings
+        load_security_settings()
+        # Created up front so /detect-batch never builds its pool mid-request
+        get_batch_pool()
+        if state_backend.owns_log:
+            log_index.open()
+            log_writer.start()
+        else:
+            log_index.follow()
+        atexit.register(log_index.close)
+        atexit.register(log_writer.close)
+
+        # Replay the log so the chart counters survive restarts
+        aggregates.rebuild(entry for entry in (parse_entry(line, classify_logged_attack) for line in log_index.lines()) if entry)
+        log_broadcaster.start()
+        if state_backend.events is not None:
+            state_backend.events.start(handle_worker_event)
+        started = True
+    return app
+
 if __name__ == "__main__":
-    socketio.run(app, debug=True, host="0.0.0.0", port=5000)
\ No newline at end of file
+    # The debug reloader would fork a second copy of each worker behind serve_workers.py's back
+    debug = isinstance(state_backend, MemoryBackend)
+    # Under the reloader this script also runs as the parent that only watches files;
+    # just the child it spawns (WERKZEUG_RUN_MAIN=true) serves, so only that one starts up
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        create_app()
+        # Running the server directly keeps the old behaviour of creating the demo users on a fresh database
+        if state_backend.owns_log:
+            with app.app_context():
+                seed_users()
+    socketio.run(app, debug=debug, host="0.0.0.0",
+                 port=int(os.environ.get('SQLI_PORT', 5000)), allow_unsafe_werkzeug=True)
\ No newline at end of file
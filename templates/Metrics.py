@@ -5,6 +5,22 @@ import pandas as pd
 import numpy as np
 from collections import defaultdict
 from sklearn.metrics import confusion_matrix, classification_report
+from result_sink import read_results
+
+def score_predictions(y_true, y_pred):
+    """Compute the confusion matrix and accuracy/precision/recall/F1 for binary labels"""
+    # Pin the labels so a run with only one class still yields a 2x2 matrix
+    tn, fp, fn, tp = confusion_matrix(y_true, y_pred, labels=[0, 1]).ravel()
+    
+    accuracy = (tp + tn) / (tp + tn + fp + fn) if (tp + tn + fp + fn) > 0 else 0
+    precision = tp / (tp + fp) if (tp + fp) > 0 else 0
+    recall = tp / (tp + fn) if (tp + fn) > 0 else 0
+    f1_score = 2 * precision * recall / (precision + recall) if (precision + recall) > 0 else 0
+    
+    return {
+        "tn": tn, "fp": fp, "fn": fn, "tp": tp,
+        "accuracy": accuracy, "precision": precision, "recall": recall, "f1_score": f1_score
+    }
 
 def analyze_results(results):
     """Analyze test results and print summary information"""
@@ -91,14 +107,9 @@ def analyze_results(results):
         detected = result.get("detected", False)
         y_pred.append(1 if detected else 0)
     
-    # Calculate confusion matrix
-    tn, fp, fn, tp = confusion_matrix(y_true, y_pred).ravel()
-    
-    # Calculate additional metrics
-    accuracy = (tp + tn) / (tp + tn + fp + fn) if (tp + tn + fp + fn) > 0 else 0
-    precision = tp / (tp + fp) if (tp + fp) > 0 else 0
-    recall = tp / (tp + fn) if (tp + fn) > 0 else 0
-    f1_score = 2 * precision * recall / (precision + recall) if (precision + recall) > 0 else 0
+    scores = score_predictions(y_true, y_pred)
+    tn, fp, fn, tp = scores["tn"], scores["fp"], scores["fn"], scores["tp"]
+    accuracy, precision, recall, f1_score = scores["accuracy"], scores["precision"], scores["recall"], scores["f1_score"]
     
     # Print summary
     print("\n=== Test Results Summary ===")
@@ -207,8 +218,8 @@ def generate_visualizations(results, metrics, output_prefix='sqli_analysis'):
         plt.tight_layout()
         plt.savefig(f'{output_prefix}_confusion_matrix.png')
         
-        # 3. Response time analysis
-        response_times = [r.get('response_time', 0) for r in results if 'response_time' in r]
+        # 3. Response time analysis (open-loop records are timed from their intended send time)
+        response_times = [r['latency_us'] / 1e6 if 'latency_us' in r else r['response_time'] for r in results if 'response_time' in r]
         categories_for_times = [r.get('category', 'Unknown') for r in results if 'response_time' in r]
         
         time_data = pd.DataFrame({
@@ -254,7 +265,7 @@ def export_to_csv(results, output_file='sqli_results.csv'):
     
     # Select only relevant columns
     columns_to_export = [
-        'category', 'payload', 'status_code', 'response_time', 
+        'category', 'payload', 'status_code', 'response_time', 'latency_us', 'intended_offset',
         'legitimate', 'incorrect', 'detected', 'attack', 'timestamp'
     ]
     
@@ -264,23 +275,92 @@ def export_to_csv(results, output_file='sqli_results.csv'):
     df[existing_columns].to_csv(output_file, index=False)
     print(f"Results exported to CSV: {output_file}")
 
+def compare_engines(results):
+    """Re-run every payload through the regex and lexer detection engines and score both offline"""
+    from detection import ShadowStats, run_engines, set_max_input_length
+    from settings_store import SettingsStore
+    
+    # Inspect payloads only as far as the server would
+    settings = SettingsStore('security_settings.json', {}).snapshot()
+    set_max_input_length(settings.get('detection', {}).get('max_input_length', 1024))
+    
+    stats = ShadowStats()
+    y_true = []
+    y_pred = defaultdict(list)
+    
+    for result in results:
+        # True class: attack or not attack, same as analyze_results
+        is_attack = not (result.get("legitimate", False) or result.get("incorrect", False))
+        y_true.append(1 if is_attack else 0)
+        
+        payload = result.get("payload", "")
+        verdicts, timings = run_engines(payload)
+        stats.record("username", payload, verdicts, timings)
+        for engine_name, rule_id in verdicts.items():
+            y_pred[engine_name].append(0 if rule_id is None else 1)
+    
+    summary = stats.stats()
+    engine_scores = {}
+    
+    print("\n=== Detection Engine Comparison ===")
+    print(f"\nPayloads evaluated: {summary['inputs']}")
+    print(f"Engine disagreements: {summary['disagreements']}")
+    for engine_name, predictions in y_pred.items():
+        scores = score_predictions(y_true, predictions)
+        scores["mean_latency_us"] = summary["latency"][engine_name]["mean_us"]
+        scores["max_latency_us"] = summary["latency"][engine_name]["max_us"]
+        engine_scores[engine_name] = scores
+        
+        print(f"\n{engine_name}:")
+        print(f"  Accuracy: {scores['accuracy']*100:.2f}%")
+        print(f"  Precision: {scores['precision']*100:.2f}%")
+        print(f"  Recall: {scores['recall']*100:.2f}%")
+        print(f"  F1 Score: {scores['f1_score']*100:.2f}%")
+        print(f"  TP/FP/TN/FN: {scores['tp']}/{scores['fp']}/{scores['tn']}/{scores['fn']}")
+        print(f"  Latency: {scores['mean_latency_us']:.1f}us mean, {scores['max_latency_us']:.1f}us max")
+    
+    if summary["recent_disagreements"]:
+        print("\nRecent disagreements:")
+        for disagreement in summary["recent_disagreements"][-10:]:
+            print(f"- {disagreement['input']!r}: {disagreement['verdicts']}")
+    
+    return engine_scores
+
+def print_latency_summary(report):
+    """Print the per-category latency percentiles of an open-loop run"""
+    target = report.get("target", {})
+    run = report.get("run", {})
+    print(f"\nOpen-loop run: {target.get('profile')} profile, target {target.get('rate')} req/s, "
+          f"achieved {run.get('achieved_rps', 0):.1f} req/s, max send lag {run.get('max_send_lag_ms', 0):.1f}ms")
+    print(f"{'category':<24} {'count':>7} {'p50 (ms)':>9} {'p90 (ms)':>9} {'p99 (ms)':>9} {'p99.9 (ms)':>11} {'max (ms)':>9}")
+    for category, stats in report.get("latency", {}).items():
+        print(f"{category:<24} {stats['count']:>7} {stats['p50_ms']:>9.1f} {stats['p90_ms']:>9.1f} "
+              f"{stats['p99_ms']:>9.1f} {stats['p99.9_ms']:>11.1f} {stats['max_ms']:>9.1f}")
+    if run.get("errors"):
+        print(f"Errors: {run['errors']}")
+
 if __name__ == "__main__":
     # Parse command line arguments
     parser = argparse.ArgumentParser(description='SQL Injection Test Metrics Analyzer')
     parser.add_argument('--input', type=str, default='sqli_test_results.json', 
-                        help='Input JSON file with test results')
+                        help='Input file with test results: JSON array, .jsonl JSON lines, optionally .gz')
     parser.add_argument('--visualize', action='store_true',
                         help='Generate visualization graphs')
     parser.add_argument('--csv', type=str, default='',
                         help='Export results to CSV file')
     parser.add_argument('--output-prefix', type=str, default='sqli_analysis',
                         help='Prefix for output visualization files')
+    parser.add_argument('--compare-engines', action='store_true',
+                        help='Re-score every payload offline with the regex and lexer detection engines')
     args = parser.parse_args()
     
     # Load the test results
     try:
-        with open(args.input, 'r') as f:
-            results = json.load(f)
+        results, summaries = read_results(args.input)
+        
+        # Open-loop runs add a summary with their latency percentiles
+        for summary in summaries:
+            print_latency_summary(summary)
         
         # Analysis
         print(f"Analyzing results from {args.input}")
@@ -293,6 +373,10 @@ if __name__ == "__main__":
         # Optional: CSV export
         if args.csv:
             export_to_csv(results, args.csv)
+        
+        # Optional: Detection engine comparison
+        if args.compare_engines:
+            compare_engines(results)
             
     except FileNotFoundError:
         print(f"Error: Could not find input file {args.input}")
@@ -0,0 +1,208 @@
+import datetime
+import re
+import threading
+import time
+from collections import Counter
+
+from detection import attack_type, match_sql_injection
+from log_events import parse_line
+
+# `[2025-03-10 13:33:49] [IP: 127.0.0.1] [SQLI ATTEMPT] message` as written by log_event
+TEXT_ENTRY = re.compile(r"\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\] \[IP: ([^\]]*)\] \[([A-Z0-9 ]+)\] (.*)", re.DOTALL)
+
+ATTACK_LEVEL = "SQLI ATTEMPT"
+LOGGED_CREDENTIALS = re.compile(r"SQL Injection detected! Username: '(.*)', Password: '(.*)'", re.DOTALL)
+
+
+def classify_logged_attack(message):
+    """Re-runs detection on the credentials quoted in a text SQLI ATTEMPT entry."""
+    match = LOGGED_CREDENTIALS.match(message)
+    if not match:
+        return None
+    for value in match.groups():
+        rule_id = match_sql_injection(value)
+        if rule_id is not None:
+            return attack_type(rule_id)
+    return None
+
+
+def parse_entry(line, classify=None):
+    """Returns (unix time, level, ip, attack type) for a logged event, or None.
+
+    Structured events carry their attack type; for text entries `classify(message)`
+    is asked for it, if given.
+    """
+    entry = parse_line(line)
+    if isinstance(entry, dict):
+        timestamp, ip, level, message = entry["timestamp"], entry["ip"], entry["level"], entry["message"]
+        attack_type = entry.get("attack_type")
+    else:
+        match = TEXT_ENTRY.match(entry)
+        if not match:
+            return None
+        timestamp, ip, level, message = match.groups()
+        attack_type = None
+    if level == ATTACK_LEVEL and attack_type is None and classify is not None:
+        attack_type = classify(message)
+    unix_time = datetime.datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").timestamp()
+    return unix_time, level, ip, attack_type
+
+
+class RollingAggregates:
+    """Counters behind the dashboard charts, updated as events are logged.
+
+    Per-minute and per-hour buckets count events by level and are dropped
+    once they fall out of `minutes`/`hours`. Totals by level, attack type and
+    source IP and the hour-of-week heatmap of SQL injection attempts cover
+    everything since startup (or since the log was replayed with `rebuild`).
+    Attack sources keep at most about `max_ips` addresses, pruned to the most
+    common ones.
+
+    Every `add` is also folded into a pending delta that `drain_delta` hands
+    out, so connected dashboards can apply increments instead of refetching.
+    Drained deltas are numbered by `seq`, and a `snapshot` is the state as of
+    the last drained delta: a client applies only the deltas with a higher
+    `seq` than its snapshot, whichever of the two reached it first.
+    """
+
+    def __init__(self, minutes=24 * 60, hours=30 * 24, max_ips=1000):
+        self.minutes = minutes
+        self.hours = hours
+        self.max_ips = max_ips
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.reset()
+
+    def reset(self):
+        self.minute = {}
+        self.hour = {}
+        self.levels = Counter()
+        self.attack_types = Counter()
+        self.ips = Counter()
+        self.heatmap = [[0] * 24 for _ in range(7)]
+        self.delta = self.empty_delta()
+
+    @staticmethod
+    def empty_delta():
+        return {"minute": {}, "hour": {}, "levels": Counter(), "attack_types": Counter(), "ips": Counter(), "heatmap": Counter()}
+
+    def add(self, unix_time, level, ip, attack_type=None):
+        with self.lock:
+            self.count(unix_time, level, ip, attack_type, self.delta)
+
+    def count(self, unix_time, level, ip, attack_type, delta=None):
+        minute = int(unix_time // 60 * 60)
+        hour = int(unix_time // 3600 * 3600)
+        for buckets, key, window in ((self.minute, minute, self.minutes * 60), (self.hour, hour, self.hours * 3600)):
+            if key not in buckets:
+                if key < time.time() - window:
+                    continue
+                buckets[key] = Counter()
+                self.expire(buckets, window)
+            buckets[key][level] += 1
+        self.levels[level] += 1
+
+        if level == ATTACK_LEVEL:
+            self.attack_types[attack_type or "Unknown"] += 1
+            self.ips[ip] += 1
+            if len(self.ips) > 2 * self.max_ips:
+                self.ips = Counter(dict(self.ips.most_common(self.max_ips)))
+            local = datetime.datetime.fromtimestamp(unix_time)
+            self.heatmap[local.weekday()][local.hour] += 1
+
+        if delta is not None:
+            delta["minute"].setdefault(minute, Counter())[level] += 1
+            delta["hour"].setdefault(hour, Counter())[level] += 1
+            delta["levels"][level] += 1
+            if level == ATTACK_LEVEL:
+                delta["attack_types"][attack_type or "Unknown"] += 1
+                delta["ips"][ip] += 1
+                delta["heatmap"][(local.weekday(), local.hour)] += 1
+
+    @staticmethod
+    def expire(buckets, window):
+        # Buckets are created in time order, so the oldest come first
+        cutoff = time.time() - window
+        while buckets:
+            oldest = next(iter(buckets))
+            if oldest >= cutoff:
+                break
+            del buckets[oldest]
+
+    def rebuild(self, entries):
+        """Replaces every counter with the totals for (unix time, level, ip, attack type) entries."""
+        with self.lock:
+            self.reset()
+            for entry in entries:
+                self.count(*entry)
+            # Replayed entries are not news to connected dashboards
+            self.delta = self.empty_delta()
+
+    def drain_delta(self):
+        """Returns the increments since the last call as JSON-ready data, or None."""
+        with self.lock:
+            delta, self.delta = self.delta, self.empty_delta()
+            if not delta["levels"]:
+                return None
+            self.seq += 1
+            seq = self.seq
+        return {
+            "seq": seq,
+            "minute": {str(key): dict(counts) for key, counts in delta["minute"].items()},
+            "hour": {str(key): dict(counts) for key, counts in delta["hour"].items()},
+            "levels": dict(delta["levels"]),
+            "attack_types": dict(delta["attack_types"]),
+            "ips": dict(delta["ips"]),
+            "heatmap": [[day, hour, count] for (day, hour), count in delta["heatmap"].items()],
+        }
+
+    def snapshot(self, minutes=60, hours=24, top=10):
+        """Returns the last `minutes`/`hours` of buckets and the totals, JSON-ready.
+
+        Counts still waiting in the pending delta are left out; they reach the
+        client with the delta numbered `seq + 1`.
+        """
+        now = time.time()
+        with self.lock:
+            self.expire(self.minute, self.minutes * 60)
+            self.expire(self.hour, self.hours * 3600)
+            pending = self.delta
+
+            def buckets(counters, pending_counters, since):
+                settled = ((key, counts - pending_counters.get(key, Counter())) for key, counts in counters.items() if key >= since)
+                return [{"time": key, "counts": dict(counts)} for key, counts in settled if counts]
+
+            heatmap = [row[:] for row in self.heatmap]
+            for (day, hour), count in pending["heatmap"].items():
+                heatmap[day][hour] -= count
+            return {
+                "seq": self.seq,
+                "generated_at": now,
+                "minute": buckets(self.minute, pending["minute"], now - minutes * 60),
+                "hour": buckets(self.hour, pending["hour"], now - hours * 3600),
+                "levels": dict(self.levels - pending["levels"]),
+                "attack_types": dict(self.attack_types - pending["attack_types"]),
+                "top_ips": [{"ip": ip, "count": count} for ip, count in (self.ips - pending["ips"]).most_common(top)],
+                "heatmap": heatmap,
+            }
+
+    @staticmethod
+    def merge_deltas(older, newer):
+        """Combines two drained deltas into one spanning `first_seq` to `seq`."""
+        def add(a, b):
+            merged = Counter(a)
+            merged.update(b)
+            return dict(merged)
+
+        heatmap = Counter({(day, hour): count for day, hour, count in older["heatmap"]})
+        heatmap.update({(day, hour): count for day, hour, count in newer["heatmap"]})
+        return {
+            "first_seq": older.get("first_seq", older["seq"]),
+            "seq": newer["seq"],
+            "minute": {key: add(older["minute"].get(key, {}), newer["minute"].get(key, {})) for key in {**older["minute"], **newer["minute"]}},
+            "hour": {key: add(older["hour"].get(key, {}), newer["hour"].get(key, {})) for key in {**older["hour"], **newer["hour"]}},
+            "levels": add(older["levels"], newer["levels"]),
+            "attack_types": add(older["attack_types"], newer["attack_types"]),
+            "ips": add(older["ips"], newer["ips"]),
+            "heatmap": [[day, hour, count] for (day, hour), count in heatmap.items()],
+        }
@@ -1,4 +1,10 @@
 import sys
+import os
+import glob
+import signal
+import subprocess
+import asyncio
+import threading
 import requests
 import time
 import random
@@ -6,8 +12,14 @@ import argparse
 import datetime
 import logging
 import json
-from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict
+from collections.abc import Sequence
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from faker import Faker
+from load_client import ConnectionPool, raise_open_file_limit
+from latency_histogram import LatencyHistogram
+from result_sink import FIELD_SETS, ResultSink, iter_results
+from payload_mutator import PayloadMutator
 
 # Setup logging
 logging.basicConfig(
@@ -89,244 +101,615 @@ def create_random_user_agent():
     ]
     return random.choice(browsers)
 
-def generate_incorrect_login():
+def generate_incorrect_login(faker=fake):
     """Generate a random, incorrect login attempt"""
-    return (fake.user_name(), fake.password())
+    return (faker.user_name(), faker.password())
 
-def send_login_request(payload, category=None, password=None, use_random_ip=True, url="http://localhost:5000/login"):
+def build_login_request(payload, category=None, password=None, use_random_ip=True):
+    """Build the JSON body and headers for one login attempt"""
+    # Setup headers with random or fixed IP
+    headers = {
+        "Content-Type": "application/json",
+        "User-Agent": create_random_user_agent(),
+    }
+    
+    if use_random_ip:
+        headers["X-Forwarded-For"] = generate_random_ip()
+    
+    # For legitimate logins, use the correct password from VALID_USERS
+    if category == "Legitimate" and payload in VALID_USERS:
+        password_to_use = VALID_USERS[payload]
+    else:
+        password_to_use = password if password else "invalid_password"
+    
+    # Prepare payload
+    data = {
+        "username": payload,
+        "password": password_to_use
+    }
+    return data, headers
+
+def build_result(payload, category, data, headers, status_code, response_time, response_content, log_request=True):
+    """Turn one response into the result record that Metrics.py reads"""
+    # Determine if this is a legitimate login attempt
+    is_legitimate = category == "Legitimate"
+    is_incorrect = category == "Incorrect"
+    
+    # Prepare password for logging (redact for security except for legitimate logins)
+    log_password = data["password"] if is_legitimate else '[REDACTED]'
+    
+    # Log the attempt details
+    if log_request:
+        log_message = (
+            f"Category: {category}\n"
+            f"Payload: {payload}\n"
+            f"Password: {log_password}\n"
+            f"Status: {status_code}\n"
+            f"Response Time: {response_time:.2f}s\n"
+            f"Response: {str(response_content)[:100]}...\n"
+            f"IP: {headers.get('X-Forwarded-For', 'default')}\n"
+            f"{'='*50}"
+        )
+        logging.info(log_message)
+    
+    # Attempt to extract error messages or specific patterns that could identify detection
+    error_indicators = [
+        "sql", "injection", "attack", "malicious", "invalid", "syntax", "error", 
+        "blocked", "detected", "security", "violation", "forbidden"
+    ]
+    
+    # Check response for error indicators
+    detected = False
+    if status_code in [400, 403, 429]:
+        detected = True
+    else:
+        response_text = str(response_content).lower()
+        for indicator in error_indicators:
+            if indicator in response_text:
+                detected = True
+                break
+    
+    return {
+        "category": category,
+        "payload": payload,
+        "password": log_password,
+        "status_code": status_code,
+        "response_time": response_time,
+        "response_text": str(response_content),
+        "ip": headers.get("X-Forwarded-For"),
+        "timestamp": datetime.datetime.now().isoformat(),
+        "legitimate": is_legitimate,
+        "incorrect": is_incorrect,
+        "detected": detected,
+        "attack": not (is_legitimate or is_incorrect)
+    }
+
+def build_error_result(payload, category, error):
+    """Result record for a request that never got a response"""
+    logging.error(f"Error sending request with payload '{payload}': {str(error)}")
+    return {
+        "category": category,
+        "payload": payload,
+        "error": str(error),
+        "timestamp": datetime.datetime.now().isoformat(),
+        "legitimate": category == "Legitimate",
+        "incorrect": category == "Incorrect",
+        "detected": False,
+        "attack": not (category == "Legitimate" or category == "Incorrect")
+    }
+
+def send_login_request(payload, category=None, password=None, use_random_ip=True, url="http://localhost:5000/login", session=None):
     """Send a login request with an SQL injection payload or legitimate credentials"""
     try:
-        # Setup headers with random or fixed IP
-        headers = {
-            "Content-Type": "application/json",
-            "User-Agent": create_random_user_agent(),
-        }
-        
-        if use_random_ip:
-            headers["X-Forwarded-For"] = generate_random_ip()
-        
-        # Determine if this is a legitimate login attempt
-        is_legitimate = category == "Legitimate"
-        is_incorrect = category == "Incorrect"
-        
-        # For legitimate logins, use the correct password from VALID_USERS
-        if is_legitimate and payload in VALID_USERS:
-            password_to_use = VALID_USERS[payload]
-        else:
-            password_to_use = password if password else "invalid_password"
-        
-        # Prepare payload
-        data = {
-            "username": payload,
-            "password": password_to_use
-        }
+        data, headers = build_login_request(payload, category, password, use_random_ip)
         
         # Add timing for performance measurement
         start_time = time.time()
-        response = requests.post(url, json=data, headers=headers)
+        response = (session or requests).post(url, json=data, headers=headers)
         response_time = time.time() - start_time
         
-        # Prepare password for logging (redact for security except for legitimate logins)
-        log_password = password_to_use if is_legitimate else '[REDACTED]'
-        
         # Parse response content
         try:
             response_content = response.json()
         except:
             response_content = response.text
-            
-        # Log the attempt details
-        log_message = (
-            f"Category: {category}\n"
-            f"Payload: {payload}\n"
-            f"Password: {log_password}\n"
-            f"Status: {response.status_code}\n"
-            f"Response Time: {response_time:.2f}s\n"
-            f"Response: {str(response_content)[:100]}...\n"
-            f"IP: {headers.get('X-Forwarded-For', 'default')}\n"
-            f"{'='*50}"
-        )
-        logging.info(log_message)
         
-        # Attempt to extract error messages or specific patterns that could identify detection
-        error_indicators = [
-            "sql", "injection", "attack", "malicious", "invalid", "syntax", "error", 
-            "blocked", "detected", "security", "violation", "forbidden"
-        ]
+        return build_result(payload, category, data, headers, response.status_code, response_time, response_content)
+    
+    except Exception as e:
+        return build_error_result(payload, category, e)
+
+async def send_login_request_async(pool, payload, category=None, password=None, use_random_ip=True, log_request=False):
+    """Send a login request over a keep-alive connection from `pool`"""
+    try:
+        data, headers = build_login_request(payload, category, password, use_random_ip)
+        del headers["Content-Type"]  # set by the pool
         
-        # Check response for error indicators
-        detected = False
-        if response.status_code in [400, 403, 429]:
-            detected = True
-        else:
-            response_text = str(response_content).lower()
-            for indicator in error_indicators:
-                if indicator in response_text:
-                    detected = True
-                    break
+        start_time = time.perf_counter()
+        status_code, _, body = await pool.post_json(json.dumps(data).encode("utf-8"), headers)
+        response_time = time.perf_counter() - start_time
+        
+        try:
+            response_content = json.loads(body)
+        except ValueError:
+            response_content = body.decode("utf-8", errors="replace")
         
-        return {
-            "category": category,
-            "payload": payload,
-            "password": log_password if is_legitimate else '[REDACTED]',
-            "status_code": response.status_code,
-            "response_time": response_time,
-            "response_text": str(response_content),
-            "ip": headers.get("X-Forwarded-For"),
-            "timestamp": datetime.datetime.now().isoformat(),
-            "legitimate": is_legitimate,
-            "incorrect": is_incorrect,
-            "detected": detected,
-            "attack": not (is_legitimate or is_incorrect)
-        }
+        return build_result(payload, category, data, headers, status_code, response_time, response_content, log_request)
     
     except Exception as e:
-        logging.error(f"Error sending request with payload '{payload}': {str(e)}")
-        return {
-            "category": category,
-            "payload": payload,
-            "error": str(e),
-            "timestamp": datetime.datetime.now().isoformat(),
-            "legitimate": category == "Legitimate",
-            "incorrect": category == "Incorrect",
-            "detected": False,
-            "attack": not (category == "Legitimate" or category == "Incorrect")
-        }
-
-def run_test_sequence(num_requests=100, delay_between_requests=0.5, categories=None, legitimate_percent=10, incorrect_percent=20, url="http://localhost:5000/login"):
-    """Run a sequence of SQL injection tests with some legitimate and incorrect login attempts"""
-    results = []
-    
-    # If no specific categories are requested, use all
-    if not categories:
-        categories = list(SQLI_PAYLOADS.keys())
-    
-    # Calculate number of legitimate, incorrect, and attack requests
-    num_legitimate = int(num_requests * (legitimate_percent / 100))
-    num_incorrect = int(num_requests * (incorrect_percent / 100))
-    num_attacks = num_requests - num_legitimate - num_incorrect
+        return build_error_result(payload, category, e)
+
+def load_corpus(path, categories=None):
+    """The {"category", "payload"} records of an exported corpus, for replay by index"""
+    records = [{"category": record["category"], "payload": record["payload"]}
+               for record in iter_results(path) if not categories or record["category"] in categories]
+    if not records:
+        raise ValueError(f"No payloads for {categories or 'any category'} in {path}")
+    return records
+
+def attack_source(mutate=False, corpus=None, categories=None, seed=None, max_mutations=3):
+    """Attack records for WorkerPlan by index: replayed from `corpus` (starting over when it runs out), generated by PayloadMutator, or None for the fixed list"""
+    if corpus:
+        records = load_corpus(corpus, categories)
+        return lambda index: records[index % len(records)]
+    if mutate:
+        return PayloadMutator(SQLI_PAYLOADS, seed, max_mutations, categories=categories).variant
+    return None
+
+def export_corpus(filename, count, seed=0, max_mutations=3, categories=None):
+    """Write `count` mutated payloads to `filename` (JSON lines, .gz to compress) for replay offline or over HTTP"""
+    with ResultSink(filename) as sink:
+        for record in PayloadMutator(SQLI_PAYLOADS, seed, max_mutations, categories=categories).stream(count):
+            sink.write(record)
     
-    # Make sure we have at least one legitimate login attempt
-    if num_legitimate < 1 and legitimate_percent > 0:
-        num_legitimate = 1
-        num_attacks -= 1  # Reduce attack count to maintain total request count
+    logging.info(f"Exported {sink.count} payloads to {filename}")
+    return sink.count
+
+class WorkerPlan(Sequence):
+    """Worker `worker_index` of `worker_count`'s share of the test plan, as (payload, category, password) tuples
     
-    # Build a list of attack payloads from the requested categories
-    attack_payloads = []
-    attack_categories = []
+    The full plan mixes attacks, legitimate and incorrect logins in the given
+    proportions. Each entry is derived from `seed` and its position alone, so
+    a worker generates just its own entries (every `worker_count`-th, from
+    `worker_index`) when they are read, and together the workers send exactly
+    the plan a single process would. A seeded permutation of the positions
+    (a small Feistel network) decides which entries are attacks, legitimate or
+    incorrect, so the counts are exact while the kinds are shuffled.
     
-    # Distribute the requested number of payloads across categories
-    payloads_per_category = max(1, num_attacks // len(categories))
-    remaining = num_attacks
+    Attack payloads are drawn from SQLI_PAYLOADS, cycling through `categories`,
+    or taken from `attacks(k)` for the k-th attack, as attack_source returns.
+    """
     
-    for category in categories:
-        # Get payloads for this category
-        category_payloads = SQLI_PAYLOADS[category]
+    def __init__(self, num_requests=100, categories=None, legitimate_percent=10, incorrect_percent=20, seed=None, worker_index=0, worker_count=1, attacks=None):
+        # If no specific categories are requested, use all
+        self.categories = categories or list(SQLI_PAYLOADS.keys())
+        self.attacks = attacks
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.indices = range(worker_index, num_requests, worker_count)
+        self.fake = Faker()
         
-        # How many to select from this category
-        n_select = min(payloads_per_category, len(category_payloads), remaining)
+        # Calculate number of legitimate, incorrect, and attack requests
+        self.num_requests = num_requests
+        self.num_legitimate = int(num_requests * (legitimate_percent / 100))
+        self.num_incorrect = int(num_requests * (incorrect_percent / 100))
         
-        # Randomly select payloads from this category
-        selected = random.sample(category_payloads, n_select) if n_select <= len(category_payloads) else category_payloads
+        # Make sure we have at least one legitimate login attempt
+        if self.num_legitimate < 1 and legitimate_percent > 0:
+            self.num_legitimate = 1
+        self.num_attacks = num_requests - self.num_legitimate - self.num_incorrect
         
-        for payload in selected:
-            attack_payloads.append(payload)
-            attack_categories.append(category)
-            remaining -= 1
-            
-            if remaining <= 0:
-                break
-                
-        if remaining <= 0:
-            break
-    
-    # If we still have remaining attack payloads to select, add more from random categories
-    while remaining > 0:
-        category = random.choice(categories)
-        payload = random.choice(SQLI_PAYLOADS[category])
-        attack_payloads.append(payload)
-        attack_categories.append(category)
-        remaining -= 1
-    
-    # Create legitimate login attempts using valid credentials
-    legitimate_payloads = []
-    legitimate_categories = []
-    
-    for _ in range(num_legitimate):
-        user = random.choice(list(VALID_USERS.keys()))
-        legitimate_payloads.append(user)
-        legitimate_categories.append("Legitimate")
-    
-    # Create incorrect login attempts
-    incorrect_payloads = []
-    incorrect_categories = []
-    incorrect_passwords = []
-    
-    for _ in range(num_incorrect):
-        username, password = generate_incorrect_login()
-        incorrect_payloads.append(username)
-        incorrect_categories.append("Incorrect")
-        incorrect_passwords.append(password)
-    
-    # Combine all payloads and categories
-    all_payloads = attack_payloads + legitimate_payloads + incorrect_payloads
-    all_categories = attack_categories + legitimate_categories + incorrect_categories
-    
-    # Add the incorrect passwords to a combined list with None for other types
-    all_passwords = [None] * len(attack_payloads + legitimate_payloads) + incorrect_passwords
-    
-    # Shuffle them together to mix legitimate, incorrect, and attack traffic
-    combined = list(zip(all_payloads, all_categories, all_passwords))
-    random.shuffle(combined)
-    all_payloads, all_categories, all_passwords = zip(*combined)
+        # The permutation works on 2 * half_bits-bit numbers, at most four times num_requests
+        rng = random.Random(f"{self.seed}:plan")
+        self.half_bits = ((num_requests - 1).bit_length() + 1) // 2
+        self.round_keys = [rng.getrandbits(32) for _ in range(4)]
+    
+    def __len__(self):
+        return len(self.indices)
+    
+    def __getitem__(self, index):
+        return self.entry(self.indices[index])
+    
+    def slot(self, position):
+        """Where `position` lands in the unshuffled plan: attacks first, then legitimate, then incorrect logins"""
+        mask = (1 << self.half_bits) - 1
+        while True:
+            left, right = position >> self.half_bits, position & mask
+            for key in self.round_keys:
+                left, right = right, left ^ ((right * 0x9E3779B1 ^ key) * 0x85EBCA6B >> 7 & mask)
+            position = left << self.half_bits | right
+            # Walk the cycle until it lands back inside the plan
+            if position < self.num_requests:
+                return position
+    
+    def entry(self, position):
+        """Entry `position` of the full plan"""
+        slot = self.slot(position)
+        rng = random.Random(f"{self.seed}:plan:{position}")
+        if slot < self.num_attacks:
+            if self.attacks is not None:
+                record = self.attacks(slot)
+                return record["payload"], record["category"], None
+            category = self.categories[slot % len(self.categories)]
+            return rng.choice(SQLI_PAYLOADS[category]), category, None
+        if slot < self.num_attacks + self.num_legitimate:
+            return rng.choice(list(VALID_USERS.keys())), "Legitimate", None
+        self.fake.random = rng
+        username, password = generate_incorrect_login(self.fake)
+        return username, "Incorrect", password
+
+def seed_generators(seed):
+    """Seed `random` and Faker so a plan and the traffic generated from it can be reproduced"""
+    random.seed(seed)
+    Faker.seed(seed)
+
+def build_worker_plan(num_requests, categories=None, legitimate_percent=10, incorrect_percent=20, seed=None, worker_index=0, worker_count=1, attacks=None):
+    """Worker `worker_index` of `worker_count`'s share of the test plan (see WorkerPlan)
+    
+    The generators are then reseeded per worker so their random IPs, user
+    agents and delays differ.
+    """
+    plan = WorkerPlan(num_requests, categories, legitimate_percent, incorrect_percent, seed, worker_index, worker_count, attacks)
+    if seed is not None:
+        seed_generators(f"{seed}:{worker_index}")
+    return plan
+
+def wait_until(start_at):
+    """Sleep until the wall-clock time `start_at` agreed between workers, if any"""
+    if start_at is None:
+        return
+    delay = start_at - time.time()
+    if delay > 0:
+        time.sleep(delay)
+    else:
+        logging.warning(f"Started {-delay:.2f}s after the agreed start time")
+
+def run_threaded(plan, delay_between_requests=0.5, url="http://localhost:5000/login", concurrency=10, emit=None):
+    """Send the plan from a thread pool, one keep-alive session per thread
+    
+    Each result is passed to `emit` as soon as its request completes; at most
+    twice `concurrency` requests are queued or in flight at once, so memory
+    does not grow with the length of the plan.
+    """
+    local = threading.local()
+    
+    def send(payload, category, password):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return send_login_request(payload, category, password, True, url, local.session)
     
     # Run the tests sequentially or in parallel
-    use_parallel = num_requests > 10  # Use parallel for larger tests
+    use_parallel = len(plan) > 10  # Use parallel for larger tests
     
     if use_parallel:
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            futures = []
-            for i, payload in enumerate(all_payloads):
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            in_flight = set()
+            for payload, category, password in plan:
+                if len(in_flight) >= 2 * concurrency:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        emit(future.result())
                 # Add random delay to simulate more realistic traffic
                 time.sleep(random.uniform(0, delay_between_requests))
-                
-                # Use the appropriate password
-                password = all_passwords[i]
-                
-                futures.append(executor.submit(
-                    send_login_request, 
-                    payload, 
-                    all_categories[i],
-                    password,
-                    True,
-                    url
-                ))
+                in_flight.add(executor.submit(send, payload, category, password))
             
-            for future in futures:
-                results.append(future.result())
+            for future in in_flight:
+                emit(future.result())
     else:
-        for i, payload in enumerate(all_payloads):
-            # Use the appropriate password
-            password = all_passwords[i]
-            
-            results.append(send_login_request(
-                payload, 
-                all_categories[i],
-                password,
-                True,
-                url
-            ))
+        for payload, category, password in plan:
+            emit(send(payload, category, password))
             time.sleep(delay_between_requests)
+
+async def run_async(plan, think_time=0.0, url="http://localhost:5000/login", concurrency=1000, log_requests=False, emit=None):
+    """Send the plan from `concurrency` asyncio virtual users sharing a keep-alive pool
+    
+    Each virtual user sends its next request as soon as the previous one
+    answers, after an optional random think time of up to `think_time` seconds.
+    Results are passed to `emit` as they arrive.
+    """
+    raise_open_file_limit(concurrency + 256)
+    pool = ConnectionPool(url, size=concurrency)
+    pending = iter(plan)
+    
+    async def virtual_user():
+        for payload, category, password in pending:
+            emit(await send_login_request_async(pool, payload, category, password, True, log_requests))
+            if think_time:
+                await asyncio.sleep(random.uniform(0, think_time))
+    
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(virtual_user() for _ in range(min(concurrency, len(plan)))))
+    finally:
+        await pool.close()
+    elapsed = time.perf_counter() - started
+    logging.info(f"Sent {len(plan)} requests in {elapsed:.2f}s ({len(plan) / elapsed:.0f} req/s), connections: {pool.stats()}")
+
+RATE_PROFILES = ("constant", "step", "linear", "spike")
+
+def rate_at(elapsed, duration, rate, profile="constant", start_rate=None, steps=5, spike_factor=5.0):
+    """Target requests per second `elapsed` seconds into an open-loop run of `duration` seconds
+    
+    constant holds `rate`; linear ramps from `start_rate` to `rate`; step climbs
+    there in `steps` equal steps; spike holds `rate` but sends `spike_factor`
+    times that through the middle tenth of the run.
+    """
+    start_rate = rate / 10 if start_rate is None else start_rate
+    progress = min(1.0, elapsed / duration)
+    if profile == "linear":
+        return start_rate + (rate - start_rate) * progress
+    if profile == "step":
+        step = min(steps - 1, int(progress * steps))
+        return start_rate + (rate - start_rate) * step / max(1, steps - 1)
+    if profile == "spike":
+        return rate * spike_factor if 0.45 <= progress < 0.55 else rate
+    return rate
+
+def build_schedule(duration, rate, profile="constant", **profile_options):
+    """Intended send times, in seconds from the start, for an open-loop run"""
+    times = []
+    elapsed = 0.0
+    while elapsed < duration:
+        current_rate = rate_at(elapsed, duration, rate, profile, **profile_options)
+        if current_rate <= 0:
+            elapsed += 0.01
+            continue
+        times.append(elapsed)
+        elapsed += 1 / current_rate
+    return times
+
+async def run_open_loop(schedule, plan, url="http://localhost:5000/login", max_connections=1000, log_requests=False, emit=None):
+    """Send plan[i] at schedule[i] seconds from the start, whether or not earlier requests have answered
+    
+    Latency is measured from the intended send time, not from when the request
+    actually went out, so time spent queued behind a slow server (or a busy
+    event loop) is counted instead of silently omitted. Latencies go into one
+    histogram per category plus "All"; the records themselves go to `emit`
+    with the same `latency_us` and their `intended_offset` from the start.
+    
+    Ctrl-C stops sending new requests but still waits for those in flight
+    and returns the statistics so far, marked "interrupted".
+    """
+    raise_open_file_limit(max_connections + 256)
+    pool = ConnectionPool(url, size=max_connections)
+    histograms = defaultdict(LatencyHistogram)
+    errors = defaultdict(int)
+    max_lag = 0.0
+    sent = 0
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    try:
+        loop.add_signal_handler(signal.SIGINT, stop.set)
+        handling_interrupt = True
+    except NotImplementedError:
+        # Windows: Ctrl-C aborts the run instead
+        handling_interrupt = False
+    
+    async def fire(i, intended):
+        payload, category, password = plan[i]
+        result = await send_login_request_async(pool, payload, category, password, True, log_requests)
+        latency_us = (time.perf_counter() - intended) * 1e6
+        result["intended_offset"] = schedule[i]
+        result["latency_us"] = latency_us
+        if "error" in result:
+            errors[category] += 1
+        else:
+            histograms[category].record(latency_us)
+            histograms["All"].record(latency_us)
+        emit(result)
+    
+    # Only unfinished requests are kept, so a long run doesn't pile up task objects
+    in_flight = set()
+    started = time.perf_counter()
+    try:
+        for i, offset in enumerate(schedule):
+            intended = started + offset
+            wait = intended - time.perf_counter()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            else:
+                max_lag = max(max_lag, -wait)
+            if stop.is_set():
+                break
+            task = asyncio.create_task(fire(i, intended))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            sent += 1
+        if handling_interrupt:
+            # A second Ctrl-C while draining aborts as usual
+            loop.remove_signal_handler(signal.SIGINT)
+        await asyncio.gather(*in_flight)
+    finally:
+        await pool.close()
+    elapsed = time.perf_counter() - started
+    
+    stats = {
+        "sent": sent,
+        "elapsed_s": elapsed,
+        "achieved_rps": sent / elapsed if elapsed else 0.0,
+        "max_send_lag_ms": max_lag * 1000,
+        "errors": dict(errors),
+        "connections": pool.stats()
+    }
+    if stop.is_set():
+        stats["interrupted"] = True
+    return histograms, stats
+
+def run_open_loop_test(rate, duration, profile="constant", start_rate=None, steps=5, spike_factor=5.0, legitimate_percent=10, incorrect_percent=20, url="http://localhost:5000/login", max_connections=1000, log_requests=False, sink=None, seed=None, worker_index=0, worker_count=1, start_at=None, attacks=None):
+    """Run an open-loop test and return its per-category latency percentiles
+    
+    With a `sink` the records are streamed to it and the report is written
+    after them as a `"record": "summary"` entry; without one the report also
+    carries the records under "results".
     
-    return results
+    As one of `worker_count` workers, only every `worker_count`-th arrival of
+    the full schedule is sent, which splits `rate` evenly between workers.
+    """
+    schedule = build_schedule(duration, rate, profile, start_rate=start_rate, steps=steps, spike_factor=spike_factor)
+    # Generated up front, so the send loop does not pay for it at high rates
+    plan = list(build_worker_plan(len(schedule), None, legitimate_percent, incorrect_percent, seed, worker_index, worker_count, attacks))
+    schedule = schedule[worker_index::worker_count]
+    # Arrival times are relative to the start, so every worker's offset is kept
+    wait_until(start_at)
+    results = []
+    emit = sink.write if sink else results.append
+    histograms, stats = asyncio.run(run_open_loop(schedule, plan, url, max_connections, log_requests, emit))
+    logging.info(f"Open loop: {stats['sent']} requests in {stats['elapsed_s']:.2f}s ({stats['achieved_rps']:.0f} req/s), "
+                 f"p99 {histograms['All'].percentile(99) / 1000:.1f}ms")
+    
+    report = {
+        "mode": "open-loop",
+        "target": {"rate": rate, "duration": duration, "profile": profile, "start_rate": start_rate,
+                   "steps": steps, "spike_factor": spike_factor},
+        "run": stats,
+        "latency": {category: {**histogram.summary(), "histogram": histogram.to_dict()}
+                    for category, histogram in sorted(histograms.items())}
+    }
+    if sink:
+        sink.write({"record": "summary", **report})
+    if stats.get("interrupted"):
+        raise KeyboardInterrupt
+    return report if sink else {**report, "results": results}
 
-def save_results_to_file(results, filename="sqli_test_results.json"):
-    """Save test results to a JSON file"""
-    with open(filename, "w") as f:
-        json.dump(results, f, indent=2)
+def run_test_sequence(num_requests=100, delay_between_requests=0.5, categories=None, legitimate_percent=10, incorrect_percent=20, url="http://localhost:5000/login", engine="threads", concurrency=10, log_requests=False, sink=None, seed=None, worker_index=0, worker_count=1, start_at=None, attacks=None):
+    """Run a sequence of SQL injection tests with some legitimate and incorrect login attempts
+    
+    engine "threads" sends from a thread pool with a random pause of up to
+    `delay_between_requests` between submissions; "async" runs `concurrency`
+    asyncio virtual users over keep-alive connections, with the delay used as
+    each user's maximum think time.
+    
+    Results are written to `sink` as they complete and the number written is
+    returned; without a sink they are collected and returned as a list.
+    As one of `worker_count` workers only that worker's share of the plan is sent.
+    """
+    plan = build_worker_plan(num_requests, categories, legitimate_percent, incorrect_percent, seed, worker_index, worker_count, attacks)
+    wait_until(start_at)
+    results = []
+    emit = sink.write if sink else results.append
+    if engine == "async":
+        asyncio.run(run_async(plan, delay_between_requests, url, concurrency, log_requests, emit))
+    else:
+        run_threaded(plan, delay_between_requests, url, concurrency, emit)
+    return sink.count if sink else results
+
+def save_results_to_file(results, filename="sqli_test_results.json", fields="full"):
+    """Save a list of test results in the format given by the file name (see ResultSink)"""
+    with ResultSink(filename, fields) as sink:
+        for result in results:
+            sink.write(result)
     
     logging.info(f"Results saved to {filename}")
 
+def merge_summaries(summaries):
+    """Combine the open-loop summaries of several workers into one
+    
+    Latency histograms are merged bucket by bucket, so the percentiles are
+    those of all requests together rather than an average of percentiles.
+    Workers start together, so the slowest one's elapsed time is the run's.
+    """
+    histograms = {}
+    for summary in summaries:
+        for category, stats in summary["latency"].items():
+            histogram = LatencyHistogram.from_dict(stats["histogram"])
+            histograms.setdefault(category, LatencyHistogram(histogram.significant_digits)).merge(histogram)
+    
+    runs = [summary["run"] for summary in summaries]
+    sent = sum(run["sent"] for run in runs)
+    elapsed = max(run["elapsed_s"] for run in runs)
+    errors = defaultdict(int)
+    connections = defaultdict(int)
+    for run in runs:
+        for category, count in run["errors"].items():
+            errors[category] += count
+        for name, count in run["connections"].items():
+            connections[name] += count
+    
+    merged = {
+        "record": "summary",
+        "mode": summaries[0]["mode"],
+        "target": summaries[0]["target"],
+        "run": {
+            "sent": sent,
+            "elapsed_s": elapsed,
+            "achieved_rps": sent / elapsed if elapsed else 0.0,
+            "max_send_lag_ms": max(run["max_send_lag_ms"] for run in runs),
+            "errors": dict(errors),
+            "connections": dict(connections),
+            "workers": len(runs)
+        },
+        "latency": {category: {**histogram.summary(), "histogram": histogram.to_dict()}
+                    for category, histogram in sorted(histograms.items())}
+    }
+    if any(run.get("interrupted") for run in runs):
+        merged["run"]["interrupted"] = True
+    return merged
+
+def find_shards(shard_dir):
+    """Worker result files in `shard_dir`, in worker order"""
+    paths = glob.glob(os.path.join(shard_dir, "worker-*.jsonl")) + glob.glob(os.path.join(shard_dir, "worker-*.jsonl.gz"))
+    return sorted(paths, key=lambda path: int(os.path.basename(path).split("-")[1].split(".")[0]))
+
+def merge_shards(paths, filename="sqli_test_results.json", fields="full"):
+    """Stream every worker's records into one results file, followed by a merged summary if the run was open-loop"""
+    summaries = []
+    with ResultSink(filename, fields) as sink:
+        for path in paths:
+            for record in iter_results(path):
+                if record.get("record") == "summary":
+                    summaries.append(record)
+                else:
+                    sink.write(record)
+        if summaries:
+            sink.write(merge_summaries(summaries))
+    
+    logging.info(f"Merged {sink.count} records from {len(paths)} shards into {filename}")
+    return sink.count
+
+# Options a coordinator hands on to its workers unchanged
+WORKER_OPTIONS = ("url", "requests", "delay", "legitimate", "incorrect", "engine", "concurrency", "rate",
+                  "duration", "profile", "start_rate", "steps", "spike_factor", "fields", "flush_interval", "corpus",
+                  "max_mutations")
+
+def run_workers(args, start_delay=5.0):
+    """Run this test as `args.workers` local worker processes and merge their shards into `args.output`
+    
+    Each worker writes worker-<index>.jsonl in `args.shard_dir`. They share a
+    seed and a start time `start_delay` seconds ahead, which leaves them time
+    to import and build their plans before sending in step.
+    """
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    start_at = time.time() + start_delay
+    suffix = ".jsonl.gz" if args.output.endswith(".gz") else ".jsonl"
+    os.makedirs(args.shard_dir, exist_ok=True)
+    for stale in find_shards(args.shard_dir):
+        os.remove(stale)
+    logging.info(f"Starting {args.workers} workers with seed {seed}, shards in {args.shard_dir}")
+    
+    processes = []
+    for index in range(args.workers):
+        command = [sys.executable, os.path.abspath(__file__)]
+        for name in WORKER_OPTIONS:
+            value = getattr(args, name)
+            if value is not None:
+                command += [f"--{name.replace('_', '-')}", str(value)]
+        if args.log_requests:
+            command.append("--log-requests")
+        if args.mutate:
+            command.append("--mutate")
+        command += ["--seed", str(seed), "--worker-index", str(index), "--worker-count", str(args.workers),
+                    "--start-at", repr(start_at), "--output", os.path.join(args.shard_dir, f"worker-{index}{suffix}")]
+        processes.append(subprocess.Popen(command))
+    
+    try:
+        codes = [process.wait() for process in processes]
+    except KeyboardInterrupt:
+        # The workers got the same Ctrl-C; let them close their shards, then merge what they sent
+        codes = [process.wait() for process in processes]
+    failed = [index for index, code in enumerate(codes) if code != 0]
+    if failed:
+        logging.error(f"Workers {failed} exited with errors; merging the shards that were written")
+    return merge_shards(find_shards(args.shard_dir), args.output, args.fields)
+
 if __name__ == "__main__":
     # Parse command line arguments
     parser = argparse.ArgumentParser(description='SQL Injection Testing Tool')
@@ -335,27 +718,125 @@ if __name__ == "__main__":
     parser.add_argument('--requests', type=int, default=100, 
                         help='Number of requests to send')
     parser.add_argument('--delay', type=float, default=0.5, 
-                        help='Delay between requests in seconds')
+                        help='Delay between requests in seconds (maximum think time per virtual user with --engine async)')
     parser.add_argument('--legitimate', type=int, default=10, 
                         help='Percentage of legitimate login attempts')
     parser.add_argument('--incorrect', type=int, default=20, 
                         help='Percentage of incorrect login attempts')
     parser.add_argument('--output', type=str, default='sqli_test_results.json',
-                        help='Output file to save results')
+                        help='Output file, written as results arrive: .jsonl for JSON lines, .json for a JSON array, .gz to compress')
+    parser.add_argument('--fields', type=str, choices=list(FIELD_SETS), default='full',
+                        help='compact drops response bodies, IPs and passwords from each record')
+    parser.add_argument('--flush-interval', type=float, default=1.0,
+                        help='Seconds between flushes of the output file')
+    parser.add_argument('--engine', type=str, choices=['threads', 'async'], default='threads',
+                        help='threads: thread pool; async: asyncio virtual users over keep-alive connections')
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help='Threads or virtual users (default 10 for threads, 1000 for async)')
+    parser.add_argument('--log-requests', action='store_true',
+                        help='Log every request in async mode too (slows it down)')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='Open-loop mode: target requests per second (sent on schedule, latency measured from it)')
+    parser.add_argument('--duration', type=float, default=30,
+                        help='Open-loop run length in seconds')
+    parser.add_argument('--profile', type=str, choices=RATE_PROFILES, default='constant',
+                        help='Open-loop arrival rate profile')
+    parser.add_argument('--start-rate', type=float, default=None,
+                        help='Starting rate for the step and linear profiles (default rate / 10)')
+    parser.add_argument('--steps', type=int, default=5,
+                        help='Number of steps in the step profile')
+    parser.add_argument('--spike-factor', type=float, default=5.0,
+                        help='Rate multiplier during the spike profile\'s spike')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Split the test across this many local worker processes and merge their results')
+    parser.add_argument('--shard-dir', type=str, default='sqli_shards',
+                        help='Directory for the per-worker result files')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Seed for the test plan and generated traffic (shared by all workers)')
+    parser.add_argument('--worker-index', type=int, default=0,
+                        help='Run only this worker\'s share of the test (with --worker-count, e.g. one per host)')
+    parser.add_argument('--worker-count', type=int, default=1,
+                        help='Number of workers the test is split across')
+    parser.add_argument('--start-at', type=float, default=None,
+                        help='Unix time at which to start sending, so workers on several hosts start together')
+    parser.add_argument('--merge', type=str, default=None,
+                        help='Merge the worker-*.jsonl shards in this directory into --output and exit')
+    parser.add_argument('--mutate', action='store_true',
+                        help='Send mutated variants of the attack payloads (case, comments, whitespace, encodings...)')
+    parser.add_argument('--max-mutations', type=int, default=3,
+                        help='Most mutations combined in one variant')
+    parser.add_argument('--corpus', type=str, default=None,
+                        help='Replay the attack payloads of a corpus written by --export-corpus')
+    parser.add_argument('--export-corpus', type=str, default=None,
+                        help='Write --corpus-size mutated payloads to this file (.jsonl, .gz to compress) and exit')
+    parser.add_argument('--corpus-size', type=int, default=100000,
+                        help='Number of payloads to export')
     args = parser.parse_args()
     
-    # Run the test sequence
+    if args.export_corpus:
+        count = export_corpus(args.export_corpus, args.corpus_size, args.seed or 0, args.max_mutations)
+        print(f"{count} payloads exported to {args.export_corpus}")
+        sys.exit(0)
+    
+    if args.merge:
+        count = merge_shards(find_shards(args.merge), args.output, args.fields)
+        print(f"{count} records merged into {args.output}")
+        sys.exit(0)
+    if args.workers > 1:
+        count = run_workers(args)
+        print(f"{count} records from {args.workers} workers saved to {args.output}")
+        sys.exit(0)
+    
+    # Run the test sequence, streaming results to the output file as they complete
     print(f"Starting SQL injection testing against {args.url}")
-    print(f"Sending {args.requests} requests with {args.legitimate}% legitimate and {args.incorrect}% incorrect login attempts")
-    
-    results = run_test_sequence(
-        num_requests=args.requests,
-        delay_between_requests=args.delay,
-        legitimate_percent=args.legitimate,
-        incorrect_percent=args.incorrect,
-        url=args.url
-    )
-    
-    # Save results
-    save_results_to_file(results, args.output)
-    print(f"Test completed. Results saved to {args.output}")
\ No newline at end of file
+    # Mutations follow the plan seed, so all workers draw the same corpus
+    attacks = attack_source(args.mutate, args.corpus, None, args.seed, args.max_mutations)
+    sink = ResultSink(args.output, args.fields, args.flush_interval)
+    try:
+        if args.rate:
+            print(f"Open loop: {args.profile} profile up to {args.rate:g} req/s for {args.duration:g}s")
+            run_open_loop_test(
+                rate=args.rate,
+                duration=args.duration,
+                profile=args.profile,
+                start_rate=args.start_rate,
+                steps=args.steps,
+                spike_factor=args.spike_factor,
+                legitimate_percent=args.legitimate,
+                incorrect_percent=args.incorrect,
+                url=args.url,
+                max_connections=args.concurrency or 1000,
+                log_requests=args.log_requests,
+                sink=sink,
+                seed=args.seed,
+                worker_index=args.worker_index,
+                worker_count=args.worker_count,
+                start_at=args.start_at,
+                attacks=attacks
+            )
+        else:
+            print(f"Sending {args.requests} requests with {args.legitimate}% legitimate and {args.incorrect}% incorrect login attempts")
+            run_test_sequence(
+                num_requests=args.requests,
+                delay_between_requests=args.delay,
+                legitimate_percent=args.legitimate,
+                incorrect_percent=args.incorrect,
+                url=args.url,
+                engine=args.engine,
+                concurrency=args.concurrency or (1000 if args.engine == 'async' else 10),
+                log_requests=args.log_requests,
+                sink=sink,
+                seed=args.seed,
+                worker_index=args.worker_index,
+                worker_count=args.worker_count,
+                start_at=args.start_at,
+                attacks=attacks
+            )
+    except KeyboardInterrupt:
+        print(f"Interrupted after {sink.count} results")
+    finally:
+        # Also terminates the JSON array / gzip stream of an interrupted run
+        sink.close()
+    
+    logging.info(f"Results saved to {args.output}")
+    print(f"{sink.count} results saved to {args.output}")
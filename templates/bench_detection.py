@@ -0,0 +1,141 @@
+import argparse
+import itertools
+import re
+import urllib.parse
+import statistics
+import time
+from collections import defaultdict
+from faker import Faker
+from automated import SQLI_PAYLOADS, VALID_USERS
+import detection
+from detection import DANGEROUS_PATTERNS, detect_sql_injection, normalized_forms, scan_input, SAFE_INPUT
+from result_sink import iter_results
+
+fake = Faker()
+
+def legacy_normalize(data):
+    """The original unquote/replace/re.sub normalization chain"""
+    data = urllib.parse.unquote(data)
+    data = data.replace("+", " ")
+    data = re.sub(r"\s+", " ", data).strip().lower()
+    compressed_data = re.sub(r"\s+", "", data)
+    return data, compressed_data
+
+def pattern_loop(data, compressed_data):
+    for pattern in DANGEROUS_PATTERNS:
+        if re.search(pattern, data) or re.search(pattern, compressed_data):
+            return True
+    return False
+
+def legacy_detect(data):
+    """The original normalization and per-pattern loop, kept as a baseline for comparison"""
+    if not data:
+        return False
+
+    data, compressed_data = legacy_normalize(data)
+    if SAFE_INPUT.fullmatch(data):
+        return False
+    return pattern_loop(data, compressed_data)
+
+def reference_detect(data):
+    """The per-pattern loop over the current normalization, which the engine must agree with"""
+    if not data:
+        return False
+
+    return any(pattern_loop(data, compressed_data) for data, compressed_data in normalized_forms(data)
+               if not SAFE_INPUT.fullmatch(data))
+
+def uncached_detect(data):
+    """The engine without the verdict cache in front of it"""
+    return bool(data) and scan_input(data, detection.engine) is not None
+
+def build_corpora(size, seed=0):
+    """Build benign and malicious input corpora of roughly `size` strings each"""
+    Faker.seed(seed)
+    benign = list(VALID_USERS)
+    generators = [fake.email, fake.name, fake.user_name, fake.free_email, fake.last_name]
+    while len(benign) < size:
+        benign.append(generators[len(benign) % len(generators)]())
+
+    payloads = [payload for category in SQLI_PAYLOADS.values() for payload in category]
+    malicious = [payloads[i % len(payloads)] for i in range(size)]
+    return {"benign": benign, "malicious": malicious}
+
+def load_corpus(path, limit=None):
+    """Read up to `limit` records of a corpus written by automated.py --export-corpus"""
+    return list(itertools.islice(iter_results(path), limit))
+
+def detection_rates(records):
+    """Return {mutation: (detected, total)} for a corpus, plus "all" and "none" for unmutated payloads"""
+    counts = defaultdict(lambda: [0, 0])
+    for record in records:
+        detected = detect_sql_injection(record["payload"])
+        for name in ["all"] + (record["mutations"] or ["none"]):
+            counts[name][0] += detected
+            counts[name][1] += 1
+    return {name: tuple(count) for name, count in sorted(counts.items())}
+
+def time_detector(detector, corpus, rounds):
+    """Return per-call latencies in microseconds"""
+    latencies = []
+    for _ in range(rounds):
+        for data in corpus:
+            start = time.perf_counter()
+            detector(data)
+            latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    return {
+        "mean": statistics.fmean(latencies),
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[int(len(latencies) * 0.99)],
+    }
+
+def run_benchmark(size=500, rounds=5, corpus_records=None):
+    """Compare the legacy loop against the prefiltered engine on each corpus
+    
+    `corpus_records`, if given, are timed as a third "mutated" corpus.
+    """
+    detectors = {"legacy": legacy_detect, "engine": uncached_detect, "cached": detect_sql_injection}
+    corpora = build_corpora(size)
+    if corpus_records:
+        corpora["mutated"] = [record["payload"] for record in corpus_records]
+    report = {}
+    for corpus_name, corpus in corpora.items():
+        # The engine must agree with the plain pattern loop before its timings mean anything
+        for data in corpus:
+            if reference_detect(data) != uncached_detect(data):
+                raise AssertionError(f"Detectors disagree on {data!r}")
+
+        for detector_name, detector in detectors.items():
+            report[(corpus_name, detector_name)] = summarize(time_detector(detector, corpus, rounds))
+    report["verdict_cache"] = detection.verdict_cache.stats()
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='SQL Injection Detector Benchmark')
+    parser.add_argument('--size', type=int, default=500,
+                        help='Number of inputs in each corpus')
+    parser.add_argument('--rounds', type=int, default=5,
+                        help='Number of passes over each corpus')
+    parser.add_argument('--corpus', type=str, default=None,
+                        help='Also replay a corpus written by automated.py --export-corpus')
+    parser.add_argument('--corpus-limit', type=int, default=None,
+                        help='Use only the first N payloads of the corpus')
+    args = parser.parse_args()
+
+    records = load_corpus(args.corpus, args.corpus_limit) if args.corpus else None
+    report = run_benchmark(args.size, args.rounds, records)
+    cache_stats = report.pop("verdict_cache")
+
+    print(f"\n{'corpus':<10} {'detector':<8} {'mean (us)':>10} {'p50 (us)':>10} {'p99 (us)':>10}")
+    for (corpus_name, detector_name), stats in report.items():
+        print(f"{corpus_name:<10} {detector_name:<8} {stats['mean']:>10.2f} {stats['p50']:>10.2f} {stats['p99']:>10.2f}")
+    print(f"\nVerdict cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['evictions']} evictions")
+
+    if records:
+        print(f"\n{'mutation':<20} {'detected':>9} {'total':>7} {'rate':>7}")
+        for name, (detected, total) in detection_rates(records).items():
+            print(f"{name:<20} {detected:>9} {total:>7} {detected / total:>7.1%}")
@@ -0,0 +1,150 @@
+import argparse
+import math
+import re
+import sys
+import time
+import detection
+from detection import DANGEROUS_PATTERNS, DetectionEngine, build_rules, literal_runs, match_sql_injection
+
+ENGINES = ("regex", "lexer")
+
+# Inputs aimed at the stages in front of the rules: decoding, comment
+# stripping, whitespace splitting and the lexer's tokenizer
+PIPELINE_SEEDS = {
+    "unterminated comments": "/*a",
+    "comment openers": "/*",
+    "nested url encoding": "%25",
+    "html entities": "&#39;",
+    "unicode escapes": "%u0027",
+    "plus signs": "+",
+    "whitespace": " \t",
+    "quotes": "'",
+    "open parens": "(",
+    "dashes": "-",
+    "keywords": "union select ",
+    "quoted keywords": "' or '",
+}
+
+# Inputs grow SCALE times per step over SIZE_STEPS sizes, and the exponent k of
+# the fitted time ~ size^k is checked. A linear rule fits k ~ 1 and a quadratic
+# one k ~ 2; fitting over a 16x range keeps timing noise well below the gap.
+SCALE = 4
+SIZE_STEPS = 3
+MAX_EXPONENT = 1.5
+
+def adversarial_inputs(pattern, size):
+    """Build inputs that make a backtracking matcher retry as much as possible"""
+    runs = literal_runs(pattern) or ["x"]
+    fillers = {"a", "1", "*", "=", "(", ","} | {ch for run in runs for ch in run}
+
+    # Every literal of the rule except the last one, so the match never completes
+    seeds = [" ".join(runs[:-1]) + " ", "".join(runs[:-1]), runs[0][:-1] or runs[0]]
+    inputs = {f"repeat {seed!r}": seed for seed in seeds if seed.strip()}
+
+    # The rule's first literal followed by a long run of a single character
+    for filler in sorted(fillers):
+        inputs[f"{runs[0]!r} + {filler!r}*n"] = runs[0] + filler * size
+
+    return {name: (text * (size // len(text) + 1))[:size] for name, text in inputs.items()}
+
+def best_time(matcher, text, repeat=5, number=5):
+    """Best average time of `number` calls, over `repeat` tries, to smooth out noise"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            matcher(text)
+        timings.append((time.perf_counter() - start) / number)
+    return min(timings)
+
+def input_sizes(size):
+    return [size * SCALE ** step for step in range(SIZE_STEPS)]
+
+def growth_exponent(matcher, sized_texts, repeat=5):
+    """Least-squares slope of log(time) against log(size) over (size, text) pairs
+    
+    The sizes are timed in turn on every try, so a burst of load on the machine
+    slows all of them rather than skewing the slope.
+    """
+    timings = [[] for _ in sized_texts]
+    for _ in range(repeat):
+        for timing, (_, text) in zip(timings, sized_texts):
+            timing.append(best_time(matcher, text, repeat=1))
+    points = [(math.log(size), math.log(max(min(timing), 1e-7))) for (size, _), timing in zip(sized_texts, timings)]
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / sum((x - mean_x) ** 2 for x, _ in points)
+
+def worst_growth(matcher, build_inputs, size):
+    """Return the worst (case, exponent) of `matcher` over the inputs `build_inputs(size)` names"""
+    sizes = input_sizes(size)
+    inputs = [build_inputs(step_size) for step_size in sizes]
+    worst = ("", 0.0)
+    for name in inputs[0]:
+        exponent = growth_exponent(matcher, [(step_size, step_inputs[name]) for step_size, step_inputs in zip(sizes, inputs)])
+        if exponent > worst[1]:
+            worst = (name, exponent)
+    return worst
+
+def check_rule(pattern, size, legacy=False):
+    """Return the worst (case, growth exponent) for a rule"""
+    if legacy:
+        compiled = re.compile(pattern)
+        matcher = compiled.search
+    else:
+        matcher = DetectionEngine([pattern]).match
+    return worst_growth(matcher, lambda step_size: adversarial_inputs(pattern, step_size), size)
+
+def pipeline_inputs(size):
+    """Adversarial inputs for the whole detection pipeline: the normalizer's own plus every rule's"""
+    inputs = {name: (seed * (size // len(seed) + 1))[:size] for name, seed in PIPELINE_SEEDS.items()}
+    for rule_id, pattern in build_rules(DANGEROUS_PATTERNS):
+        for name, text in adversarial_inputs(pattern, size).items():
+            inputs[f"rule {rule_id}: {name}"] = text
+    return inputs
+
+def check_pipeline(engine_name, size):
+    """Return the worst (case, growth exponent) of normalize_input plus match_sql_injection as they run in production"""
+    def matcher(text):
+        # Time the scan on a cache miss, as every new input gets
+        detection.verdict_cache.clear()
+        match_sql_injection(text, engine_name)
+
+    return worst_growth(matcher, pipeline_inputs, size)
+
+def run_checks(size=500, legacy=False):
+    failures = []
+    for rule_id, pattern in build_rules(DANGEROUS_PATTERNS):
+        case, exponent = check_rule(pattern, size, legacy)
+        status = "FAIL" if exponent > MAX_EXPONENT else "ok"
+        print(f"{status:<5} rule {rule_id:<3} n^{exponent:<6.2f} {pattern:<45} {case}")
+        if status == "FAIL":
+            failures.append(rule_id)
+    if legacy:
+        return failures
+
+    # The rules only see what the normalizer hands them, so time the full path too
+    for engine_name in ENGINES:
+        case, exponent = check_pipeline(engine_name, size)
+        status = "FAIL" if exponent > MAX_EXPONENT else "ok"
+        print(f"{status:<5} pipeline {engine_name:<6} n^{exponent:<6.2f} {case}")
+        if status == "FAIL":
+            failures.append(f"pipeline:{engine_name}")
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='ReDoS regression check for the detection rules')
+    parser.add_argument('--size', type=int, default=500,
+                        help='Length of the smallest adversarial input')
+    parser.add_argument('--legacy', action='store_true',
+                        help='Time plain re.search instead of the detection engine (use a small --size)')
+    args = parser.parse_args()
+
+    sizes = ", ".join(str(step_size) for step_size in input_sizes(args.size))
+    print(f"Timing each rule on adversarial inputs of {sizes} characters\n")
+    failures = run_checks(args.size, args.legacy)
+
+    if failures:
+        print(f"\n{len(failures)} check(s) grew faster than n^{MAX_EXPONENT}: {failures}")
+        sys.exit(1)
+    print(f"\nAll rules and engines grew no faster than n^{MAX_EXPONENT}")
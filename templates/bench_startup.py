@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Runs in a fresh interpreter so every import is cold
+PROBE = """
+import json, time
+started = time.perf_counter()
+import App
+imported = time.perf_counter()
+App.create_app()
+created = time.perf_counter()
+with App.app.app_context():
+    App.seed_users()
+seeded = time.perf_counter()
+client = App.app.test_client()
+client.post('/login', json={'username': 'nobody', 'password': 'wrong'})
+first = time.perf_counter()
+client.post('/login', json={'username': 'alice', 'password': 'wrong'})
+login = time.perf_counter()
+print(json.dumps({
+    "import": (imported - started) * 1000,
+    "create_app": (created - imported) * 1000,
+    "seed": (seeded - created) * 1000,
+    "first_request": (first - seeded) * 1000,
+    "known_user_login": (login - first) * 1000,
+}))
+"""
+
+def copy_app(target):
+    """Copy the app's modules and settings, but not its database or logs"""
+    source = os.path.dirname(os.path.abspath(__file__))
+    for name in os.listdir(source):
+        if name.endswith(".py") or name == "security_settings.json":
+            shutil.copy(os.path.join(source, name), target)
+
+def probe(iterations):
+    """Start the app once in an empty directory and return its phase timings in ms"""
+    with tempfile.TemporaryDirectory(prefix="sqli-startup-") as workdir:
+        copy_app(workdir)
+        env = dict(os.environ, SQLI_PBKDF2_ITERATIONS=str(iterations), SQLI_STATE_BACKEND="memory")
+        result = subprocess.run([sys.executable, "-c", PROBE], cwd=workdir, env=env,
+                                capture_output=True, text=True, check=True)
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run_benchmark(costs, runs=3):
+    """Return {cost: {phase: (mean, max)}} over `runs` cold starts per PBKDF2 cost"""
+    report = {}
+    for iterations in costs:
+        samples = [probe(iterations) for _ in range(runs)]
+        report[iterations] = {phase: (statistics.fmean(sample[phase] for sample in samples),
+                                      max(sample[phase] for sample in samples))
+                              for phase in samples[0]}
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='App Startup Benchmark')
+    parser.add_argument('--iterations', type=str, default='100000,1000',
+                        help='Comma-separated PBKDF2 costs to compare')
+    parser.add_argument('--runs', type=int, default=3,
+                        help='Cold starts per cost')
+    args = parser.parse_args()
+
+    report = run_benchmark([int(cost) for cost in args.iterations.split(',')], args.runs)
+
+    print(f"\n{'pbkdf2 cost':>11} {'phase':<17} {'mean (ms)':>10} {'max (ms)':>10}")
+    for iterations, phases in report.items():
+        for phase, (mean, worst) in phases.items():
+            print(f"{iterations:>11} {phase:<17} {mean:>10.1f} {worst:>10.1f}")
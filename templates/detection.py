@@ -0,0 +1,658 @@
+import hashlib
+import html
+import multiprocessing
+import os
+import re
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from sql_lexer import FINGERPRINTS, lexer_engine
+
+# SQL Injection detection patterns
+DANGEROUS_PATTERNS = [
+    # SQL Keywords & Commands
+    r"(?i)\bselect\b\s*\**\s*\bfrom\b", r"(?i)\bunion\b\s*\bselect\b", r"(?i)\border by\b\s*\d+",
+    r"(?i)\bcase when\b", r"(?i)\binsert into\b", r"(?i)\bupdate\b\s*\bset\b",
+    r"(?i)\bdelete from\b", r"(?i)\bdrop table\b", r"(?i)\bexec\b", r"(?i)\breplace into\b",
+    r"(?i)\balter table\b", r"(?i)\btruncate\b", r"(?i)\bcreate\b\s*\btable\b",
+
+    # Logical Conditions (Bypass Authentication)
+    r"(?i)\band\s*\d+=\d+\b", r"(?i)\bor\s*\d+=\d+\b", r"(?i)\bsleep\s*\(\d+\)", r"(?i)\bwaitfor delay\b",
+    r"(?i)\bif\s*\(.*=.*\)", r"(?i)\btrue\b.*\bfalse\b", r"(?i)\bnull is null\b",
+
+    # Obfuscation Tricks
+    r"(?i)\bselect\s*/\*\*/\s*\*?\s*from\b",  # Inline comments (`SELECT/**/FROM`)
+    r"(?i)\bunion\s*/\*\*/\s*select\b",  # `UNION/**/SELECT`
+    r"(?i)\bunion%20select\b", r"(?i)\bunion%09select\b",  # URL encoding tricks
+    r"(?i)\bselect%20from\b", r"(?i)\bselect%09from\b",  # `SELECT%20FROM`
+    r"(?i)or\s*1\s*=\s*1", r"(?i)and\s*1\s*=\s*1", r"(?i)1=1", r"(?i)\bnull is null\b",
+
+    # System Access & OOB SQLi
+    r"(?i)\bxp_cmdshell\b", r"(?i)\bsystem_user\b", r"(?i)\bcurrent_user\b", r"(?i)\buser\b\(\)",
+    r"(?i)\bpg_sleep\b", r"(?i)\bschema_name\b", r"(?i)\btable_name\b", r"(?i)\bcolumn_name\b",
+
+    # Encoded SQL Injection Bypasses
+    r"(?i)0x[0-9A-Fa-f]+",  # Hex encoding
+    r"(?i)char\([0-9,]+\)", r"(?i)concat\(", r"(?i)union all select", r"(?i)case when",
+    r"(?i)base64_decode\(", r"(?i)unhex\(",
+
+    # SQL Comment Injection
+    r"--", r"#", r"/\*", r"\*/", r";", r"'",
+
+    # Nested Queries and Subqueries
+    r"(?i)\bexists\s*\(", r"(?i)\bnot exists\s*\(", r"(?i)\bselect.*\bfrom\s*\(.*select",
+
+    # Mixed Casing Obfuscation
+    r"(?i)[Ss][Ee][Ll][Ee][Cc][T]", r"(?i)[Uu][Nn][Ii][Oo][N]", r"(?i)[Oo][Rr][Dd][Ee][R]",
+]
+
+# Dashboard attack category for each rule, by index into DANGEROUS_PATTERNS
+ATTACK_TYPE_RULES = {
+    "Union-Based SQLi": (0, 1, 2, 41),
+    "Stacked Queries": (4, 5, 6, 7, 8, 9, 10, 11, 12, 49),
+    "Boolean-Based SQLi": (13, 14, 18, 19, 26, 27, 28, 29),
+    "Time-Based SQLi": (15, 16, 34),
+    "Blind SQLi": (3, 17, 42, 51, 52, 53),
+    "Obfuscated SQLi": (20, 21, 22, 23, 24, 25, 54, 55, 56),
+    "Out-of-Band SQLi": (30, 31, 32, 33, 35, 36, 37),
+    "Hex/Unicode SQLi": (38, 39, 40, 43, 44),
+    "Comment-Based SQLi": (45, 46, 47, 48),
+    "Quote Injection": (50,),
+}
+ATTACK_TYPES = {rule_id: attack_type for attack_type, rule_ids in ATTACK_TYPE_RULES.items() for rule_id in rule_ids}
+
+# The same categories for the lexer engine's fingerprints
+FINGERPRINT_ATTACK_TYPES = {
+    "union-select": "Union-Based SQLi", "select-from": "Union-Based SQLi", "order-by": "Union-Based SQLi",
+    "stacked-query": "Stacked Queries", "statement": "Stacked Queries",
+    "tautology": "Boolean-Based SQLi", "quote-logic": "Boolean-Based SQLi",
+    "time-delay": "Time-Based SQLi", "subquery": "Blind SQLi",
+    "dangerous-function": "Hex/Unicode SQLi", "system-object": "Out-of-Band SQLi",
+    "quote-comment": "Comment-Based SQLi",
+}
+
+SAFE_INPUT = re.compile(r"[a-z0-9_]+")
+UNICODE_ESCAPE = re.compile(r"%u([0-9a-fA-F]{4})")
+
+# How many nested encodings (`%2527` -> `%27` -> `'`) are peeled off before matching
+MAX_DECODE_LAYERS = 3
+
+# Longest input inspected by callers that don't pass a limit; App keeps it in
+# step with the detection.max_input_length setting
+max_input_length = 1024
+
+# Batches with at least this many distinct inputs are fanned out over a process pool
+PARALLEL_BATCH_THRESHOLD = 2000
+BATCH_CHUNK_SIZE = 500
+CASE_CLASS = re.compile(r"\[([A-Za-z])([A-Za-z])?\]")
+
+# Characters that survive `.lower()` but that IGNORECASE still matches against
+# an ASCII letter; the prefilter looks for lowercase anchors, so it sees these
+# folded, e.g. `ſelect` -> `select`
+CASE_FOLDS = str.maketrans({"\u0131": "i", "\u017f": "s"})
+
+
+def canonical_pattern(pattern):
+    """Rewrite a rule into the lowercase form the combined matcher expects."""
+    # The engine compiles every rule with re.IGNORECASE instead of the inline flag,
+    # which Python only accepts at the start of the whole expression
+    if pattern.startswith("(?i)"):
+        pattern = pattern[4:]
+
+    # `[Ss]` / `[T]` style classes collapse to a single lowercase literal
+    def collapse(match):
+        letters = {c.lower() for c in match.group(0)[1:-1]}
+        return letters.pop() if len(letters) == 1 else match.group(0)
+
+    return CASE_CLASS.sub(collapse, pattern)
+
+
+def build_rules(patterns):
+    """Dedupe patterns into (rule_id, canonical_pattern) pairs.
+
+    The rule id is the index of the first pattern in `patterns` that produced
+    the canonical form. A rule that only differs from another by extra `\\b`
+    anchors can only match a subset of that rule, so it is dropped as well.
+    """
+    canonical = {}
+    for rule_id, pattern in enumerate(patterns):
+        canonical.setdefault(canonical_pattern(pattern), rule_id)
+
+    rules = []
+    for pattern, rule_id in canonical.items():
+        unanchored = pattern.replace(r"\b", "")
+        if unanchored != pattern and unanchored in canonical:
+            continue
+        rules.append((rule_id, pattern))
+    return rules
+
+
+def literal_runs(pattern):
+    """Returns the runs of literal text every match of `pattern` must contain, in order.
+
+    Returns None when the pattern has groups or alternation.
+    """
+    if re.search(r"(?<!\\)[(|]", pattern):
+        return None
+
+    runs, run, i = [], "", 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            # `\b`, `\s`, `\d`... are classes, `\(`, `\*`... are literals
+            atom = None if pattern[i + 1].isalnum() else pattern[i + 1]
+            i += 2
+        elif ch == "[":
+            atom = None
+            i = pattern.index("]", i) + 1
+        elif ch in ".^$":
+            atom = None
+            i += 1
+        else:
+            atom = ch
+            i += 1
+
+        quantifier = pattern[i] if i < len(pattern) and pattern[i] in "*?+{" else ""
+        if quantifier == "{":
+            i = pattern.index("}", i) + 1
+        elif quantifier:
+            i += 1
+            if i < len(pattern) and pattern[i] == "?":
+                i += 1  # Lazy quantifier
+
+        if atom is not None and quantifier in ("", "+"):
+            run += atom
+        if (atom is None or quantifier) and run:
+            runs.append(run)
+            run = ""
+    if run:
+        runs.append(run)
+    return runs
+
+
+def literal_anchor(pattern):
+    """Returns the longest literal every match of `pattern` must contain.
+
+    Returns None when no literal can be extracted, in which case the rule is
+    always evaluated.
+    """
+    runs = literal_runs(pattern)
+    return max(runs, key=len) if runs else None
+
+
+def split_gaps(pattern):
+    """Splits a rule on its unescaped `.*` gaps, e.g. `a.*b` -> [`a`, `b`]."""
+    return re.split(r"(?<!\\)\.\*", pattern)
+
+
+class GapRule:
+    """A `seg1.*seg2.*seg3` rule evaluated without backtracking.
+
+    Inputs are whitespace-normalized, so they never contain the newlines `.`
+    refuses to match and each `.*` gap can span any text. Searching for each
+    segment from where the previous one ended is then equivalent to the
+    original rule, but every character is inspected a bounded number of times
+    instead of the regex engine retrying each split of every gap.
+    """
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.segments = [re.compile(segment, re.IGNORECASE) for segment in split_gaps(pattern)]
+
+    def search(self, text):
+        position = 0
+        for segment in self.segments:
+            found = segment.search(text, position)
+            if not found:
+                return False
+            position = found.end()
+        return True
+
+
+class LiteralPrefilter:
+    """Aho-Corasick automaton reporting which literals occur in a string."""
+
+    def __init__(self, literals):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [frozenset()]
+
+        for literal in set(literals):
+            state = 0
+            for ch in literal:
+                if ch not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(frozenset())
+                    self.goto[state][ch] = len(self.goto) - 1
+                state = self.goto[state][ch]
+            self.output[state] = self.output[state] | {literal}
+
+        # Breadth-first pass to wire failure links and merge their outputs
+        queue = deque(self.goto[0].values())
+        while queue:
+            parent = queue.popleft()
+            for ch, state in self.goto[parent].items():
+                queue.append(state)
+                fallback = self.fail[parent]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                if parent:
+                    self.fail[state] = self.goto[fallback].get(ch, 0)
+                self.output[state] = self.output[state] | self.output[self.fail[state]]
+
+    def scan(self, text):
+        """Returns the set of literals found in `text` in one linear pass."""
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+
+class DetectionEngine:
+    """Detection rules behind a literal prefilter.
+
+    Each string is scanned once for the literal anchors of every rule. Only the
+    rules whose anchor was found are then compiled into a single alternation
+    program and run, so inputs without any anchor never reach the regex engine.
+    Rules with `.*` gaps are kept out of that program and run as `GapRule`s so
+    that no rule can backtrack superlinearly.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self.fingerprint = hashlib.sha256("\n".join(self.patterns).encode("utf-8")).hexdigest()[:16]
+        self.rules = build_rules(self.patterns)
+        self.anchors = {rule_id: literal_anchor(pattern) for rule_id, pattern in self.rules}
+        self.always_run = frozenset(rule_id for rule_id, anchor in self.anchors.items() if anchor is None)
+        self.prefilter = LiteralPrefilter(anchor for anchor in self.anchors.values() if anchor)
+        self.rules_by_anchor = {}
+        for rule_id, anchor in self.anchors.items():
+            if anchor:
+                self.rules_by_anchor.setdefault(anchor, set()).add(rule_id)
+        self.gap_rules = {
+            rule_id: GapRule(pattern) for rule_id, pattern in self.rules if len(split_gaps(pattern)) > 1
+        }
+        self.program_for = lru_cache(maxsize=256)(self._compile)
+
+    def _compile(self, rule_ids):
+        alternatives = [
+            f"(?P<r{rule_id}>{pattern})"
+            for rule_id, pattern in self.rules
+            if rule_id in rule_ids and rule_id not in self.gap_rules
+        ]
+        return re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+
+    def candidates(self, *texts):
+        """Returns the ids of the rules whose anchors appear in any of `texts`."""
+        rule_ids = set(self.always_run)
+        for text in texts:
+            for literal in self.prefilter.scan(text.translate(CASE_FOLDS)):
+                rule_ids |= self.rules_by_anchor[literal]
+        return frozenset(rule_ids)
+
+    def match(self, *texts):
+        """Return the id of the rule that fired on any of `texts`, or None."""
+        rule_ids = self.candidates(*texts)
+        if not rule_ids:
+            return None
+
+        program = self.program_for(rule_ids)
+        gap_rules = [(rule_id, rule) for rule_id, rule in self.gap_rules.items() if rule_id in rule_ids]
+        for text in texts:
+            found = program.search(text) if program else None
+            if found:
+                return int(found.lastgroup[1:])
+            for rule_id, rule in gap_rules:
+                if rule.search(text):
+                    return rule_id
+        return None
+
+
+class VerdictCache:
+    """Thread-safe, size-bounded LRU cache of detector verdicts.
+
+    Entries are keyed on a digest of the raw input (so submitted passwords are
+    never held in memory) together with the fingerprint of the pattern set that
+    produced the verdict, so a pattern change can never serve a stale verdict.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(fingerprint, data):
+        return fingerprint, hashlib.blake2b(data.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    def get(self, key):
+        """Returns `(True, rule_id)` on a hit and `(False, None)` on a miss."""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return True, self.entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, rule_id):
+        with self.lock:
+            self.entries[key] = rule_id
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class ShadowStats:
+    """Disagreements and per-engine latency from running every engine on the same input."""
+
+    def __init__(self, keep=100):
+        self.lock = threading.Lock()
+        self.inputs = 0
+        self.disagreements = 0
+        self.latency = {}
+        self.recent = deque(maxlen=keep)
+
+    def record(self, field, data, verdicts, timings):
+        with self.lock:
+            self.inputs += 1
+            for name, elapsed in timings.items():
+                latency = self.latency.setdefault(name, {"calls": 0, "total_us": 0.0, "max_us": 0.0})
+                latency["calls"] += 1
+                latency["total_us"] += elapsed
+                latency["max_us"] = max(latency["max_us"], elapsed)
+
+            if len({rule_id is None for rule_id in verdicts.values()}) > 1:
+                self.disagreements += 1
+                self.recent.append({
+                    "field": field,
+                    # Never keep submitted passwords around, even in diagnostics
+                    "input": "[REDACTED]" if field == "password" else data[:200],
+                    "verdicts": dict(verdicts),
+                })
+
+    def stats(self):
+        with self.lock:
+            return {
+                "inputs": self.inputs,
+                "disagreements": self.disagreements,
+                "latency": {
+                    name: {**latency, "mean_us": latency["total_us"] / latency["calls"]}
+                    for name, latency in self.latency.items()
+                },
+                "recent_disagreements": list(self.recent),
+            }
+
+
+engine = DetectionEngine(DANGEROUS_PATTERNS)
+verdict_cache = VerdictCache()
+shadow_stats = ShadowStats()
+
+
+def get_engine(name="regex"):
+    """Returns the detector selected by the `detection.engine` setting."""
+    return lexer_engine if name == "lexer" else engine
+
+
+def reload_patterns(patterns=None):
+    """Rebuilds the engine from `patterns` (default DANGEROUS_PATTERNS) and drops cached verdicts."""
+    global engine
+    engine = DetectionEngine(DANGEROUS_PATTERNS if patterns is None else patterns)
+    verdict_cache.clear()
+    return engine
+
+
+def set_max_input_length(length):
+    """Sets the default limit for detect_batch and run_engines (0 inspects everything)."""
+    global max_input_length
+    max_input_length = length
+
+
+def decode_layers(data, max_layers=MAX_DECODE_LAYERS):
+    """Peels off up to `max_layers` of URL (`%27`, `%u0027`) and HTML entity (`&#39;`) encoding."""
+    for _ in range(max_layers):
+        if "%" not in data and "&" not in data:
+            break
+        decoded = UNICODE_ESCAPE.sub(lambda m: chr(int(m.group(1), 16)), data)
+        decoded = html.unescape(urllib.parse.unquote(decoded))
+        if decoded == data:
+            break
+        data = decoded
+    return data
+
+
+def strip_inline_comments(data):
+    """Removes `/* ... */` comments in one left-to-right pass.
+
+    Same result as `re.sub(r"/\\*.*?\\*/", "", data)` on whitespace-free input,
+    but linear: the regex rescans the rest of the input from every unterminated
+    `/*`, which is quadratic on input like `"/*a" * 10000`. Once one opener has
+    no closer after it, no later opener can have one either.
+    """
+    parts = []
+    start = 0
+    while True:
+        opener = data.find("/*", start)
+        if opener == -1:
+            break
+        closer = data.find("*/", opener + 2)
+        if closer == -1:
+            break
+        parts.append(data[start:opener])
+        start = closer + 2
+    parts.append(data[start:])
+    return "".join(parts)
+
+
+def normalize_input(data, max_layers=MAX_DECODE_LAYERS):
+    """Decode and normalize input, returning its spaced and compressed forms.
+
+    Splitting once on whitespace yields both forms: the words joined by single
+    spaces (`select  *  from` -> `select * from`) and joined with nothing
+    (`selectunion`). The compressed form also drops inline comments so that
+    `UN/**/ION` is seen as `union`; the spaced form keeps them for the
+    comment rules.
+    """
+    words = decode_layers(data, max_layers).replace("+", " ").lower().split()
+    compressed_data = "".join(words)
+    if "/*" in compressed_data:
+        compressed_data = strip_inline_comments(compressed_data)
+    return " ".join(words), compressed_data
+
+
+def normalized_forms(data):
+    """Returns the (spaced, compressed) forms of `data` that detection looks at.
+
+    The fully decoded form comes first. Decoding past a single URL-unquote
+    also consumes characters the comment and terminator rules look for
+    (`&#59;` -> `;`, and the `#` and `;` of the entity itself), so when it
+    changed anything the input is also normalized as the original chain saw
+    it: URL-decoded once, with entities left alone.
+    """
+    forms = [normalize_input(data)]
+    url_decoded = urllib.parse.unquote(data) if "%" in data else data
+    if "%" in url_decoded or "&" in url_decoded:
+        forms.append(normalize_input(url_decoded, max_layers=0))
+    return forms
+
+
+def scan_input(data, detector):
+    """Runs `detector` over the normalized forms of non-trivial input."""
+    texts = []
+    for spaced, compressed in normalized_forms(data):
+        # Allow Only Safe Inputs (Strict Alphanumeric Check)
+        if not SAFE_INPUT.fullmatch(spaced):
+            texts += [spaced, compressed]
+    if not texts:
+        return None
+
+    return detector.match(*texts)
+
+
+def run_engines(data, max_length=None):
+    """Runs every engine on `data` uncached, returning their verdicts and latencies in microseconds.
+
+    Only the first `max_length` characters (default `max_input_length`) are inspected.
+    """
+    max_length = max_input_length if max_length is None else max_length
+    if max_length and data:
+        data = data[:max_length]
+    verdicts, timings = {}, {}
+    for name in ("regex", "lexer"):
+        start = time.perf_counter()
+        verdicts[name] = scan_input(data, get_engine(name)) if data else None
+        timings[name] = (time.perf_counter() - start) * 1e6
+    return verdicts, timings
+
+
+def shadow_match(data, primary="regex", field="input"):
+    """Runs every engine on `data`, records how they compare and returns the primary verdict."""
+    verdicts, timings = run_engines(data)
+    shadow_stats.record(field, data, verdicts, timings)
+    return verdicts[primary if primary in verdicts else "regex"]
+
+
+def match_sql_injection(data, engine_name="regex", shadow=False, field="input"):
+    """Returns the id of the rule that flagged `data`, or None if it looks safe.
+
+    Regex rule ids are indexes into DANGEROUS_PATTERNS; lexer rule ids are
+    fingerprint names from sql_lexer.FINGERPRINTS.
+    """
+    if not data:
+        return None
+
+    if shadow:
+        return shadow_match(data, engine_name, field)
+
+    detector = get_engine(engine_name)
+    key = VerdictCache.key(detector.fingerprint, data)
+    cached, rule_id = verdict_cache.get(key)
+    if cached:
+        return rule_id
+
+    rule_id = scan_input(data, detector)
+    verdict_cache.put(key, rule_id)
+    return rule_id
+
+
+def detect_sql_injection(data, engine_name="regex"):
+    """Detects SQL Injection patterns and ensures security."""
+    return match_sql_injection(data, engine_name) is not None
+
+
+def describe_rule(rule_id):
+    """Returns the original pattern or fingerprint description for a rule id reported by the detector."""
+    if isinstance(rule_id, str):
+        return FINGERPRINTS[rule_id]
+    return engine.patterns[rule_id]
+
+
+def attack_type(rule_id):
+    """Returns the dashboard attack category for a rule id reported by the detector."""
+    if isinstance(rule_id, str):
+        return FINGERPRINT_ATTACK_TYPES.get(rule_id, "Unknown")
+    # Ids only line up with ATTACK_TYPES while the stock rule set is loaded
+    if engine.patterns != DANGEROUS_PATTERNS:
+        return "Unknown"
+    return ATTACK_TYPES.get(rule_id, "Unknown")
+
+
+batch_pool = None
+batch_pool_lock = threading.Lock()
+
+
+def get_batch_pool():
+    """Returns the shared process pool for large batches, creating it on first use.
+
+    The server calls this from create_app. Workers come from a forkserver (spawn
+    where there is none), never from a fork of this process: the server's log,
+    broadcast, event-bus and hashing threads may hold locks at fork time that
+    no thread in the child would ever release.
+    """
+    global batch_pool
+    with batch_pool_lock:
+        if batch_pool is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            batch_pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context(method))
+        return batch_pool
+
+
+def match_chunk(chunk, engine_name, fingerprint, patterns):
+    """Process pool entry point: classify a chunk of inputs without the parent's cache."""
+    # A worker may have been started before the parent reloaded its patterns
+    if engine_name != "lexer" and engine.fingerprint != fingerprint:
+        reload_patterns(patterns)
+    return [scan_input(data, get_engine(engine_name)) if data else None for data in chunk]
+
+
+def detect_batch(inputs, engine_name="regex", max_length=None):
+    """Classifies many inputs at once, returning a rule id (or None) per input.
+
+    Each distinct input is classified once. Small batches go through the
+    verdict cache in this process; in large ones only the inputs the cache
+    can't answer are split into chunks and spread over a process pool so they
+    are not serialized on the GIL. Only the first
+    `max_length` characters (default `max_input_length`) of each are inspected.
+    """
+    max_length = max_input_length if max_length is None else max_length
+    inspected = [data[:max_length] if max_length else data for data in inputs]
+    unique = list(dict.fromkeys(inspected))
+
+    if len(unique) < PARALLEL_BATCH_THRESHOLD or (os.cpu_count() or 1) < 2:
+        verdicts = {data: match_sql_injection(data, engine_name) for data in unique}
+    else:
+        detector = get_engine(engine_name)
+        verdicts = {}
+        misses = []
+        for data in unique:
+            cached, rule_id = verdict_cache.get(VerdictCache.key(detector.fingerprint, data)) if data else (True, None)
+            if cached:
+                verdicts[data] = rule_id
+            else:
+                misses.append(data)
+
+        if len(misses) < PARALLEL_BATCH_THRESHOLD:
+            chunks = [misses]
+            results = [[scan_input(data, detector) for data in misses]]
+        else:
+            chunks = [misses[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(misses), BATCH_CHUNK_SIZE)]
+            results = get_batch_pool().map(
+                match_chunk, chunks,
+                [engine_name] * len(chunks), [engine.fingerprint] * len(chunks), [engine.patterns] * len(chunks),
+            )
+        for chunk, rule_ids in zip(chunks, results):
+            for data, rule_id in zip(chunk, rule_ids):
+                verdicts[data] = rule_id
+                verdict_cache.put(VerdictCache.key(detector.fingerprint, data), rule_id)
+
+    return [verdicts[data] for data in inspected]
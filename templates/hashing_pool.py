@@ -0,0 +1,102 @@
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PoolSaturated(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Hashing pool saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class HashingPool:
+    """Size-limited executor with a bounded queue for CPU-heavy password hashing.
+
+    `hashlib.pbkdf2_hmac` releases the GIL, so hashing on these threads keeps
+    request threads free to serve `/logs` and websocket pushes. When `workers`
+    hashes are running and `max_queue` more are waiting, new work is refused
+    immediately instead of piling up behind them.
+    """
+
+    def __init__(self, workers=4, max_queue=32):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hashing")
+        self.slots = threading.BoundedSemaphore(workers + max_queue)
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.hash_total = 0.0
+        self.hash_max = 0.0
+
+    def retry_after(self):
+        """Seconds until a slot is likely to free up, for the Retry-After header."""
+        with self.lock:
+            mean_hash = self.hash_total / self.completed if self.completed else 0.1
+            backlog = self.queued + self.running
+        return max(1, math.ceil(mean_hash * backlog / self.workers))
+
+    def run(self, fn, *args):
+        """Runs `fn(*args)` on the pool and waits for its result, or raises PoolSaturated."""
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            raise PoolSaturated(self.retry_after())
+
+        enqueued = time.perf_counter()
+        with self.lock:
+            self.queued += 1
+
+        def task():
+            started = time.perf_counter()
+            with self.lock:
+                self.queued -= 1
+                self.running += 1
+            try:
+                return fn(*args)
+            finally:
+                elapsed = time.perf_counter() - started
+                with self.lock:
+                    self.running -= 1
+                    self.completed += 1
+                    self.wait_total += started - enqueued
+                    self.wait_max = max(self.wait_max, started - enqueued)
+                    self.hash_total += elapsed
+                    self.hash_max = max(self.hash_max, elapsed)
+                self.slots.release()
+
+        try:
+            future = self.executor.submit(task)
+        except RuntimeError:
+            # The executor is shutting down; give the slot back
+            with self.lock:
+                self.queued -= 1
+            self.slots.release()
+            raise
+        return future.result()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_ms": {
+                    "mean": self.wait_total / self.completed * 1000 if self.completed else 0.0,
+                    "max": self.wait_max * 1000,
+                },
+                "hash_ms": {
+                    "mean": self.hash_total / self.completed * 1000 if self.completed else 0.0,
+                    "max": self.hash_max * 1000,
+                },
+            }
@@ -0,0 +1,101 @@
+import math
+
+
+class LatencyHistogram:
+    """HDR-style histogram of integer latencies in microseconds.
+
+    Values share log-linear buckets: every power of two is split into enough
+    sub-buckets to keep `significant_digits` digits of precision, so memory
+    grows with the logarithm of the range instead of the number of samples.
+    Counts are kept sparsely by bucket index, which makes two histograms with
+    the same precision mergeable by adding counts, and `to_dict`/`from_dict`
+    carry them between processes. Percentiles report the highest value that
+    is equivalent to the bucket they fall in, as HdrHistogram does.
+    """
+
+    def __init__(self, significant_digits=3):
+        self.significant_digits = significant_digits
+        self.sub_bucket_bits = math.ceil(math.log2(2 * 10 ** significant_digits))
+        self.sub_bucket_count = 1 << self.sub_bucket_bits
+        self.sub_bucket_half = self.sub_bucket_count >> 1
+        self.counts = {}
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def index_of(self, value):
+        magnitude = max(0, value.bit_length() - self.sub_bucket_bits)
+        return magnitude * self.sub_bucket_half + (value >> magnitude)
+
+    def highest_equivalent(self, index):
+        if index < self.sub_bucket_count:
+            return index
+        magnitude = (index - self.sub_bucket_count) // self.sub_bucket_half + 1
+        sub_bucket = (index - self.sub_bucket_count) % self.sub_bucket_half + self.sub_bucket_half
+        return (sub_bucket << magnitude) + (1 << magnitude) - 1
+
+    def record(self, value, count=1):
+        value = max(0, int(value))
+        index = self.index_of(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        if other.significant_digits != self.significant_digits:
+            raise ValueError("Cannot merge histograms with different precision")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum += other.sum
+        if other.total:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def percentile(self, percent):
+        """Returns the value at or below which `percent` of recorded values fall."""
+        if not self.total:
+            return 0
+        rank = max(1, math.ceil(percent / 100 * self.total))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self.highest_equivalent(index), self.max)
+        return self.max
+
+    def summary(self, percentiles=(50, 90, 99, 99.9)):
+        """Count, mean, min/max and percentiles in milliseconds."""
+        report = {
+            "count": self.total,
+            "mean_ms": self.sum / self.total / 1000 if self.total else 0.0,
+            "min_ms": (self.min or 0) / 1000,
+            "max_ms": (self.max or 0) / 1000,
+        }
+        for percent in percentiles:
+            report[f"p{percent:g}_ms"] = self.percentile(percent) / 1000
+        return report
+
+    def to_dict(self):
+        return {
+            "significant_digits": self.significant_digits,
+            "counts": {str(index): count for index, count in sorted(self.counts.items())},
+            "total": self.total,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data["significant_digits"])
+        histogram.counts = {int(index): count for index, count in data["counts"].items()}
+        histogram.total = data["total"]
+        histogram.sum = data["sum"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
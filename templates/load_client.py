@@ -0,0 +1,144 @@
+import asyncio
+import ssl
+import urllib.parse
+
+
+class HTTPError(Exception):
+    """Raised when the server's response cannot be parsed."""
+
+
+class ConnectionPool:
+    """Keep-alive HTTP/1.1 connections to one origin for asyncio load generation.
+
+    At most `size` requests are in flight; each borrows an idle connection or
+    opens a new one and hands it back afterwards unless the server asked to
+    close it. A request that fails on a reused connection (the server may have
+    dropped it while idle) is retried once on a fresh one. Only what the load
+    generator needs is implemented: one request per connection at a time,
+    Content-Length or chunked bodies, no redirects.
+    """
+
+    def __init__(self, url, size=100, timeout=30.0):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme in {url!r}")
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.host_header = parts.netloc
+        self.timeout = timeout
+        self.slots = asyncio.Semaphore(size)
+        self.idle = []
+        self.opened = 0
+        self.reused = 0
+        self.closed_by_server = 0
+
+    async def connect(self):
+        while self.idle:
+            reader, writer = self.idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                self.reused += 1
+                return reader, writer, True
+            writer.close()
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+        self.opened += 1
+        return reader, writer, False
+
+    async def request(self, method, body=b"", headers=None):
+        """Sends one request and returns (status, headers dict, body bytes)."""
+        lines = [f"{method} {self.path} HTTP/1.1", f"Host: {self.host_header}", f"Content-Length: {len(body)}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        message = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+        async with self.slots:
+            for attempt in range(2):
+                reader, writer, reused = await self.connect()
+                try:
+                    status, response_headers, response_body, keep_alive = await asyncio.wait_for(
+                        self.exchange(reader, writer, message), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if reused and attempt == 0:
+                        self.closed_by_server += 1
+                        continue
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+                if keep_alive:
+                    self.idle.append((reader, writer))
+                else:
+                    writer.close()
+                return status, response_headers, response_body
+
+    async def post_json(self, body, headers=None):
+        return await self.request("POST", body, {"Content-Type": "application/json", **(headers or {})})
+
+    async def exchange(self, reader, writer, message):
+        writer.write(message)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed before the response")
+        try:
+            version, status = status_line.decode("latin-1").split(" ", 2)[:2]
+            status = int(status)
+        except ValueError:
+            raise HTTPError(f"Bad status line {status_line!r}")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = await self.read_chunked(reader)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            # Delimited by the server closing the connection
+            body = await reader.read()
+            keep_alive = False
+        return status, headers, body, keep_alive
+
+    @staticmethod
+    async def read_chunked(reader):
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0].strip(), 16)
+            if size == 0:
+                # Trailers, then the blank line that ends the message
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+    async def close(self):
+        while self.idle:
+            _, writer = self.idle.pop()
+            writer.close()
+
+    def stats(self):
+        return {"opened": self.opened, "reused": self.reused, "closed_by_server": self.closed_by_server,
+                "idle": len(self.idle)}
+
+
+def raise_open_file_limit(wanted):
+    """Raises the soft RLIMIT_NOFILE towards `wanted` so thousands of sockets can be open."""
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        target = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import Counter
+
+
+class ClientState:
+    """Delivery state for one connected dashboard."""
+
+    def __init__(self):
+        self.inflight = 0
+        self.last_sent = 0.0
+        self.skipped = Counter()
+        self.missed_extra = None
+
+
+class LogBroadcaster:
+    """Coalesces log events into batched websocket frames with per-client backpressure.
+
+    Events published within `window` seconds (or until `max_batch` events are
+    waiting) go out as a single frame. Every frame asks the client for an ack;
+    a client with `max_inflight` unacknowledged frames is considered slow and
+    gets no more frames until it catches up. Events it missed are only counted
+    by level and attached as a `skipped` summary to its next frame, so a slow
+    client costs a few counters rather than an unbounded queue.
+
+    `emit(event, data, to, callback)` does the actual sending, which keeps this
+    class independent of Flask-SocketIO. `extras()`, if given, is called once
+    per flush and whatever dict it returns is merged into every frame. With
+    `merge_extras(older, newer)` given, the dicts a skipped client missed are
+    folded into one and sent along in its `skipped` summary.
+    """
+
+    def __init__(self, emit, window=0.1, max_batch=200, max_inflight=4, ack_timeout=10.0, extras=None, merge_extras=None):
+        self.emit = emit
+        self.extras = extras
+        self.merge_extras = merge_extras
+        self.window = window
+        self.max_batch = max_batch
+        self.max_inflight = max_inflight
+        self.ack_timeout = ack_timeout
+        self.lock = threading.Lock()
+        self.pending = []
+        self.clients = {}
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.metrics = Counter()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="log-broadcaster", daemon=True)
+                self.thread.start()
+        return self
+
+    def add_client(self, sid):
+        with self.lock:
+            self.clients[sid] = ClientState()
+
+    def remove_client(self, sid):
+        with self.lock:
+            self.clients.pop(sid, None)
+
+    def publish(self, level, entry):
+        """Queues one event for the next frame."""
+        with self.lock:
+            self.pending.append((level, entry))
+            self.metrics["events_published"] += 1
+            if len(self.pending) >= self.max_batch:
+                self.wakeup.set()
+
+    def run(self):
+        while True:
+            self.wakeup.wait(self.window)
+            self.wakeup.clear()
+            self.flush()
+
+    def acknowledge(self, sid):
+        with self.lock:
+            client = self.clients.get(sid)
+            if client and client.inflight:
+                client.inflight -= 1
+
+    def flush(self):
+        """Sends everything published since the last flush to every client."""
+        with self.lock:
+            batch, self.pending = self.pending, []
+            if not batch and not any(client.skipped for client in self.clients.values()):
+                return
+
+            deliveries = []
+            extra = self.extras() if self.extras is not None else None
+            now = time.monotonic()
+            for sid, client in self.clients.items():
+                # Only a backlogged client needs a frame when nothing new was published
+                if not batch and not extra and not client.skipped:
+                    continue
+
+                # A client that never acks is treated as having lost those frames
+                if client.inflight and now - client.last_sent > self.ack_timeout:
+                    client.inflight = 0
+
+                if client.inflight >= self.max_inflight:
+                    client.skipped.update(level for level, _ in batch)
+                    self.metrics["events_summarized"] += len(batch)
+                    if extra and self.merge_extras is not None:
+                        client.missed_extra = extra if client.missed_extra is None else self.merge_extras(client.missed_extra, extra)
+                    continue
+
+                frame = {"logs": [entry for _, entry in batch], **(extra or {})}
+                if client.skipped:
+                    frame["skipped"] = {"total": sum(client.skipped.values()), "by_level": dict(client.skipped), **(client.missed_extra or {})}
+                    client.skipped = Counter()
+                    client.missed_extra = None
+                    self.metrics["summaries_sent"] += 1
+                deliveries.append((sid, frame))
+                self.metrics["frames_sent"] += 1
+                self.metrics["events_coalesced"] += max(len(batch) - 1, 0)
+                client.inflight += 1
+                client.last_sent = now
+
+        # Send outside the lock; acks may arrive on other threads straight away
+        for sid, frame in deliveries:
+            self.emit('new_logs', frame, sid, lambda *args, sid=sid: self.acknowledge(sid))
+
+    def stats(self):
+        with self.lock:
+            return {
+                **{key: self.metrics[key] for key in ("events_published", "frames_sent", "events_coalesced", "summaries_sent", "events_summarized")},
+                "clients": len(self.clients),
+                "slow_clients": sum(client.inflight >= self.max_inflight for client in self.clients.values()),
+                "pending": len(self.pending),
+            }
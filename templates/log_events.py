@@ -0,0 +1,54 @@
+import json
+
+LOG_FORMATS = ("text", "json")
+
+# Field name -> accepted types, in the order fields are written. timestamp, ip
+# and level come first so the log index can read them without parsing JSON.
+EVENT_SCHEMA = {
+    "timestamp": (str,),
+    "ip": (str,),
+    "level": (str,),
+    "message": (str,),
+    "username": (str, type(None)),
+    "session_id": (str, type(None)),
+    "rule_id": (int, str, type(None)),
+    "attack_type": (str, type(None)),
+    "detector_ms": (float, int, type(None)),
+}
+REQUIRED_FIELDS = ("timestamp", "ip", "level", "message")
+
+
+def build_event(**fields):
+    """Returns an event dict in schema order; raises ValueError/TypeError on bad fields."""
+    unknown = set(fields) - set(EVENT_SCHEMA)
+    if unknown:
+        raise ValueError(f"Unknown event fields: {sorted(unknown)}")
+    missing = [name for name in REQUIRED_FIELDS if name not in fields]
+    if missing:
+        raise ValueError(f"Missing event fields: {missing}")
+
+    event = {}
+    for name, types in EVENT_SCHEMA.items():
+        value = fields.get(name)
+        if not isinstance(value, types):
+            raise TypeError(f"Event field '{name}' must be {' or '.join(t.__name__ for t in types)}, got {type(value).__name__}")
+        event[name] = value
+    return event
+
+
+def format_event(event, log_format="text"):
+    """Renders an event as one log line in the given format."""
+    if log_format == "json":
+        # Escapes newlines, so a hostile username can never split the line
+        return json.dumps(event)
+    return f"[{event['timestamp']}] [IP: {event['ip']}] [{event['level']}] {event['message']}"
+
+
+def parse_line(line):
+    """Returns the event dict for a JSON line, or the line unchanged for text entries."""
+    if line.startswith("{"):
+        try:
+            return json.loads(line)
+        except ValueError:
+            pass
+    return line
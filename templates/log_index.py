@@ -0,0 +1,544 @@
+import datetime
+import gzip
+import json
+import logging
+import lzma
+import os
+import re
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+# Level codes are stored in the index file, so only ever append to this tuple
+LEVELS = ("OTHER", "SUCCESSFUL LOGIN", "FAILED LOGIN", "SQLI ATTEMPT", "RATE LIMITED", "BLOCKED SESSION",
+          "SETTINGS", "SECURITY", "2FA", "FAILED 2FA", "FAILED CAPTCHA", "OVERSIZE INPUT")
+LEVEL_CODES = {level: code for code, level in enumerate(LEVELS)}
+
+# What the dashboard has always been shown by default
+DASHBOARD_LEVELS = ("SUCCESSFUL LOGIN", "FAILED LOGIN", "SQLI ATTEMPT", "RATE LIMITED", "BLOCKED SESSION", "SETTINGS")
+
+# `[2025-03-10 13:33:49] [IP: 127.0.0.1] [SQLI ATTEMPT] ...` as written by log_event
+EVENT_LINE = re.compile(rb"\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\] \[IP: [^\]]*\] \[([A-Z0-9 ]+)\]")
+# The same fields at the start of a structured (JSON-lines) event
+JSON_EVENT_LINE = re.compile(rb'\{"timestamp": "(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)", "ip": "(?:[^"\\]|\\.)*", "level": "([A-Z0-9 ]+)"')
+
+MAGIC = b"SQLIDX1\n"
+# byte offset, line length in bytes, unix timestamp, level code
+RECORD = struct.Struct("<QIqH")
+
+# Closed segments are compressed with one of these; None keeps them as plain text
+COMPRESSORS = {
+    "gzip": (".gz", lambda path, mode: gzip.open(path, mode, compresslevel=6)),
+    "lzma": (".xz", lambda path, mode: lzma.open(path, mode, preset=6)),
+}
+
+
+def parse_event(line):
+    """Returns (timestamp, level code) for a log_event line, or None for anything else."""
+    match = EVENT_LINE.match(line) or JSON_EVENT_LINE.match(line)
+    if not match:
+        return None
+    timestamp = datetime.datetime.strptime(match.group(1).decode(), "%Y-%m-%d %H:%M:%S")
+    return int(timestamp.timestamp()), LEVEL_CODES.get(match.group(2).decode(), 0)
+
+
+def open_segment(path):
+    """Opens a log segment for reading, decompressing it if its extension says so."""
+    for extension, opener in COMPRESSORS.values():
+        if path.endswith(extension):
+            return opener(path, "rb")
+    return open(path, "rb")
+
+
+class IndexRecords:
+    """Offsets, lengths, timestamps and levels of the events in one log segment."""
+
+    def __init__(self):
+        self.offsets = array("Q")
+        self.lengths = array("I")
+        self.timestamps = array("q")
+        self.levels = bytearray()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def append(self, offset, length, timestamp, level):
+        self.offsets.append(offset)
+        self.lengths.append(length)
+        self.timestamps.append(timestamp)
+        self.levels.append(level)
+
+    def load(self, data):
+        """Loads packed records, ignoring a trailing partial one. Returns the bytes used."""
+        usable = len(data) - len(data) % RECORD.size
+        for record in RECORD.iter_unpack(data[:usable]):
+            self.append(*record)
+        return usable
+
+    def clear(self):
+        del self.offsets[:], self.lengths[:], self.timestamps[:], self.levels[:]
+
+    def bounds(self, start=None, end=None):
+        """Slice of records inside [start, end]; events are appended in time order."""
+        lo = bisect_left(self.timestamps, start) if start is not None else 0
+        hi = bisect_left(self.timestamps, end + 1) if end is not None else len(self.offsets)
+        return lo, hi
+
+    def pick(self, lo, hi, codes, limit, forward=True):
+        """Returns (matching positions in ascending order, where the scan stopped)."""
+        picked = []
+        if forward:
+            seq = lo
+            while seq < hi and len(picked) < limit:
+                if codes is None or self.levels[seq] in codes:
+                    picked.append(seq)
+                seq += 1
+            return picked, seq
+        seq = hi - 1
+        while seq >= lo and len(picked) < limit:
+            if codes is None or self.levels[seq] in codes:
+                picked.append(seq)
+            seq -= 1
+        picked.reverse()
+        return picked, seq
+
+
+class Segment:
+    """A closed piece of the log, its index file and the time range it covers."""
+
+    def __init__(self, path, index_path, base, events, first_ts, last_ts):
+        self.path = path
+        self.index_path = index_path
+        self.base = base
+        self.events = events
+        self.first_ts = first_ts
+        self.last_ts = last_ts
+        self.cached = None
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["path"], data["index_path"], data["base"], data["events"], data["first_ts"], data["last_ts"])
+
+    def to_dict(self):
+        return {"path": self.path, "index_path": self.index_path, "base": self.base,
+                "events": self.events, "first_ts": self.first_ts, "last_ts": self.last_ts}
+
+    def overlaps(self, start, end):
+        if not self.events:
+            return False
+        return (start is None or self.last_ts >= start) and (end is None or self.first_ts <= end)
+
+    def records(self):
+        """Loads the segment's index on first use; closed segments never change."""
+        if self.cached is None:
+            records = IndexRecords()
+            with open(self.index_path, "rb") as f:
+                records.load(f.read()[len(MAGIC):])
+            self.cached = records
+        return self.cached
+
+
+class LogIndex:
+    """Segmented storage and sidecar index for the event lines in requests.log.
+
+    One fixed-size record per event (byte offset, length, timestamp, level) is
+    kept in memory and appended to `<log>.idx`, so a restart only scans what
+    was written after the last indexed line. Sequence ids run on across
+    segments and are what `/logs` hands out as a cursor.
+
+    The LogWriter calls `append` with every batch it writes, so the index
+    never runs ahead of the file, and then asks `due` whether to rotate.
+    Rotation renames the file and its index to `<log>.<timestamp>`, records
+    the segment's time range in `<log>.segments.json` so queries can skip it,
+    and compresses it on a background thread. `keep_segments` and `keep_days`
+    bound how many closed segments are kept.
+
+    A process that does not own the log opens it with `follow` instead of
+    `open`: it never writes, and `refresh` picks up the records and segments
+    the owning process added since the last call.
+    """
+
+    def __init__(self, log_path, index_path=None, max_bytes=None, max_age=None, compression="gzip",
+                 keep_segments=None, keep_days=None):
+        if compression is not None and compression not in COMPRESSORS:
+            raise ValueError(f"compression must be one of {tuple(COMPRESSORS)} or None, got {compression!r}")
+        self.log_path = log_path
+        self.index_path = index_path or log_path + ".idx"
+        self.manifest_path = log_path + ".segments.json"
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compression = compression
+        self.keep_segments = keep_segments
+        self.keep_days = keep_days
+        self.lock = threading.Lock()
+        self.active = IndexRecords()
+        self.base = 0
+        self.segments = []
+        self.scanned = 0
+        self.index_file = None
+        self.following = False
+        self.manifest_signature = None
+
+    def open(self):
+        """Loads the manifest and index file, rebuilding the index if it does not match the log."""
+        with self.lock:
+            self.load_manifest()
+            if not self.load():
+                self.reset()
+            self.index_file = open(self.index_path, "ab")
+            self.catch_up()
+            self.apply_retention()
+            pending = [segment for segment in self.segments if self.needs_compression(segment)]
+        # Finish compressions a previous run did not get to
+        for segment in pending:
+            self.compress_later(segment)
+        return self
+
+    def follow(self):
+        """Opens the index read-only, for a worker whose log is written by another process."""
+        with self.lock:
+            self.following = True
+            self.refresh_records()
+        return self
+
+    def refresh(self):
+        """Catches up with the owning process; a no-op for the owner itself."""
+        if self.following:
+            with self.lock:
+                self.refresh_records()
+
+    def refresh_records(self):
+        try:
+            stat = os.stat(self.manifest_path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+        if signature != self.manifest_signature:
+            # Rotated, compressed or expired segments: start over from the manifest
+            self.manifest_signature = signature
+            self.load_manifest()
+            self.active.clear()
+        try:
+            with open(self.index_path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                known = len(MAGIC) + len(self.active) * RECORD.size
+                if f.tell() < known:
+                    # The owner rebuilt the index
+                    self.active.clear()
+                    known = len(MAGIC)
+                f.seek(known)
+                self.active.load(f.read())
+        except FileNotFoundError:
+            self.active.clear()
+        self.scanned = self.active.offsets[-1] + self.active.lengths[-1] + 1 if self.active else 0
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return
+        self.base = manifest["next_base"]
+        self.segments = [Segment.from_dict(data) for data in manifest["segments"]]
+
+    def save_manifest(self):
+        manifest = {"next_base": self.base, "segments": [segment.to_dict() for segment in self.segments]}
+        directory = os.path.dirname(os.path.abspath(self.manifest_path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".segments-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(manifest, f, indent=4)
+            os.replace(temp_path, self.manifest_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def load(self):
+        try:
+            with open(self.index_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return False
+        if not data.startswith(MAGIC):
+            return False
+
+        # A crash can leave half a record at the end; drop it
+        body = data[len(MAGIC):]
+        usable = self.active.load(body)
+        if usable != len(body):
+            with open(self.index_path, "r+b") as f:
+                f.truncate(len(MAGIC) + usable)
+
+        if self.active and not self.matches_log(len(self.active) - 1):
+            # The log was truncated or replaced under us
+            self.active.clear()
+            return False
+        self.scanned = self.active.offsets[-1] + self.active.lengths[-1] + 1 if self.active else 0
+        return True
+
+    def matches_log(self, seq):
+        try:
+            with open(self.log_path, "rb") as f:
+                f.seek(self.active.offsets[seq])
+                line = f.read(self.active.lengths[seq])
+        except FileNotFoundError:
+            return False
+        parsed = parse_event(line)
+        return parsed is not None and parsed == (self.active.timestamps[seq], self.active.levels[seq])
+
+    def reset(self):
+        self.active.clear()
+        self.scanned = 0
+        with open(self.index_path, "wb") as f:
+            f.write(MAGIC)
+
+    def catch_up(self):
+        """Indexes whatever was appended to the log while we were not running."""
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, "rb") as f:
+            f.seek(self.scanned)
+            data = f.read()
+        # Leave a trailing partial line for the writer to finish
+        end = data.rfind(b"\n") + 1
+        self.index_chunk(self.scanned, data[:end])
+
+    def index_chunk(self, offset, data):
+        records = []
+        for line in data.split(b"\n")[:-1]:
+            parsed = parse_event(line)
+            if parsed is not None:
+                records.append(RECORD.pack(offset, len(line), *parsed))
+                self.active.append(offset, len(line), *parsed)
+            offset += len(line) + 1
+        self.scanned = offset
+        if records:
+            self.index_file.write(b"".join(records))
+            self.index_file.flush()
+
+    def append(self, offset, lines):
+        """Indexes a batch of lines the LogWriter just wrote starting at `offset`."""
+        data = "".join(line + "\n" for line in lines).encode("utf-8")
+        with self.lock:
+            if offset != self.scanned:
+                # Something else wrote to the file; pick up from where we stopped
+                self.catch_up()
+            else:
+                self.index_chunk(offset, data)
+
+    def due(self, size):
+        """Whether the active file has reached `max_bytes`, or its oldest event `max_age` seconds."""
+        if self.max_bytes is not None and size >= self.max_bytes:
+            return True
+        if self.max_age is None:
+            return False
+        with self.lock:
+            oldest = self.active.timestamps[0] if self.active else None
+        return oldest is not None and time.time() - oldest >= self.max_age
+
+    def rotate(self):
+        """Closes the active file as a segment. The LogWriter must have closed it first."""
+        with self.lock:
+            if not os.path.exists(self.log_path):
+                return
+            path = f"{self.log_path}.{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}"
+            taken = {segment.index_path for segment in self.segments}
+            candidate, suffix = path, 1
+            while candidate + ".idx" in taken or os.path.exists(candidate):
+                candidate, suffix = f"{path}-{suffix}", suffix + 1
+            path = candidate
+
+            self.index_file.close()
+            os.replace(self.log_path, path)
+            os.replace(self.index_path, path + ".idx")
+            segment = Segment(path, path + ".idx", self.base, len(self.active),
+                              min(self.active.timestamps, default=0), max(self.active.timestamps, default=0))
+            self.segments.append(segment)
+            self.base += len(self.active)
+
+            self.reset()
+            self.index_file = open(self.index_path, "ab")
+            self.apply_retention()
+            self.save_manifest()
+        if self.needs_compression(segment):
+            self.compress_later(segment)
+
+    def apply_retention(self):
+        """Deletes the oldest segments beyond `keep_segments` or older than `keep_days`."""
+        expired = []
+        if self.keep_segments is not None and len(self.segments) > self.keep_segments:
+            expired = self.segments[:len(self.segments) - self.keep_segments]
+        if self.keep_days is not None:
+            cutoff = time.time() - self.keep_days * 86400
+            expired += [segment for segment in self.segments if segment.last_ts < cutoff and segment not in expired]
+        if not expired:
+            return
+        self.segments = [segment for segment in self.segments if segment not in expired]
+        self.save_manifest()
+        for segment in expired:
+            for path in (segment.path, segment.index_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def needs_compression(self, segment):
+        return self.compression is not None and not segment.path.endswith(COMPRESSORS[self.compression][0])
+
+    def compress_later(self, segment):
+        threading.Thread(target=self.compress, args=(segment,), name="log-compress", daemon=True).start()
+
+    def compress(self, segment):
+        """Replaces a closed segment with a compressed copy."""
+        extension, opener = COMPRESSORS[self.compression]
+        source = segment.path
+        target = source + extension
+        try:
+            with open(source, "rb") as src, opener(target + ".tmp", "wb") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.replace(target + ".tmp", target)
+        except Exception as e:
+            logging.error(f"Error compressing log segment {source}: {e}")
+            if os.path.exists(target + ".tmp"):
+                os.remove(target + ".tmp")
+            return
+
+        with self.lock:
+            if segment not in self.segments:
+                # Retention dropped it while we were compressing
+                os.remove(target)
+                return
+            segment.path = target
+            self.save_manifest()
+        # A query that picked up the old path retries with the new one
+        os.remove(source)
+
+    def __len__(self):
+        return self.base + len(self.active)
+
+    def query(self, since=None, offset=None, limit=100, levels=DASHBOARD_LEVELS, start=None, end=None):
+        """Returns up to `limit` matching lines, oldest first, plus a cursor for the next call.
+
+        With `since` (a sequence id) or `offset` (a byte offset into the active
+        file) the scan runs forward from there; without either it returns the
+        newest `limit` matches. `start`/`end` are unix timestamps; closed
+        segments outside that window are skipped without being opened. The
+        returned cursor is the sequence id to pass as `since` to get only what
+        was logged afterwards; `has_more` means the scan stopped at `limit`
+        with records left over.
+        """
+        codes = None if levels is None else {LEVEL_CODES.get(level, -1) for level in levels}
+        self.refresh()
+        with self.lock:
+            total = self.base + len(self.active)
+            # (segment, or None for the active file, base sequence id, records) in log order
+            views = [(segment, segment.base, segment.records()) for segment in self.segments if segment.overlaps(start, end)]
+            views.append((None, self.base, self.active))
+
+            if since is not None or offset is not None:
+                first = self.base + bisect_left(self.active.offsets, offset) if offset is not None else 0
+                first = max(first, min(since, total)) if since is not None else first
+                picked, cursor, has_more = self.scan_forward(views, first, codes, limit, start, end)
+            else:
+                picked, cursor, has_more = self.scan_backward(views, codes, limit, start, end)
+            cursor = cursor if cursor is not None else total
+            # Byte offsets only mean something inside the active file
+            if cursor >= total:
+                next_offset = self.scanned
+            else:
+                next_offset = self.active.offsets[cursor - self.base] if cursor >= self.base else None
+
+        return {"logs": self.read_lines(picked), "cursor": cursor, "offset": next_offset, "has_more": has_more}
+
+    def scan_forward(self, views, first, codes, limit, start, end):
+        picked = []
+        cursor = first
+        for position, (segment, base, records) in enumerate(views):
+            lo, hi = records.bounds(start, end)
+            lo = max(lo, first - base)
+            if lo >= hi:
+                continue
+            found, stop = records.pick(lo, hi, codes, limit - len(picked))
+            picked += [(segment, records.offsets[seq], records.lengths[seq]) for seq in found]
+            cursor = base + stop
+            if len(picked) >= limit:
+                return picked, cursor, stop < hi or position < len(views) - 1
+        # Nothing left to scan: without an end time the cursor is the head of the log
+        return picked, None if end is None else cursor, False
+
+    def scan_backward(self, views, codes, limit, start, end):
+        picked = []
+        cursor = None
+        for position, (segment, base, records) in enumerate(reversed(views)):
+            lo, hi = records.bounds(start, end)
+            if lo >= hi:
+                continue
+            if end is not None and cursor is None:
+                cursor = base + hi
+            found, stop = records.pick(lo, hi, codes, limit - len(picked), forward=False)
+            picked = [(segment, records.offsets[seq], records.lengths[seq]) for seq in found] + picked
+            if len(picked) >= limit:
+                return picked, cursor, stop >= lo or position < len(views) - 1
+        return picked, cursor, False
+
+    def lines(self, levels=None):
+        """Yields every indexed event line, oldest first, reading one segment at a time."""
+        codes = None if levels is None else {LEVEL_CODES.get(level, -1) for level in levels}
+        self.refresh()
+        with self.lock:
+            views = [(segment, segment.records()) for segment in self.segments] + [(None, self.active)]
+        for segment, records in views:
+            with self.lock:
+                picked, _ = records.pick(0, len(records), codes, len(records))
+                spans = [(segment, records.offsets[seq], records.lengths[seq]) for seq in picked]
+            yield from self.read_lines(spans)
+
+    def read_lines(self, picked):
+        """Reads (segment, offset, length) spans, opening each file once."""
+        logs = []
+        position = 0
+        while position < len(picked):
+            segment = picked[position][0]
+            spans = []
+            while position < len(picked) and picked[position][0] is segment:
+                spans.append(picked[position][1:])
+                position += 1
+
+            path = self.log_path if segment is None else segment.path
+            while True:
+                try:
+                    with open_segment(path) as f:
+                        # Offsets ascend, so a compressed segment is decompressed in one pass
+                        for line_offset, length in spans:
+                            f.seek(line_offset)
+                            logs.append(f.read(length).decode("utf-8", errors="replace"))
+                    break
+                except FileNotFoundError:
+                    # Compressed since the query picked it; expired segments are just skipped
+                    if segment is None or segment.path == path:
+                        break
+                    path = segment.path
+        return logs
+
+    def stats(self):
+        self.refresh()
+        with self.lock:
+            return {
+                "events": self.base + len(self.active),
+                "following": self.following,
+                "first_seq": self.segments[0].base if self.segments else self.base,
+                "active_events": len(self.active),
+                "scanned_bytes": self.scanned,
+                "segments": len(self.segments),
+                "compression": self.compression,
+                "active_by_level": {LEVELS[code]: self.active.levels.count(code) for code in sorted(set(self.active.levels))},
+            }
+
+    def close(self):
+        with self.lock:
+            if self.index_file is not None:
+                self.index_file.close()
+                self.index_file = None
@@ -0,0 +1,214 @@
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+
+def escape_unencodable(line):
+    """Backslash-escapes what UTF-8 can't encode, such as a lone surrogate from a JSON "\\ud800"."""
+    return line.encode("utf-8", "backslashreplace").decode("utf-8")
+
+
+class LogWriter:
+    """Single background writer for the request log.
+
+    Producers call `write`, which only enqueues the line and never blocks; if
+    the bounded queue is full the line is dropped and counted instead. The
+    writer thread keeps the file open and appends lines in batches, flushing
+    when `batch_size` lines are waiting or `flush_interval` seconds have passed.
+
+    fsync policy: "always" syncs after every batch, "interval" at most every
+    `fsync_interval` seconds and "never" leaves it to the OS.
+
+    `on_batch(offset, lines)` is called on the writer thread after each batch
+    is flushed, with the byte offset the batch starts at. If a `rotator` is
+    given, its `due(size)` is asked after each batch; when it says so the file
+    is closed, `rotator.rotate()` moves it aside and a fresh file is opened.
+    """
+
+    def __init__(self, path, max_queue=10000, batch_size=256, flush_interval=0.2, fsync="interval", fsync_interval=1.0, on_batch=None, rotator=None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync policy must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.path = path
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.on_batch = on_batch
+        self.rotator = rotator
+        self.lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.fsyncs = 0
+        self.rotations = 0
+        self.last_fsync = time.monotonic()
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="log-writer", daemon=True)
+                self.thread.start()
+        return self
+
+    def write(self, line):
+        """Queues one line for writing. Returns False if it had to be dropped."""
+        try:
+            self.queue.put_nowait(line)
+            return True
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            return False
+
+    def next_batch(self):
+        """Waits up to `flush_interval` for a line, then drains up to `batch_size`."""
+        try:
+            batch = [self.queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        f = open(self.path, "a", encoding="utf-8")
+        try:
+            while not (self.stopping.is_set() and self.queue.empty()):
+                batch = self.next_batch()
+                if not batch:
+                    continue
+                try:
+                    self.write_batch(f, batch)
+                    if self.rotator is not None and self.rotator.due(f.tell()):
+                        f = self.rotate(f)
+                except Exception as e:
+                    with self.lock:
+                        self.dropped += len(batch)
+                    # The handler for `logging` also goes through this writer, so use stderr instead
+                    print(f"Error writing {len(batch)} log lines: {e}", file=sys.stderr)
+                finally:
+                    for _ in batch:
+                        self.queue.task_done()
+        finally:
+            f.close()
+
+    def rotate(self, f):
+        """Hands the closed file to the rotator and returns a fresh one."""
+        if self.fsync != "never":
+            os.fsync(f.fileno())
+        f.close()
+        try:
+            self.rotator.rotate()
+            with self.lock:
+                self.rotations += 1
+        except Exception as e:
+            print(f"Error rotating {self.path}: {e}", file=sys.stderr)
+        return open(self.path, "a", encoding="utf-8")
+
+    def write_batch(self, f, batch):
+        offset = f.tell()
+        try:
+            f.write("".join(line + "\n" for line in batch))
+        except UnicodeEncodeError:
+            # Nothing was written; escape the bad lines rather than lose the whole batch.
+            # on_batch gets the escaped lines, so index offsets match the file.
+            batch = [escape_unencodable(line) for line in batch]
+            f.write("".join(line + "\n" for line in batch))
+        f.flush()
+        now = time.monotonic()
+        synced = self.fsync == "always" or (self.fsync == "interval" and now - self.last_fsync >= self.fsync_interval)
+        if synced:
+            os.fsync(f.fileno())
+            self.last_fsync = now
+        with self.lock:
+            self.written += len(batch)
+            self.batches += 1
+            self.fsyncs += synced
+        if self.on_batch is not None:
+            # The lines are on disk by now, so a failing callback must not count them as dropped
+            try:
+                self.on_batch(offset, batch)
+            except Exception as e:
+                print(f"Error in on_batch after writing {len(batch)} log lines: {e}", file=sys.stderr)
+
+    def flush(self):
+        """Blocks until every queued line has been written."""
+        if self.thread is not None:
+            self.queue.join()
+
+    def close(self):
+        """Writes out whatever is queued and stops the writer thread."""
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "queued": self.queue.qsize(),
+                "written": self.written,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "fsyncs": self.fsyncs,
+                "rotations": self.rotations,
+                "fsync_policy": self.fsync,
+            }
+
+
+class ForwardingLogWriter:
+    """Stands in for LogWriter in a worker process that does not own the log file.
+
+    Each line is published on the event bus (see state_backend.EventBus) as
+    `{"line": ...}` and the owning worker writes it. Like LogWriter, `write`
+    only queues and never blocks.
+    """
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.lock = threading.Lock()
+        self.forwarded = 0
+        self.dropped = 0
+
+    def write(self, line):
+        sent = self.bus.publish({"line": line})
+        with self.lock:
+            if sent:
+                self.forwarded += 1
+            else:
+                self.dropped += 1
+        return sent
+
+    def flush(self):
+        self.bus.flush()
+
+    def close(self):
+        self.bus.flush()
+
+    def stats(self):
+        with self.lock:
+            return {"forwarded": self.forwarded, "dropped": self.dropped}
+
+
+class LogWriterHandler(logging.Handler):
+    """`logging` handler that shares the LogWriter instead of opening the file itself."""
+
+    def __init__(self, writer):
+        super().__init__()
+        self.writer = writer
+
+    def emit(self, record):
+        try:
+            self.writer.write(self.format(record))
+        except Exception:
+            self.handleError(record)
@@ -0,0 +1,137 @@
+import itertools
+import random
+import re
+import urllib.parse
+
+QUOTED_WORD = re.compile(r"'(\w+)'")
+LEADING_WORD = re.compile(r"^(\w{2,})'")
+SPACE = re.compile(r" ")
+
+# What a real username field might hold in front of an injected quote
+BENIGN_PREFIXES = ["john.smith", "alice", "m.garcia", "support", "jdoe1987", "admin", "test_user", "k.nguyen",
+                   "sales-team", "r2d2", "maria", "webmaster"]
+WHITESPACE = ["\t", "\n", "\r\n", "  ", "%09", "%20", "%0a", "+"]
+
+
+def mix_case(payload, rng):
+    return "".join(char.upper() if rng.random() < 0.5 else char.lower() for char in payload)
+
+
+def insert_comments(payload, rng):
+    # Replace some or all spaces, so both "/**/"-only and mixed forms appear
+    share = rng.choice((0.5, 1.0))
+    return SPACE.sub(lambda match: "/**/" if rng.random() < share else " ", payload)
+
+
+def vary_whitespace(payload, rng):
+    return SPACE.sub(lambda match: rng.choice(WHITESPACE), payload)
+
+
+def url_encode(payload, rng):
+    return urllib.parse.quote(payload, safe="")
+
+
+def double_url_encode(payload, rng):
+    return urllib.parse.quote(urllib.parse.quote(payload, safe=""), safe="")
+
+
+def encode_literals(payload, rng):
+    """Quoted words become hex or CHAR() literals: 'a' -> 0x61 or CHAR(97)"""
+    def encode(match):
+        text = match.group(1)
+        if rng.random() < 0.5:
+            return "0x" + text.encode("utf-8").hex()
+        return "CHAR(" + ",".join(str(ord(char)) for char in text) + ")"
+    return QUOTED_WORD.sub(encode, payload)
+
+
+def concatenate_strings(payload, rng):
+    """Split string literals into concatenations: admin' -> ad'||'min', 'abc' -> CONCAT('a','bc')"""
+    def split(text):
+        cut = rng.randint(1, len(text) - 1)
+        return text[:cut], text[cut:]
+
+    def split_quoted(match):
+        if len(match.group(1)) < 2:
+            return match.group(0)
+        left, right = split(match.group(1))
+        return rng.choice((f"'{left}'||'{right}'", f"CONCAT('{left}','{right}')", f"'{left}' '{right}'"))
+
+    def split_leading(match):
+        left, right = split(match.group(1))
+        return f"{left}'||'{right}'"
+
+    return LEADING_WORD.sub(split_leading, QUOTED_WORD.sub(split_quoted, payload))
+
+
+def pad_prefix(payload, rng):
+    """Put benign-looking text in front, from a short username up to a few hundred characters"""
+    words = [rng.choice(BENIGN_PREFIXES) for _ in range(rng.choice((1, 1, 2, 8, 32)))]
+    return rng.choice(("", ".", "_")).join(words) + payload
+
+
+# Applied in this order, so literals are rewritten before comments and
+# whitespace change what surrounds them, and encoding always comes last
+MUTATIONS = {
+    "encode_literals": encode_literals,
+    "concatenate_strings": concatenate_strings,
+    "pad_prefix": pad_prefix,
+    "mix_case": mix_case,
+    "insert_comments": insert_comments,
+    "vary_whitespace": vary_whitespace,
+}
+ENCODINGS = {
+    "url_encode": url_encode,
+    "double_url_encode": double_url_encode,
+}
+
+
+class PayloadMutator:
+    """Seeded generator of attack payload variants.
+
+    `payloads` maps category to base payloads, like automated.SQLI_PAYLOADS.
+    Each variant picks a category, a base payload and up to `max_mutations`
+    of MUTATIONS; with probability `encode_rate` it is then URL-encoded once
+    or twice. Variant `index` depends only on the seed and `index`, so the
+    same seed always yields the same sequence, any part of it can be produced
+    without the rest, and a corpus of any size costs no memory until it is
+    written out.
+    """
+
+    def __init__(self, payloads, seed=0, max_mutations=3, encode_rate=0.2, categories=None):
+        self.payloads = {category: list(payloads[category]) for category in (categories or payloads)}
+        self.categories = list(self.payloads)
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.max_mutations = max_mutations
+        self.encode_rate = encode_rate
+
+    def mutate(self, payload, rng):
+        """Returns (variant, names of the mutations applied)."""
+        count = rng.randint(0, min(self.max_mutations, len(MUTATIONS)))
+        chosen = set(rng.sample(list(MUTATIONS), count))
+        applied = []
+        for name, mutation in MUTATIONS.items():
+            if name in chosen:
+                mutated = mutation(payload, rng)
+                if mutated != payload:
+                    payload = mutated
+                    applied.append(name)
+        if rng.random() < self.encode_rate:
+            name = rng.choice(list(ENCODINGS))
+            payload = ENCODINGS[name](payload, rng)
+            applied.append(name)
+        return payload, applied
+
+    def variant(self, index):
+        """Returns corpus record `index` ({"category", "payload", "base", "mutations"})."""
+        rng = random.Random(f"{self.seed}:{index}")
+        category = rng.choice(self.categories)
+        base = rng.choice(self.payloads[category])
+        payload, applied = self.mutate(base, rng)
+        return {"category": category, "payload": payload, "base": base, "mutations": applied}
+
+    def stream(self, count=None):
+        """Yields corpus records in order, forever if `count` is None."""
+        indices = itertools.count() if count is None else range(count)
+        for index in indices:
+            yield self.variant(index)
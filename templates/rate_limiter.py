@@ -0,0 +1,101 @@
+import threading
+
+from ttl_store import TTLStore
+
+
+class SlidingWindowLimiter:
+    """Sliding-window counters for several independent limits at once.
+
+    Each key keeps the count of its current fixed window and the one before;
+    the sliding count is the previous count weighted by how much of it still
+    overlaps the last `window` seconds, plus the current count. That is O(1)
+    time and three numbers per key, and unlike a plain fixed window it does
+    not let a client spend two windows' worth of attempts across a boundary.
+
+    `hit` checks every (key, limit, window) it is given and only counts the
+    attempt if all of them allow it, so a rejected request never uses up any
+    budget. Counters live in `counters` (a TTLStore, or a shared store from
+    state_backend), so idle keys expire after two windows and the total is
+    capped; each check runs inside the store's `atomic()` block.
+    """
+
+    def __init__(self, counters=None, max_entries=100000):
+        self.counters = counters if counters is not None else TTLStore(max_entries=max_entries)
+        self.clock = self.counters.clock
+        self.lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = {}
+
+    def counts(self, key, window, now):
+        """Returns (window index, current count, previous count) for `key` at `now`."""
+        index = int(now // window)
+        stored_index, current, previous = self.counters.get(key, (index, 0, 0))
+        if stored_index == index:
+            return index, current, previous
+        if stored_index == index - 1:
+            return index, 0, current
+        return index, 0, 0
+
+    @staticmethod
+    def weighted(current, previous, window, now):
+        return previous * (1 - (now % window) / window) + current
+
+    def retry_after(self, current, previous, limit, window, now):
+        """Seconds until one more attempt fits under `limit`."""
+        until_next_window = window - now % window
+        if current + 1 > limit:
+            # The whole previous window must age out before the current one rolls over
+            return until_next_window + window * (1 - (limit - 1) / max(current, 1))
+        # The previous window's share has to shrink to make room for one attempt
+        needed = 1 - (limit - current - 1) / previous
+        return max(0.0, (needed - (now % window) / window) * window)
+
+    def count(self, key, window):
+        """Returns the sliding count for `key` without recording anything."""
+        with self.counters.atomic():
+            now = self.clock()
+            _, current, previous = self.counts(key, window, now)
+            return self.weighted(current, previous, window, now)
+
+    def hit(self, limits):
+        """Records one attempt against every (key, limit, window) in `limits`.
+
+        Returns None if the attempt was allowed, otherwise (key, retry after
+        seconds) for the first limit it would exceed; nothing is recorded then.
+        """
+        with self.counters.atomic():
+            now = self.clock()
+            states = []
+            for key, limit, window in limits:
+                index, current, previous = self.counts(key, window, now)
+                if self.weighted(current, previous, window, now) + 1 > limit:
+                    with self.lock:
+                        self.rejected[key[0]] = self.rejected.get(key[0], 0) + 1
+                    return key, self.retry_after(current, previous, limit, window, now)
+                states.append((key, window, index, current, previous))
+
+            for key, window, index, current, previous in states:
+                # A count is still needed while it can weigh on the next window
+                self.counters.set(key, (index, current + 1, previous), (index + 2) * window - now)
+        with self.lock:
+            self.allowed += 1
+        return None
+
+    def refund(self, key, window):
+        """Takes back one attempt recorded for `key` in the current window."""
+        with self.counters.atomic():
+            now = self.clock()
+            index, current, previous = self.counts(key, window, now)
+            if current > 0:
+                self.counters.set(key, (index, current - 1, previous), (index + 2) * window - now)
+
+    def reset(self, key):
+        self.counters.pop(key)
+
+    def clear(self):
+        self.counters.clear()
+
+    def stats(self):
+        with self.lock:
+            counts = {"allowed": self.allowed, "rejected": dict(self.rejected)}
+        return {**counts, "counters": self.counters.stats()}
@@ -0,0 +1,113 @@
+import gzip
+import json
+import time
+
+# Fields kept per record; "compact" is what Metrics.py needs, without response bodies
+FIELD_SETS = {
+    "full": None,
+    "compact": ("category", "payload", "status_code", "response_time", "latency_us", "intended_offset", "legitimate", "incorrect", "detected", "attack", "timestamp", "error"),
+}
+
+
+def open_text(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def is_json_lines(path):
+    return path.endswith(".jsonl") or path.endswith(".jsonl.gz")
+
+
+class ResultSink:
+    """Writes load-test result records to disk as they arrive.
+
+    `.jsonl` files get one compact JSON object per line; any other name gets
+    a JSON array written element by element and closed by `close`, so readers
+    of the old sqli_test_results.json format keep working. A `.gz` suffix
+    compresses either. The file is flushed at least every `flush_interval`
+    seconds, so an interrupted run keeps everything up to the last flush.
+    With `fields="compact"` records are cut down to FIELD_SETS["compact"];
+    summary records (`"record": "summary"`) are always written whole.
+    """
+
+    def __init__(self, path, fields="full", flush_interval=1.0):
+        if fields not in FIELD_SETS:
+            raise ValueError(f"fields must be one of {tuple(FIELD_SETS)}, got {fields!r}")
+        self.path = path
+        self.fields = FIELD_SETS[fields]
+        self.flush_interval = flush_interval
+        self.json_lines = is_json_lines(path)
+        self.file = open_text(path, "w")
+        self.count = 0
+        self.flushed_at = time.monotonic()
+        if not self.json_lines:
+            self.file.write("[\n")
+
+    def write(self, record):
+        if self.fields is not None and record.get("record") != "summary":
+            record = {field: record[field] for field in self.fields if field in record}
+        text = json.dumps(record, separators=(",", ":"))
+        if self.json_lines:
+            self.file.write(text + "\n")
+        else:
+            self.file.write((",\n" if self.count else "") + text)
+        self.count += 1
+        if time.monotonic() - self.flushed_at >= self.flush_interval:
+            self.file.flush()
+            self.flushed_at = time.monotonic()
+
+    def close(self):
+        if self.file.closed:
+            return
+        if not self.json_lines:
+            self.file.write("\n]\n")
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_json_lines(f):
+    try:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # The last line of an interrupted run may be cut short
+                return
+            yield record
+    except EOFError:
+        # A gzip stream that was never finished
+        return
+
+
+def iter_results(path):
+    """Yields every record in a results file, summary records included.
+
+    Accepts a JSON array, a JSON-lines file (read lazily), either gzipped,
+    and the wrapped open-loop report of earlier versions
+    (`{"latency": ..., "results": [...]}`), whose report becomes a summary record.
+    """
+    with open_text(path, "r") as f:
+        if is_json_lines(path):
+            yield from read_json_lines(f)
+            return
+        data = json.load(f)
+    if isinstance(data, dict):
+        yield from data["results"]
+        yield {"record": "summary", **{key: value for key, value in data.items() if key != "results"}}
+    else:
+        yield from data
+
+
+def read_results(path):
+    """Loads (records, summaries) from any format automated.py writes."""
+    records = []
+    summaries = []
+    for record in iter_results(path):
+        (summaries if record.get("record") == "summary" else records).append(record)
+    return records, summaries
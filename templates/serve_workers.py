@@ -0,0 +1,57 @@
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+def wait_for_port(port, timeout):
+    """Waits until something accepts connections on localhost:port"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+def start_worker(worker_id, port, state):
+    env = dict(os.environ, SQLI_WORKER_ID=str(worker_id), SQLI_PORT=str(port), SQLI_STATE_BACKEND=f"sqlite:{state}")
+    return subprocess.Popen([sys.executable, "App.py"], env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run several App.py workers that share security state through SQLite')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2,
+                        help='Number of worker processes; worker i listens on port + i')
+    parser.add_argument('--port', type=int, default=5000,
+                        help='Port of worker 0, which also owns requests.log')
+    parser.add_argument('--state', type=str, default='security_state.db',
+                        help='SQLite database holding the shared state and event bus')
+    args = parser.parse_args()
+
+    # Worker 0 creates users.db and the log index; the rest start once it is up
+    workers = [start_worker(0, args.port, args.state)]
+    if not wait_for_port(args.port, timeout=30):
+        workers[0].terminate()
+        sys.exit("Worker 0 did not start")
+    for worker_id in range(1, args.workers):
+        workers.append(start_worker(worker_id, args.port + worker_id, args.state))
+
+    # Put a sticky load balancer in front (websockets need every request of a client on one worker)
+    print(f"{args.workers} workers on ports {args.port}-{args.port + args.workers - 1}, state in {args.state}")
+    try:
+        while all(worker.poll() is None for worker in workers):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            if worker.poll() is None:
+                worker.send_signal(signal.SIGINT)
+        for worker in workers:
+            try:
+                worker.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                worker.kill()
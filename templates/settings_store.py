@@ -0,0 +1,121 @@
+import copy
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from types import MappingProxyType
+
+
+def freeze(value):
+    """Returns a read-only view of nested JSON data."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """Returns a mutable deep copy of data produced by `freeze`."""
+    if isinstance(value, MappingProxyType):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+class SettingsStore:
+    """In-process cache of a JSON settings file.
+
+    The file is parsed once and re-read only when its mtime or size changes
+    (checked at most every `check_interval` seconds) or after `save`. Readers
+    get an immutable snapshot, so one request never sees a half-applied
+    update, and writes go through a temp file plus rename so a concurrent
+    reader never sees a half-written file.
+
+    `on_change(snapshot)`, if given, is called with each newly loaded
+    snapshot, whether it came from `save` here or from a change another
+    process made to the file, so settings applied outside the store follow.
+    """
+
+    def __init__(self, path, defaults, check_interval=1.0, on_change=None):
+        self.path = path
+        self.defaults = freeze(copy.deepcopy(defaults))
+        self.check_interval = check_interval
+        self.on_change = on_change
+        self.lock = threading.Lock()
+        self.current = None
+        self.signature = None
+        self.checked_at = 0.0
+
+    def file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def refresh(self):
+        """Re-reads the file if it changed since the last load."""
+        with self.lock:
+            self.checked_at = time.monotonic()
+            signature = self.file_signature()
+            if self.current is not None and signature == self.signature:
+                return
+            previous = self.current
+
+            if signature is None:
+                self.current = self.defaults
+            else:
+                try:
+                    with open(self.path, 'r') as f:
+                        self.current = freeze(json.load(f))
+                except Exception as e:
+                    logging.error(f"Error loading security settings: {e}")
+                    # Keep serving the last good snapshot
+                    if self.current is None:
+                        self.current = self.defaults
+            self.signature = signature
+            current = self.current
+        if current is not previous:
+            self.changed(current)
+
+    def changed(self, snapshot):
+        # Outside the lock, so the callback may read the store
+        if self.on_change is not None:
+            self.on_change(snapshot)
+
+    def snapshot(self):
+        """Returns the current settings as an immutable mapping."""
+        if self.current is None or time.monotonic() - self.checked_at >= self.check_interval:
+            self.refresh()
+        return self.current
+
+    def as_dict(self):
+        """Returns a mutable deep copy of the current settings."""
+        return thaw(self.snapshot())
+
+    def save(self, settings):
+        """Atomically replaces the settings file and the cached snapshot."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self.lock:
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.settings-', suffix='.json')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(settings, f, indent=4)
+                    f.flush()
+                    os.fsync(f.fileno())
+                # mkstemp creates the file owner-only; keep the permissions of the file it replaces
+                os.chmod(temp_path, os.stat(self.path).st_mode & 0o777 if os.path.exists(self.path) else 0o644)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            self.current = freeze(copy.deepcopy(settings))
+            self.signature = self.file_signature()
+            self.checked_at = time.monotonic()
+            current = self.current
+        self.changed(current)
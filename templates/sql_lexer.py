@@ -0,0 +1,172 @@
+import re
+
+# Token kinds produced by `tokenize`
+KEYWORD, LOGIC, FUNCTION, IDENT, NUMBER, HEX, VARIABLE = "keyword", "logic", "function", "ident", "number", "hex", "variable"
+QUOTE, COMMENT, OPERATOR, OPEN, CLOSE, COMMA, SEMICOLON = "quote", "comment", "operator", "(", ")", ",", ";"
+
+KEYWORDS = {
+    "select", "from", "union", "all", "distinct", "where", "insert", "into", "values", "update", "set",
+    "delete", "drop", "table", "create", "alter", "truncate", "exec", "execute", "declare", "waitfor",
+    "delay", "order", "group", "by", "having", "limit", "offset", "null", "case", "when", "then", "else",
+    "end", "exists", "true", "false", "replace", "shutdown",
+}
+LOGIC_WORDS = {"or", "and", "xor", "not", "||", "&&"}
+COMPARISON_WORDS = {"like", "rlike", "regexp", "is", "in", "between", "sounds"}
+COMPARISONS = {"=", "==", "<", ">", "<=", ">=", "!=", "<>", "<=>"} | COMPARISON_WORDS
+
+# Statements that may follow a `;` or start a destructive pair
+STATEMENTS = {"select", "insert", "update", "delete", "drop", "create", "alter", "truncate", "exec",
+              "execute", "declare", "waitfor", "replace", "shutdown"}
+STATEMENT_PAIRS = {("insert", "into"), ("replace", "into"), ("delete", "from"), ("drop", "table"),
+                   ("alter", "table"), ("create", "table"), ("truncate", "table")}
+DELAY_FUNCTIONS = {"sleep", "pg_sleep", "benchmark"}
+DANGEROUS_FUNCTIONS = {
+    "concat", "concat_ws", "char", "chr", "unhex", "hex", "ascii", "substring", "substr", "mid",
+    "updatexml", "extractvalue", "load_file", "version", "database", "user", "current_user",
+    "system_user", "schema", "base64_decode", "from_base64", "xp_cmdshell", "md5", "floor", "rand",
+    "count", "group_concat", "convert", "cast",
+}
+SYSTEM_OBJECTS = {"information_schema", "xp_cmdshell", "table_name", "column_name", "schema_name",
+                  "sysobjects", "syscolumns", "pg_catalog", "mysql.user"}
+SYSTEM_VARIABLES = {"@@version", "@@hostname", "@@datadir", "@@basedir", "@@servername", "@@identity"}
+
+TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>--[^\n]*|\#[^\n]*|/\*.*?(?:\*/|$))
+  | (?P<quote>['"`])
+  | (?P<hex>0x[0-9a-f]+\b)
+  | (?P<number>\d+(?:\.\d+)?)
+  | (?P<variable>@@?[a-z0-9_.$]+)
+  | (?P<word>[a-z_$][a-z0-9_$.]*)
+  | (?P<operator><=>|<=|>=|<>|!=|==|\|\||&&|[=<>+\-*/%^|&~!])
+  | (?P<punct>[(),;])
+  | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+FINGERPRINTS = {
+    "union-select": "UNION [ALL] SELECT",
+    "stacked-query": "; followed by a new statement",
+    "time-delay": "SLEEP( / PG_SLEEP( / BENCHMARK( / WAITFOR DELAY",
+    "tautology": "OR/AND followed by a comparison or constant, e.g. ' OR n=n",
+    "quote-logic": "quote immediately followed by OR/AND",
+    "quote-comment": "quote followed by a comment terminator",
+    "subquery": "( SELECT",
+    "select-from": "SELECT ... FROM",
+    "statement": "destructive statement such as DROP TABLE or INSERT INTO",
+    "order-by": "ORDER BY n column probing",
+    "dangerous-function": "call to a function used for extraction or encoding",
+    "system-object": "reference to a system catalog or procedure",
+}
+
+
+def tokenize(text):
+    """Splits lowercased input into (kind, value) SQL tokens in one pass."""
+    tokens = []
+    for found in TOKEN.finditer(text):
+        group, value = found.lastgroup, found.group()
+        if group == "space" or group == "other":
+            continue
+        if group == "word":
+            if value in LOGIC_WORDS:
+                kind = LOGIC
+            elif value in COMPARISON_WORDS:
+                kind = OPERATOR
+            elif text[found.end():found.end() + 1] == "(" or text[found.end():found.end() + 2] == " (":
+                kind = FUNCTION
+            elif value in KEYWORDS:
+                kind = KEYWORD
+            else:
+                kind = IDENT
+        elif group == "operator":
+            kind = LOGIC if value in LOGIC_WORDS else OPERATOR
+        elif group == "punct":
+            kind = value
+        else:
+            kind = group
+        tokens.append((kind, value))
+    return tokens
+
+
+def is_operand(token):
+    return token[0] in (NUMBER, HEX, IDENT, VARIABLE, FUNCTION) or token in ((KEYWORD, "null"), (KEYWORD, "true"), (KEYWORD, "false"))
+
+
+def classify_tokens(tokens):
+    """Returns the name of the first injection fingerprint in `tokens`, or None."""
+    # Comments and quotes are transparent for keyword adjacency (`UNION/**/SELECT`, `' OR '1'='1`)
+    significant = [token for token in tokens if token[0] not in (COMMENT, QUOTE)]
+    seen_quote = False
+    seen_select = False
+
+    for i, (kind, value) in enumerate(tokens):
+        if kind == QUOTE:
+            if i + 1 < len(tokens) and tokens[i + 1][0] == LOGIC:
+                return "quote-logic"
+            seen_quote = True
+        elif kind == COMMENT and seen_quote:
+            return "quote-comment"
+
+    for i, token in enumerate(significant):
+        kind, value = token
+        following = significant[i + 1:i + 4]
+        next_token = following[0] if following else (None, None)
+
+        if kind == KEYWORD and value == "union":
+            rest = [t for t in following if t not in ((KEYWORD, "all"), (KEYWORD, "distinct"), (OPEN, "("))]
+            if rest and rest[0] == (KEYWORD, "select"):
+                return "union-select"
+        elif kind == SEMICOLON and next_token[1] in STATEMENTS:
+            return "stacked-query"
+        elif kind == FUNCTION and value in DELAY_FUNCTIONS:
+            return "time-delay"
+        elif kind == KEYWORD and value == "waitfor" and next_token == (KEYWORD, "delay"):
+            return "time-delay"
+        elif kind == LOGIC:
+            operands = [t for t in following if t != (OPEN, "(") and t != (LOGIC, "not")]
+            if len(operands) >= 3 and is_operand(operands[0]) and operands[1][1] in COMPARISONS and is_operand(operands[2]):
+                return "tautology"
+            if operands and operands[0][0] in (NUMBER, HEX) and len(operands) == 1 and i + 2 == len(significant):
+                return "tautology"
+            if operands and operands[0] in ((KEYWORD, "true"), (KEYWORD, "false")):
+                return "tautology"
+        elif kind == OPEN and next_token == (KEYWORD, "select"):
+            return "subquery"
+        elif kind == KEYWORD and value == "select":
+            seen_select = True
+        elif kind == KEYWORD and value == "from" and seen_select:
+            return "select-from"
+        elif (value, next_token[1]) in STATEMENT_PAIRS:
+            return "statement"
+        elif kind in (KEYWORD, FUNCTION, IDENT) and value in ("exec", "execute") and next_token[0] in (IDENT, FUNCTION, VARIABLE):
+            return "statement"
+        elif kind == KEYWORD and value == "update" and (KEYWORD, "set") in significant[i + 1:i + 5]:
+            return "statement"
+        elif kind == KEYWORD and value == "order" and len(following) >= 2 and following[0] == (KEYWORD, "by") and following[1][0] == NUMBER:
+            return "order-by"
+        elif kind == FUNCTION and value in DANGEROUS_FUNCTIONS:
+            return "dangerous-function"
+        elif (kind in (IDENT, FUNCTION) and value in SYSTEM_OBJECTS) or (kind == VARIABLE and value in SYSTEM_VARIABLES):
+            return "system-object"
+    return None
+
+
+class LexerEngine:
+    """Token-sequence detector with the same `match(*texts)` interface as DetectionEngine.
+
+    Texts come in (spaced, compressed) pairs, as scan_input passes them, and
+    only the whitespace-normalized form of each is tokenized: the compressed
+    form glues tokens together and is meaningless to a lexer.
+    """
+
+    fingerprint = "lexer-v1"
+
+    def match(self, *texts):
+        """Return the name of the fingerprint that fired on any spaced form, or None."""
+        for data in texts[::2]:
+            name = classify_tokens(tokenize(data))
+            if name is not None:
+                return name
+        return None
+
+
+lexer_engine = LexerEngine()
@@ -0,0 +1,328 @@
+import contextlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from ttl_store import TTLStore
+
+
+class MemoryBackend:
+    """Security state in this process only; the default for a single worker."""
+
+    owns_log = True
+    events = None
+
+    def store(self, name, max_entries):
+        return TTLStore(max_entries=max_entries)
+
+    def stats(self):
+        return {"backend": "memory"}
+
+
+class SQLiteBackend:
+    """Security state and a worker event bus in one SQLite database in WAL mode.
+
+    Every worker process opens the same file, so rate limits, blocks and OTPs
+    are shared, and WAL lets readers carry on while one writer commits. Each
+    thread gets its own connection. Worker "0" owns requests.log: the others
+    forward their log lines over the event bus instead of writing the file.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS state (
+            store TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (store, key)
+        );
+        CREATE INDEX IF NOT EXISTS state_expiry ON state (store, expires_at);
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            origin TEXT NOT NULL,
+            created REAL NOT NULL,
+            message TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS events_created ON events (created);
+    """
+
+    def __init__(self, path, worker_id="0", busy_timeout=5.0):
+        self.path = path
+        self.worker_id = str(worker_id)
+        self.busy_timeout = busy_timeout
+        self.owns_log = self.worker_id == "0"
+        self.local = threading.local()
+        conn = self.connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self.SCHEMA)
+        self.events = EventBus(self, origin=f"{self.worker_id}:{os.getpid()}")
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            # Autocommit; multi-statement updates go through transaction()
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+            self.local.depth = 0
+        return conn
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Runs the block in one write transaction; nested uses join the outer one."""
+        conn = self.connection()
+        if self.local.depth == 0:
+            # Take the write lock up front so read-modify-write cannot interleave
+            conn.execute("BEGIN IMMEDIATE")
+        self.local.depth += 1
+        try:
+            yield conn
+        except BaseException:
+            self.local.depth -= 1
+            if self.local.depth == 0:
+                conn.execute("ROLLBACK")
+            raise
+        self.local.depth -= 1
+        if self.local.depth == 0:
+            conn.execute("COMMIT")
+
+    def store(self, name, max_entries):
+        return SQLiteStore(self, name, max_entries)
+
+    def stats(self):
+        conn = self.connection()
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "worker_id": self.worker_id,
+            "owns_log": self.owns_log,
+            "journal_mode": conn.execute("PRAGMA journal_mode").fetchone()[0],
+            "events": self.events.stats(),
+        }
+
+
+def encode_key(key):
+    return json.dumps(key)
+
+
+class SQLiteStore:
+    """TTLStore's interface over one namespace of a SQLiteBackend.
+
+    Values are stored as JSON, so tuples come back as lists. Reads ignore
+    expired rows; every `maintain_every` writes this process deletes them and
+    trims the namespace to `max_entries` by dropping the rows closest to
+    expiring, so the cap can be overshot by at most that many writes.
+    """
+
+    def __init__(self, backend, name, max_entries, maintain_every=256):
+        self.backend = backend
+        self.name = name
+        self.max_entries = max_entries
+        self.maintain_every = maintain_every
+        self.clock = time.time
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.expired = 0
+        self.evicted = 0
+        self.hits = 0
+        self.misses = 0
+
+    def atomic(self):
+        return self.backend.transaction()
+
+    def tally(self, name, amount=1):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def fetch(self, conn, key, now):
+        return conn.execute("SELECT value, expires_at FROM state WHERE store = ? AND key = ? AND expires_at > ?",
+                            (self.name, encode_key(key), now)).fetchone()
+
+    def write(self, conn, key, value, expires_at):
+        conn.execute("INSERT INTO state (store, key, value, expires_at) VALUES (?, ?, ?, ?) "
+                     "ON CONFLICT (store, key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                     (self.name, encode_key(key), json.dumps(value), expires_at))
+        with self.lock:
+            self.writes += 1
+            due = self.writes % self.maintain_every == 0
+        if due:
+            self.maintain(conn, self.clock())
+
+    def maintain(self, conn, now):
+        expired = conn.execute("DELETE FROM state WHERE store = ? AND expires_at <= ?", (self.name, now)).rowcount
+        excess = conn.execute("SELECT COUNT(*) FROM state WHERE store = ?", (self.name,)).fetchone()[0] - self.max_entries
+        evicted = 0
+        if excess > 0:
+            evicted = conn.execute("DELETE FROM state WHERE rowid IN "
+                                   "(SELECT rowid FROM state WHERE store = ? ORDER BY expires_at LIMIT ?)",
+                                   (self.name, excess)).rowcount
+        self.tally("expired", expired)
+        self.tally("evicted", evicted)
+
+    def get(self, key, default=None):
+        row = self.fetch(self.backend.connection(), key, self.clock())
+        if row is None:
+            self.tally("misses")
+            return default
+        self.tally("hits")
+        return json.loads(row[0])
+
+    def __contains__(self, key):
+        return self.fetch(self.backend.connection(), key, self.clock()) is not None
+
+    def __len__(self):
+        return self.backend.connection().execute("SELECT COUNT(*) FROM state WHERE store = ? AND expires_at > ?",
+                                                 (self.name, self.clock())).fetchone()[0]
+
+    def set(self, key, value, ttl):
+        with self.atomic() as conn:
+            self.write(conn, key, value, self.clock() + ttl)
+
+    def increment(self, key, ttl, amount=1):
+        """Adds `amount` to a counter and returns it; a new counter lives for `ttl` seconds."""
+        with self.atomic() as conn:
+            now = self.clock()
+            row = self.fetch(conn, key, now)
+            if row is None:
+                self.write(conn, key, amount, now + ttl)
+                return amount
+            value = json.loads(row[0]) + amount
+            self.write(conn, key, value, row[1])
+            return value
+
+    def pop(self, key, default=None):
+        with self.atomic() as conn:
+            row = self.fetch(conn, key, self.clock())
+            conn.execute("DELETE FROM state WHERE store = ? AND key = ?", (self.name, encode_key(key)))
+        return default if row is None else json.loads(row[0])
+
+    def clear(self):
+        with self.atomic() as conn:
+            conn.execute("DELETE FROM state WHERE store = ?", (self.name,))
+
+    def stats(self):
+        with self.lock:
+            counters = {"expired": self.expired, "evicted": self.evicted, "hits": self.hits, "misses": self.misses}
+        return {"entries": len(self), "max_entries": self.max_entries, **counters}
+
+
+class EventBus:
+    """Fans messages out to the other worker processes through a SQLite table.
+
+    `publish` only queues a message; a publisher thread inserts queued
+    messages in batches, one transaction each. A subscriber thread polls for
+    rows newer than the last one it saw, skips its own and hands the rest to
+    the handler in publish order. Rows older than `retention` seconds are
+    deleted, so a worker that stalls longer than that misses messages.
+    """
+
+    def __init__(self, backend, origin, poll_interval=0.05, batch_size=500, max_queue=10000, retention=60.0):
+        self.backend = backend
+        self.origin = origin
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.retention = retention
+        self.outbox = queue.Queue(maxsize=max_queue)
+        self.lock = threading.Lock()
+        self.handler = None
+        self.last_id = 0
+        self.published = 0
+        self.dropped = 0
+        self.received = 0
+        self.errors = 0
+
+    def publish(self, message):
+        """Queues a JSON-ready message for the other workers. Returns False if it was dropped."""
+        try:
+            self.outbox.put_nowait(json.dumps(message))
+            return True
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            return False
+
+    def start(self, handler):
+        """Starts publishing, and delivering messages other workers publish from now on to `handler`."""
+        self.handler = handler
+        row = self.backend.connection().execute("SELECT MAX(id) FROM events").fetchone()
+        self.last_id = row[0] or 0
+        threading.Thread(target=self.run_publisher, name="event-bus-publish", daemon=True).start()
+        threading.Thread(target=self.run_subscriber, name="event-bus-poll", daemon=True).start()
+        return self
+
+    def run_publisher(self):
+        while True:
+            batch = [self.outbox.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.outbox.get_nowait())
+                except queue.Empty:
+                    break
+            now = time.time()
+            try:
+                with self.backend.transaction() as conn:
+                    conn.executemany("INSERT INTO events (origin, created, message) VALUES (?, ?, ?)",
+                                     [(self.origin, now, message) for message in batch])
+                with self.lock:
+                    self.published += len(batch)
+            except sqlite3.Error as e:
+                with self.lock:
+                    self.dropped += len(batch)
+                logging.error(f"Event bus publish failed: {e}")
+            finally:
+                for _ in batch:
+                    self.outbox.task_done()
+
+    def run_subscriber(self):
+        pruned_at = 0.0
+        while True:
+            try:
+                self.poll()
+                if time.time() - pruned_at >= self.retention / 2:
+                    pruned_at = time.time()
+                    self.backend.connection().execute("DELETE FROM events WHERE created < ?", (pruned_at - self.retention,))
+            except sqlite3.Error as e:
+                logging.error(f"Event bus poll failed: {e}")
+            time.sleep(self.poll_interval)
+
+    def poll(self):
+        while True:
+            rows = self.backend.connection().execute(
+                "SELECT id, origin, message FROM events WHERE id > ? ORDER BY id LIMIT ?",
+                (self.last_id, self.batch_size)).fetchall()
+            for row_id, origin, message in rows:
+                self.last_id = row_id
+                if origin == self.origin:
+                    continue
+                try:
+                    self.handler(json.loads(message))
+                    with self.lock:
+                        self.received += 1
+                except Exception as e:
+                    with self.lock:
+                        self.errors += 1
+                    logging.error(f"Event bus handler failed: {e}")
+            if len(rows) < self.batch_size:
+                return
+
+    def flush(self):
+        """Blocks until every queued message has been inserted."""
+        self.outbox.join()
+
+    def stats(self):
+        with self.lock:
+            return {"origin": self.origin, "queued": self.outbox.qsize(), "published": self.published,
+                    "dropped": self.dropped, "last_id": self.last_id, "received": self.received, "errors": self.errors}
+
+
+def make_backend(spec="memory", worker_id="0"):
+    """Returns the backend for `spec`: "memory" or "sqlite:<path>"."""
+    if spec == "memory":
+        return MemoryBackend()
+    if spec.startswith("sqlite:"):
+        return SQLiteBackend(spec[len("sqlite:"):], worker_id)
+    raise ValueError(f"Unknown state backend {spec!r}; use 'memory' or 'sqlite:<path>'")
@@ -0,0 +1,54 @@
+import time
+
+from aggregates import ATTACK_LEVEL, RollingAggregates
+from log_broadcast import LogBroadcaster
+
+
+def apply(snapshot, delta):
+    """What the dashboard does with a delta, on the totals it keeps."""
+    levels = dict(snapshot["levels"])
+    for level, count in delta["levels"].items():
+        levels[level] = levels.get(level, 0) + count
+    return {**snapshot, "seq": delta["seq"], "levels": levels}
+
+
+def test_snapshot_plus_later_deltas_counts_every_event_once():
+    aggregates = RollingAggregates()
+    now = time.time()
+    aggregates.add(now, ATTACK_LEVEL, "10.0.0.1", "Tautology")
+    first = aggregates.drain_delta()
+    aggregates.add(now, ATTACK_LEVEL, "10.0.0.2", "Tautology")
+
+    # Taken while the second event is still pending, as when a GET races a flush
+    snapshot = aggregates.snapshot()
+    aggregates.add(now, "FAILED LOGIN", "10.0.0.3")
+    second = aggregates.drain_delta()
+
+    assert first["seq"] <= snapshot["seq"] < second["seq"]
+    assert apply(snapshot, second)["levels"] == {ATTACK_LEVEL: 2, "FAILED LOGIN": 1}
+    assert snapshot["top_ips"] == [{"ip": "10.0.0.1", "count": 1}]
+
+
+def test_skipped_client_gets_the_deltas_it_missed():
+    aggregates = RollingAggregates()
+    frames = []
+    broadcaster = LogBroadcaster(lambda event, data, to, callback: frames.append(data), max_inflight=1,
+                                 extras=lambda: {"aggregates": aggregates.drain_delta()},
+                                 merge_extras=lambda older, newer: {"aggregates": RollingAggregates.merge_deltas(older["aggregates"], newer["aggregates"])})
+    broadcaster.add_client("sid")
+    now = time.time()
+    for ip in ("10.0.0.1", "10.0.0.2", "10.0.0.3"):
+        aggregates.add(now, ATTACK_LEVEL, ip)
+        broadcaster.publish(ATTACK_LEVEL, ip)
+        broadcaster.flush()
+    assert len(frames) == 1
+
+    broadcaster.acknowledge("sid")
+    aggregates.add(now, ATTACK_LEVEL, "10.0.0.4")
+    broadcaster.publish(ATTACK_LEVEL, "10.0.0.4")
+    broadcaster.flush()
+
+    missed = frames[1]["skipped"]["aggregates"]
+    assert (missed["first_seq"], missed["seq"]) == (2, 3)
+    assert missed["ips"] == {"10.0.0.2": 1, "10.0.0.3": 1}
+    assert frames[1]["aggregates"]["seq"] == 4
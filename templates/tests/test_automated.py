@@ -0,0 +1,25 @@
+from collections import Counter
+
+from automated import WorkerPlan
+
+
+def test_worker_shards_add_up_to_the_single_process_plan():
+    full = list(WorkerPlan(1000, seed=7))
+    shards = [WorkerPlan(1000, seed=7, worker_index=index, worker_count=3) for index in range(3)]
+    assert [len(shard) for shard in shards] == [334, 333, 333]
+
+    merged = [None] * 1000
+    for index, shard in enumerate(shards):
+        merged[index::3] = list(shard)
+    assert merged == full
+
+    categories = Counter(category for _, category, _ in full)
+    assert categories["Legitimate"] == 100
+    assert categories["Incorrect"] == 200
+
+
+def test_worker_plan_only_generates_its_own_entries():
+    plan = WorkerPlan(10 ** 9, seed=1, worker_index=3, worker_count=4)
+    assert len(plan) == 250_000_000
+    assert plan[0] == plan.entry(3)
+    assert plan[-1] == plan.entry(10 ** 9 - 1)
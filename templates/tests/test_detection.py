@@ -0,0 +1,122 @@
+import random
+import re
+import time
+import urllib.parse
+
+import detection
+from detection import DANGEROUS_PATTERNS, SAFE_INPUT, normalize_input, normalized_forms, scan_input, strip_inline_comments
+
+# Non-ASCII characters `(?i)` matches against an ASCII letter, before and after `.lower()`
+CASE_FOLD_VARIANTS = {"s": ["\u017f"], "i": ["\u0131", "\u0130"], "k": ["\u212a"]}
+
+
+def test_strip_inline_comments_matches_regex():
+    regex = re.compile(r"/\*.*?\*/")
+    rng = random.Random(0)
+    for _ in range(20000):
+        data = "".join(rng.choice("/*a*/x") for _ in range(rng.randint(0, 16)))
+        assert strip_inline_comments(data) == regex.sub("", data)
+
+
+def test_unterminated_comments_normalize_in_linear_time():
+    started = time.perf_counter()
+    normalize_input("/*a" * 32000)
+    assert time.perf_counter() - started < 0.5
+
+
+def pattern_loop_detect(data):
+    """The original per-pattern loop, each rule compiled with its own flags."""
+    return any(re.search(pattern, data) or re.search(pattern, compressed_data)
+               for data, compressed_data in normalized_forms(data) if not SAFE_INPUT.fullmatch(data)
+               for pattern in DANGEROUS_PATTERNS)
+
+
+def baseline_detect(data):
+    """The unquote/replace/re.sub chain and pattern loop detection started from."""
+    data = re.sub(r"\s+", " ", urllib.parse.unquote(data).replace("+", " ")).strip().lower()
+    if SAFE_INPUT.fullmatch(data):
+        return False
+    compressed_data = re.sub(r"\s+", "", data)
+    return any(re.search(pattern, data) or re.search(pattern, compressed_data) for pattern in DANGEROUS_PATTERNS)
+
+
+def test_engine_matches_case_fold_equivalents():
+    assert scan_input("\u017felect * from users", detection.engine) is not None
+    assert scan_input("un\u0131on select password", detection.engine) is not None
+
+    keywords = ["select * from users", "union select 1", "unIon ALL select", "exec xp_cmdshell", "sleep(5)",
+                "waitfor delay", "table_name", "schema_name", "null is null", "case when", "drop table x",
+                "insert into t", "or 1=1", "unhex(", "base64_decode(", "char(65,66)", "pg_sleep", "current_user"]
+    rng = random.Random(0)
+    for _ in range(5000):
+        text = rng.choice(keywords)
+        data = "".join(rng.choice(CASE_FOLD_VARIANTS[ch.lower()]) if ch.lower() in CASE_FOLD_VARIANTS and rng.random() < 0.5 else ch
+                       for ch in text)
+        assert (scan_input(data, detection.engine) is not None) == pattern_loop_detect(data), data
+
+
+def test_entity_decoding_keeps_baseline_hits():
+    for data in ("&#8;", "&#65;", "w&#8y", "4&Icy;3", "%26%2359%3b"):
+        assert baseline_detect(data)
+        assert scan_input(data, detection.engine) is not None, data
+
+    rng = random.Random(0)
+    for _ in range(20000):
+        data = "".join(rng.choice(["&#", "&", "#", ";", "%26", "%23", "%3b", "a", "4", "icy", "amp", " "])
+                       for _ in range(rng.randint(1, 6)))
+        if baseline_detect(data):
+            assert scan_input(data, detection.engine) is not None, data
+
+
+def test_verdict_cache_evicts_least_recently_used():
+    cache = detection.VerdictCache(maxsize=2)
+    first, second, third = (detection.VerdictCache.key("f", data) for data in ("a", "b", "c"))
+    cache.put(first, 1)
+    cache.put(second, None)
+    assert cache.get(first) == (True, 1)
+    cache.put(third, 3)
+
+    assert cache.get(second) == (False, None)
+    assert cache.get(first) == (True, 1)
+    assert cache.get(third) == (True, 3)
+    assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 3, "misses": 1, "evictions": 1, "hit_rate": 0.75}
+
+
+def test_verdict_cache_keys_on_pattern_fingerprint_not_raw_input():
+    key = detection.VerdictCache.key("f", "hunter2")
+    assert "hunter2" not in repr(key)
+    assert key == detection.VerdictCache.key("f", "hunter2")
+    assert key != detection.VerdictCache.key("g", "hunter2")
+
+    try:
+        assert detection.match_sql_injection("zzz top") is None
+        reloaded = detection.reload_patterns(["zzz"])
+        assert detection.verdict_cache.stats()["size"] == 0
+        assert detection.match_sql_injection("zzz top") == 0
+        assert reloaded.fingerprint != detection.DetectionEngine(DANGEROUS_PATTERNS).fingerprint
+    finally:
+        detection.reload_patterns()
+
+
+def test_detect_batch_pool_path_matches_serial_path(monkeypatch):
+    rng = random.Random(0)
+    words = ["select", "from", "users", "1=1", "'", "or", "alice", "union", "sleep(5)", "--", "%27", "x"]
+    inputs = [" ".join(rng.choice(words) for _ in range(rng.randint(1, 5))) for _ in range(400)]
+    inputs += inputs[:50] + ["", "a" * 2000]
+    serial = [detection.match_sql_injection(data[:1024]) for data in inputs]
+
+    monkeypatch.setattr(detection, "PARALLEL_BATCH_THRESHOLD", 10)
+    monkeypatch.setattr(detection, "BATCH_CHUNK_SIZE", 64)
+    monkeypatch.setattr(detection.os, "cpu_count", lambda: 4)
+    monkeypatch.setattr(detection, "batch_pool", None)
+    detection.verdict_cache.clear()
+    try:
+        assert detection.detect_batch(inputs, max_length=1024) == serial
+        # Pool workers rebuild their engine when the parent's patterns change
+        detection.reload_patterns(["alice"])
+        expected = [scan_input(data[:1024], detection.engine) if data else None for data in inputs]
+        assert 0 in expected
+        assert detection.detect_batch(inputs, max_length=1024) == expected
+    finally:
+        detection.reload_patterns()
+        detection.get_batch_pool().shutdown()
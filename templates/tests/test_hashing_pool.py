@@ -0,0 +1,45 @@
+import threading
+
+import pytest
+
+from hashing_pool import HashingPool, PoolSaturated
+
+
+def test_full_pool_refuses_work_with_a_retry_hint():
+    pool = HashingPool(workers=1, max_queue=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pool.run(slow))) for _ in range(2)]
+    threads[0].start()
+    assert started.wait(5)
+    threads[1].start()
+    while pool.stats()["queue_depth"] < 1:
+        threading.Event().wait(0.001)
+
+    with pytest.raises(PoolSaturated) as refused:
+        pool.run(lambda: "never runs")
+    assert refused.value.retry_after >= 1
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["done", "done"]
+    stats = pool.stats()
+    assert (stats["completed"], stats["rejected"], stats["queue_depth"], stats["running"]) == (2, 1, 0, 0)
+
+    # Slots come back once the backlog drains
+    assert pool.run(lambda: 42) == 42
+
+
+def test_retry_after_scales_with_backlog():
+    pool = HashingPool(workers=2, max_queue=8)
+    pool.completed, pool.hash_total = 10, 5.0
+    pool.queued, pool.running = 8, 2
+    assert pool.retry_after() == 3
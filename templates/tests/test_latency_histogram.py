@@ -0,0 +1,58 @@
+import json
+import math
+import random
+
+import pytest
+
+from latency_histogram import LatencyHistogram
+
+
+def exact_percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(percent / 100 * len(ordered))) - 1]
+
+
+def test_percentiles_stay_within_the_precision():
+    rng = random.Random(0)
+    values = [int(rng.lognormvariate(9, 1.5)) for _ in range(50000)] + [0, 1, 3_600_000_000]
+    histogram = LatencyHistogram(significant_digits=3)
+    for value in values:
+        histogram.record(value)
+
+    for percent in (1, 50, 90, 99, 99.9, 100):
+        exact = exact_percentile(values, percent)
+        assert exact <= histogram.percentile(percent) <= max(exact * 1.001, exact + 1), percent
+    assert histogram.percentile(100) == histogram.max == 3_600_000_000
+    assert histogram.min == 0
+    # Logarithmic in the range, not linear in the samples
+    assert len(histogram.counts) < 20000
+
+
+def test_small_values_are_exact():
+    histogram = LatencyHistogram()
+    for value in range(2048):
+        histogram.record(value)
+    assert histogram.percentile(50) == 1023
+    assert histogram.summary()["p99_ms"] == pytest.approx(2.027)
+
+
+def test_merge_matches_recording_everything_in_one():
+    rng = random.Random(1)
+    parts = [[rng.randint(100, 10_000_000) for _ in range(5000)] for _ in range(3)]
+    merged = LatencyHistogram()
+    single = LatencyHistogram()
+    for values in parts:
+        shard = LatencyHistogram()
+        for value in values:
+            shard.record(value)
+            single.record(value)
+        # Shards reach the merge as JSON written by each worker
+        merged.merge(LatencyHistogram.from_dict(json.loads(json.dumps(shard.to_dict()))))
+
+    assert merged.to_dict() == single.to_dict()
+    assert merged.summary() == single.summary()
+    # An empty shard changes nothing
+    assert merged.merge(LatencyHistogram()).to_dict() == single.to_dict()
+
+    with pytest.raises(ValueError):
+        merged.merge(LatencyHistogram(significant_digits=2))
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+from load_client import ConnectionPool
+
+
+async def serve(respond):
+    """Starts a keep-alive HTTP server on a free port; `respond(n, body)` returns (raw response, keep open)."""
+    served = [0]
+
+    async def handle(reader, writer):
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.IncompleteReadError:
+                # The client closed an idle connection
+                writer.close()
+                return
+            length = int(next(line.split(b":")[1] for line in head.split(b"\r\n") if line.lower().startswith(b"content-length")))
+            body = await reader.readexactly(length)
+            served[0] += 1
+            response, keep_open = respond(served[0], body)
+            if response:
+                writer.write(response)
+                await writer.drain()
+            if not keep_open:
+                writer.close()
+                return
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def json_response(payload, extra=""):
+    body = json.dumps(payload).encode()
+    return f"HTTP/1.1 200 OK\r\nContent-Length: {len(body)}\r\n{extra}\r\n".encode() + body
+
+
+def test_requests_reuse_keep_alive_connections():
+    async def run():
+        server, port = await serve(lambda n, body: (json_response({"n": n, "echo": json.loads(body)}), True))
+        pool = ConnectionPool(f"http://127.0.0.1:{port}/login", size=2)
+        results = await asyncio.gather(*(pool.post_json(json.dumps({"i": i}).encode()) for i in range(20)))
+        await pool.close()
+        server.close()
+        return pool, results
+
+    pool, results = asyncio.run(run())
+    assert [json.loads(body)["echo"] for _, _, body in results] == [{"i": i} for i in range(20)]
+    assert all(status == 200 for status, _, _ in results)
+    assert pool.stats()["opened"] == 2 and pool.stats()["reused"] == 18
+
+
+def test_chunked_and_close_delimited_bodies():
+    def respond(n, body):
+        if n == 1:
+            return b"HTTP/1.1 201 Created\r\nTransfer-Encoding: chunked\r\n\r\n3\r\nabc\r\n2;x=y\r\nde\r\n0\r\n\r\n", True
+        return b"HTTP/1.0 200 OK\r\n\r\nuntil close", False
+
+    async def run():
+        server, port = await serve(respond)
+        pool = ConnectionPool(f"http://127.0.0.1:{port}/", size=1)
+        first = await pool.request("GET")
+        second = await pool.request("GET")
+        server.close()
+        return pool, first, second
+
+    pool, first, second = asyncio.run(run())
+    assert first[0] == 201 and first[2] == b"abcde"
+    assert second[0] == 200 and second[2] == b"until close"
+    assert pool.stats()["idle"] == 0
+
+
+def test_request_on_a_dropped_connection_is_retried_once():
+    # The server silently drops the connection on the second request it reads
+    def respond(n, body):
+        if n == 2:
+            return None, False
+        return json_response({"n": n}), True
+
+    async def run():
+        server, port = await serve(respond)
+        pool = ConnectionPool(f"http://127.0.0.1:{port}/", size=1)
+        first = await pool.post_json(b"{}")
+        second = await pool.post_json(b"{}")
+        server.close()
+        return pool, first, second
+
+    pool, first, second = asyncio.run(run())
+    assert json.loads(first[2]) == {"n": 1} and json.loads(second[2]) == {"n": 3}
+    assert pool.stats()["closed_by_server"] == 1 and pool.stats()["opened"] == 2
@@ -0,0 +1,25 @@
+from log_broadcast import LogBroadcaster
+
+
+def test_idle_client_gets_no_empty_frames_while_another_is_backlogged():
+    frames = []
+    broadcaster = LogBroadcaster(lambda event, data, to, callback: frames.append((to, data)), max_inflight=1)
+    broadcaster.add_client("slow")
+    broadcaster.add_client("healthy")
+
+    # Both get the first frame; only the healthy client acks it
+    broadcaster.publish("INFO", "first")
+    broadcaster.flush()
+    broadcaster.acknowledge("healthy")
+
+    # The slow client now has a backlog, which keeps flushes coming
+    broadcaster.publish("INFO", "second")
+    broadcaster.flush()
+    broadcaster.acknowledge("healthy")
+    for _ in range(10):
+        broadcaster.flush()
+
+    healthy = [frame for to, frame in frames if to == "healthy"]
+    assert [frame["logs"] for frame in healthy] == [["first"], ["second"]]
+    assert broadcaster.stats()["frames_sent"] == 3
+    assert broadcaster.clients["healthy"].inflight == 0
@@ -0,0 +1,126 @@
+import datetime
+
+from log_index import LogIndex
+
+
+def event(level, ts, n):
+    stamp = datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+    return f"[{stamp}] [IP: 10.0.0.{n % 250}] [{level}] event {n}"
+
+
+def write(path, index, lines):
+    """Appends `lines` the way the LogWriter does and hands them to the index."""
+    offset = path.stat().st_size if path.exists() else 0
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("".join(line + "\n" for line in lines))
+    index.append(offset, lines)
+
+
+def test_cursor_pages_forward_and_picks_up_new_lines(tmp_path):
+    path = tmp_path / "requests.log"
+    index = LogIndex(str(path)).open()
+    lines = [event("FAILED LOGIN" if n % 2 else "SQLI ATTEMPT", 1700000000 + n, n) for n in range(10)]
+    write(path, index, lines[:4] + ["a traceback line that is not an event"] + lines[4:])
+
+    newest = index.query(limit=3)
+    assert newest["logs"] == lines[-3:]
+    assert newest["cursor"] == 10 and newest["has_more"]
+
+    page = index.query(since=0, limit=4)
+    assert page["logs"] == lines[:4]
+    assert page["cursor"] == 4 and page["has_more"]
+    page = index.query(since=page["cursor"], limit=100)
+    assert page["logs"] == lines[4:]
+    assert page["cursor"] == 10 and not page["has_more"]
+
+    more = [event("RATE LIMITED", 1700000100, 10)]
+    write(path, index, more)
+    assert index.query(since=page["cursor"])["logs"] == more
+    index.close()
+
+
+def test_level_and_time_filters(tmp_path):
+    path = tmp_path / "requests.log"
+    index = LogIndex(str(path)).open()
+    lines = [event(("FAILED LOGIN", "SQLI ATTEMPT", "2FA")[n % 3], 1700000000 + n * 60, n) for n in range(30)]
+    write(path, index, lines)
+
+    assert index.query(since=0, levels=["SQLI ATTEMPT"])["logs"] == lines[1::3]
+    # 2FA is not one of the dashboard's default levels
+    assert all("[2FA]" not in line for line in index.query(since=0)["logs"])
+    assert len(index.query(since=0, levels=None)["logs"]) == 30
+
+    window = index.query(since=0, levels=None, start=1700000000 + 10 * 60, end=1700000000 + 14 * 60)
+    assert window["logs"] == lines[10:15]
+
+
+def test_reopen_reuses_the_index_and_catches_up(tmp_path):
+    path = tmp_path / "requests.log"
+    index = LogIndex(str(path)).open()
+    lines = [event("FAILED LOGIN", 1700000000 + n, n) for n in range(5)]
+    write(path, index, lines)
+    index.close()
+
+    # Written while nothing was indexing, e.g. before a restart
+    extra = event("SQLI ATTEMPT", 1700000010, 5)
+    with open(path, "a") as f:
+        f.write(extra + "\n")
+
+    reopened = LogIndex(str(path)).open()
+    assert reopened.query(since=0)["logs"] == lines + [extra]
+    reopened.close()
+
+
+def rotate(path, index, lines):
+    write(path, index, lines)
+    index.rotate()
+
+
+def test_rotation_keeps_sequence_ids_and_compresses_segments(tmp_path):
+    path = tmp_path / "requests.log"
+    # Compressed by hand below rather than on the background thread
+    index = LogIndex(str(path), compression=None).open()
+    first = [event("FAILED LOGIN", 1700000000 + n, n) for n in range(5)]
+    second = [event("SQLI ATTEMPT", 1700001000 + n, n) for n in range(5)]
+    rotate(path, index, first)
+    write(path, index, second)
+
+    assert len(index) == 10
+    assert index.query(since=3)["logs"] == first[3:] + second
+    segment = index.segments[0]
+    segment_path = segment.path
+    index.compression = "gzip"
+    index.compress(segment)
+    assert segment.path == segment_path + ".gz" and not (tmp_path / segment_path).exists()
+    assert index.query(since=0, levels=["FAILED LOGIN"])["logs"] == first
+    # Segments outside the time window are never opened
+    assert index.query(since=0, levels=None, start=1700001000)["logs"] == second
+    index.close()
+
+    reopened = LogIndex(str(path), compression="gzip").open()
+    assert len(reopened) == 10
+    assert [s.to_dict() for s in reopened.segments] == [segment.to_dict()]
+    assert reopened.query(since=0)["logs"] == first + second
+    reopened.close()
+
+
+def test_retention_drops_oldest_segments(tmp_path):
+    path = tmp_path / "requests.log"
+    index = LogIndex(str(path), compression=None, keep_segments=2).open()
+    batches = [[event("FAILED LOGIN", 1700000000 + b * 100 + n, n) for n in range(3)] for b in range(4)]
+    for batch in batches:
+        rotate(path, index, batch)
+
+    assert len(index.segments) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        # The writer recreates the active file on its next batch
+        [path.name + ".idx", path.name + ".segments.json"]
+        + [name for s in index.segments for name in (s.path.rsplit("/", 1)[-1], s.index_path.rsplit("/", 1)[-1])])
+    # Expired ids are gone, later ones keep their numbers
+    assert index.query(since=0)["logs"] == batches[2] + batches[3]
+    assert index.stats()["first_seq"] == 6
+
+    aged = LogIndex(str(path), compression=None, keep_days=1).open()
+    assert aged.segments == [] and len(aged) == 12
+    index.close()
+    aged.close()
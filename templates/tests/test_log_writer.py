@@ -0,0 +1,37 @@
+from log_writer import LogWriter
+
+
+def test_surrogate_line_is_escaped_not_dropped(tmp_path):
+    path = tmp_path / "requests.log"
+    indexed = []
+    writer = LogWriter(str(path), flush_interval=0.01, on_batch=lambda offset, lines: indexed.append((offset, lines))).start()
+
+    # A JSON login body can carry a lone surrogate ("\ud800") into a log line
+    writer.write("before")
+    writer.write("user \ud800 tried to log in")
+    writer.write("after")
+    writer.flush()
+    writer.close()
+
+    assert path.read_text(encoding="utf-8").splitlines() == ["before", "user \\ud800 tried to log in", "after"]
+    stats = writer.stats()
+    assert stats["written"] == 3
+    assert stats["dropped"] == 0
+    # The index sees exactly what was written
+    assert [line for _, lines in indexed for line in lines] == ["before", "user \\ud800 tried to log in", "after"]
+
+
+def test_failed_batch_counts_as_dropped(tmp_path, capsys):
+    writer = LogWriter(str(tmp_path / "requests.log"), flush_interval=0.01)
+
+    def broken_write(f, batch):
+        raise OSError("disk full")
+    writer.write_batch = broken_write
+    writer.start()
+    writer.write("one")
+    writer.write("two")
+    writer.flush()
+    writer.close()
+
+    assert writer.stats()["dropped"] == 2
+    assert "Error writing" in capsys.readouterr().err
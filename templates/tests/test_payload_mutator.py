@@ -0,0 +1,50 @@
+import random
+import urllib.parse
+
+from automated import SQLI_PAYLOADS, attack_source, export_corpus
+from payload_mutator import ENCODINGS, MUTATIONS, PayloadMutator, concatenate_strings, encode_literals
+
+
+def test_same_seed_gives_the_same_corpus():
+    first = list(PayloadMutator(SQLI_PAYLOADS, seed=5).stream(500))
+    assert list(PayloadMutator(SQLI_PAYLOADS, seed=5).stream(500)) == first
+    assert list(PayloadMutator(SQLI_PAYLOADS, seed=6).stream(500)) != first
+
+    # Any variant can be produced on its own, in any order
+    mutator = PayloadMutator(SQLI_PAYLOADS, seed=5)
+    assert [mutator.variant(index) for index in reversed(range(500))] == first[::-1]
+
+
+def test_variants_come_from_the_chosen_categories():
+    mutator = PayloadMutator(SQLI_PAYLOADS, seed=1, max_mutations=2, categories=["Union-Based SQLi", "Time-Based SQLi"])
+    for record in mutator.stream(1000):
+        assert record["category"] in ("Union-Based SQLi", "Time-Based SQLi")
+        assert record["base"] in SQLI_PAYLOADS[record["category"]]
+        mutations = record["mutations"]
+        # Encoding, if any, is always the last step
+        if mutations and mutations[-1] in ENCODINGS:
+            mutations = mutations[:-1]
+        assert len(mutations) <= 2 and all(name in MUTATIONS for name in mutations)
+        if not record["mutations"]:
+            assert record["payload"] == record["base"]
+
+
+def test_mutations_keep_the_sql_meaning():
+    rng = random.Random(0)
+    assert encode_literals("' or 'a'='a", random.Random(1)) in {"' or 0x61='a", "' or CHAR(97)='a"}
+    for _ in range(200):
+        spliced = concatenate_strings("admin'--", rng)
+        assert spliced.replace("'||'", "") == "admin'--"
+    payload = "' union select 'x' --"
+    assert urllib.parse.unquote(ENCODINGS["url_encode"](payload, rng)) == payload
+    assert urllib.parse.unquote(urllib.parse.unquote(ENCODINGS["double_url_encode"](payload, rng))) == payload
+
+
+def test_exported_corpus_replays_the_same_payloads(tmp_path):
+    path = str(tmp_path / "corpus.jsonl.gz")
+    assert export_corpus(path, 50, seed=3) == 50
+    replay = attack_source(corpus=path)
+    generated = attack_source(mutate=True, seed=3)
+    for index in range(60):
+        expected = generated(index % 50)
+        assert replay(index) == {"category": expected["category"], "payload": expected["payload"]}
@@ -0,0 +1,79 @@
+import pytest
+
+from rate_limiter import SlidingWindowLimiter
+from ttl_store import TTLStore
+
+
+class Clock:
+    def __init__(self, now=6000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def limiter_at(now):
+    clock = Clock(now)
+    return SlidingWindowLimiter(TTLStore(clock=clock)), clock
+
+
+def test_previous_window_is_weighted_by_its_overlap():
+    limiter, clock = limiter_at(6000.0)  # the start of a 60s window
+    limits = [(("ip", "a"), 10, 60)]
+    for _ in range(10):
+        assert limiter.hit(limits) is None
+    key, retry_after = limiter.hit(limits)
+    assert key == ("ip", "a")
+
+    # A quarter into the next window three quarters of the old count still weigh
+    clock.now += 75
+    assert limiter.count(("ip", "a"), 60) == pytest.approx(7.5)
+    for _ in range(2):
+        assert limiter.hit(limits) is None
+    assert limiter.hit(limits) is not None
+
+    # No burst of twice the limit across the boundary, and it all ages out after two windows
+    clock.now = 6000.0 + 120
+    assert limiter.count(("ip", "a"), 60) == pytest.approx(2)
+    clock.now = 6000.0 + 180
+    assert limiter.count(("ip", "a"), 60) == 0
+
+
+def test_retry_after_is_when_one_more_attempt_fits():
+    limiter, clock = limiter_at(6000.0)
+    limits = [(("user", "bob"), 4, 60)]
+    for _ in range(4):
+        limiter.hit(limits)
+    clock.now += 30
+    _, retry_after = limiter.hit(limits)
+    assert retry_after > 0
+
+    clock.now += retry_after - 0.01
+    assert limiter.hit(limits) is not None
+    clock.now += 0.02
+    assert limiter.hit(limits) is None
+
+
+def test_rejected_attempt_counts_against_no_limit():
+    limiter, _ = limiter_at(6000.0)
+    tight, loose = (("ip_user", "ip", "bob"), 1, 60), (("ip", "ip"), 100, 60)
+    assert limiter.hit([tight, loose]) is None
+    assert limiter.hit([tight, loose])[0] == tight[0]
+    assert limiter.count(loose[0], 60) == 1
+    assert limiter.stats()["allowed"] == 1 and limiter.stats()["rejected"] == {"ip_user": 1}
+
+
+def test_refund_and_reset():
+    limiter, _ = limiter_at(6000.0)
+    limits = [(("user", "bob"), 2, 60)]
+    limiter.hit(limits)
+    limiter.hit(limits)
+    limiter.refund(("user", "bob"), 60)
+    assert limiter.count(("user", "bob"), 60) == 1
+    assert limiter.hit(limits) is None
+
+    limiter.reset(("user", "bob"))
+    assert limiter.count(("user", "bob"), 60) == 0
+    # Refunding an empty window never goes negative
+    limiter.refund(("user", "bob"), 60)
+    assert limiter.count(("user", "bob"), 60) == 0
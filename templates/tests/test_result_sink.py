@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from result_sink import ResultSink, read_results
+
+RECORDS = [{"category": "Union", "payload": f"' union select {n}--", "status_code": 400, "response_time": 0.01 * n,
+            "detected": True, "response_content": {"message": "SQL Injection detected!"}} for n in range(5)]
+SUMMARY = {"record": "summary", "worker": 0, "latency": {"All": {"count": 5}}}
+
+
+@pytest.mark.parametrize("name", ["results.json", "results.jsonl", "results.json.gz", "results.jsonl.gz"])
+def test_every_format_round_trips(tmp_path, name):
+    path = str(tmp_path / name)
+    with ResultSink(path) as sink:
+        for record in RECORDS:
+            sink.write(record)
+        sink.write(SUMMARY)
+
+    assert read_results(path) == (RECORDS, [SUMMARY])
+    if name.endswith(".json"):
+        # Still one JSON array for readers of the old format
+        assert json.load(open(path)) == RECORDS + [SUMMARY]
+
+
+def test_compact_fields_drop_response_bodies_but_not_summaries(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    with ResultSink(path, fields="compact") as sink:
+        sink.write(RECORDS[0])
+        sink.write(SUMMARY)
+    records, summaries = read_results(path)
+    assert records == [{key: value for key, value in RECORDS[0].items() if key != "response_content"}]
+    assert summaries == [SUMMARY]
+
+    with pytest.raises(ValueError):
+        ResultSink(str(tmp_path / "other.jsonl"), fields="tiny")
+
+
+def test_interrupted_run_keeps_what_was_flushed(tmp_path):
+    path = str(tmp_path / "results.jsonl.gz")
+    sink = ResultSink(path, flush_interval=0)
+    for record in RECORDS:
+        sink.write(record)
+    # What a crash right now would leave behind: a gzip stream that was never finished
+    crashed = str(tmp_path / "crashed.jsonl.gz")
+    with open(path, "rb") as src, open(crashed, "wb") as dst:
+        dst.write(src.read())
+    sink.close()
+    assert read_results(crashed) == (RECORDS, [])
+
+    # ...or a plain file whose last line is cut short
+    cut = str(tmp_path / "cut.jsonl")
+    with open(cut, "w") as f:
+        f.write("".join(json.dumps(record) + "\n" for record in RECORDS) + '{"category": "Un')
+    assert read_results(cut) == (RECORDS, [])
@@ -0,0 +1,55 @@
+import json
+import os
+
+import pytest
+
+from settings_store import SettingsStore
+
+DEFAULTS = {"detection": {"max_input_length": 1024}, "patterns": ["a"]}
+
+
+def test_snapshot_is_immutable_and_as_dict_is_a_copy(tmp_path):
+    store = SettingsStore(str(tmp_path / "settings.json"), DEFAULTS)
+    snapshot = store.snapshot()
+    with pytest.raises(TypeError):
+        snapshot["detection"]["max_input_length"] = 1
+    assert snapshot["patterns"] == ("a",)
+
+    copy = store.as_dict()
+    copy["detection"]["max_input_length"] = 1
+    assert store.snapshot()["detection"]["max_input_length"] == 1024
+
+
+def test_save_replaces_the_file_atomically(tmp_path):
+    path = tmp_path / "settings.json"
+    path.write_text("{}")
+    os.chmod(path, 0o640)
+    store = SettingsStore(str(path), DEFAULTS)
+    old = store.snapshot()
+
+    store.save({"detection": {"max_input_length": 10}})
+    assert json.loads(path.read_text()) == {"detection": {"max_input_length": 10}}
+    assert os.stat(path).st_mode & 0o777 == 0o640
+    assert [p.name for p in tmp_path.iterdir()] == ["settings.json"]
+    # Snapshots already handed out are not touched
+    assert dict(old) == {}
+    assert store.snapshot()["detection"]["max_input_length"] == 10
+
+
+def test_change_by_another_process_is_reloaded_and_reported(tmp_path):
+    path = tmp_path / "settings.json"
+    seen = []
+    store = SettingsStore(str(path), DEFAULTS, check_interval=0, on_change=seen.append)
+    assert store.snapshot()["detection"]["max_input_length"] == 1024
+    store.snapshot()
+    assert len(seen) == 1
+
+    other = SettingsStore(str(path), DEFAULTS)
+    other.save({"detection": {"max_input_length": 77}})
+    assert store.snapshot()["detection"]["max_input_length"] == 77
+    assert [s["detection"]["max_input_length"] for s in seen] == [1024, 77]
+
+    # A broken write keeps the last good snapshot
+    path.write_text("{not json")
+    assert store.snapshot()["detection"]["max_input_length"] == 77
+    assert len(seen) == 2
@@ -0,0 +1,51 @@
+import detection
+from detection import ShadowStats, scan_input, shadow_match
+from sql_lexer import FINGERPRINTS, lexer_engine, tokenize
+
+
+def test_tokenize_keeps_comments_and_quotes_as_tokens():
+    assert tokenize("1 union/**/select 'a'") == [
+        ("number", "1"), ("keyword", "union"), ("comment", "/**/"), ("keyword", "select"),
+        ("quote", "'"), ("ident", "a"), ("quote", "'"),
+    ]
+
+
+def test_lexer_fingerprints():
+    expected = {
+        "1 union all select password from users": "union-select",
+        "1; drop table users": "stacked-query",
+        "1 and sleep(5)": "time-delay",
+        "waitfor delay '0:0:5'": "time-delay",
+        "1 or 2>1": "tautology",
+        "' or 1=1": "quote-logic",
+        "admin'--": "quote-comment",
+        "1 order by 3": "order-by",
+        "id=(select 1)": "subquery",
+        "select * from t": "select-from",
+        "char(65)": "dangerous-function",
+        "1 and @@version": "system-object",
+    }
+    for data, name in expected.items():
+        assert scan_input(data, lexer_engine) == name, data
+        assert name in FINGERPRINTS
+
+    for data in ("alice", "hello world", "o'brien", "john.smith@example.com", "Password1!", "order 66"):
+        assert scan_input(data, lexer_engine) is None, data
+
+
+def test_shadow_mode_counts_disagreements(monkeypatch):
+    stats = ShadowStats()
+    monkeypatch.setattr(detection, "shadow_stats", stats)
+
+    assert shadow_match("alice") is None
+    assert shadow_match("1 union select 1", primary="lexer") == "union-select"
+    # The regex rules flag any quote; the lexer wants SQL around it
+    assert shadow_match("o'brien", primary="lexer", field="password") is None
+
+    result = stats.stats()
+    assert result["inputs"] == 3
+    assert result["disagreements"] == 1
+    assert result["recent_disagreements"] == [
+        {"field": "password", "input": "[REDACTED]", "verdicts": {"regex": 50, "lexer": None}},
+    ]
+    assert result["latency"]["regex"]["calls"] == result["latency"]["lexer"]["calls"] == 3
@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from rate_limiter import SlidingWindowLimiter
+from state_backend import MemoryBackend, SQLiteBackend, make_backend
+from ttl_store import TTLStore
+
+
+def test_workers_share_sqlite_state(tmp_path):
+    path = str(tmp_path / "state.db")
+    first, second = SQLiteBackend(path, "0"), SQLiteBackend(path, "1")
+    assert first.owns_log and not second.owns_log
+
+    blocks = first.store("blocked_sessions", max_entries=100)
+    other_blocks = second.store("blocked_sessions", max_entries=100)
+    blocks.set("session", True, ttl=60)
+    assert "session" in other_blocks
+    assert other_blocks.increment(("ip", "a"), ttl=60) == 1
+    assert blocks.increment(("ip", "a"), ttl=60) == 2
+    # Namespaces don't see each other
+    assert "session" not in first.store("otp_store", max_entries=100)
+
+    blocks.set("expired", 1, ttl=-1)
+    assert blocks.get("expired") is None
+    assert other_blocks.pop("session") is True
+    assert "session" not in blocks
+
+
+def test_sqlite_store_is_capped(tmp_path):
+    store = SQLiteBackend(str(tmp_path / "state.db")).store("rate_limits", max_entries=10)
+    store.maintain_every = 5
+    for n in range(100):
+        store.set(n, n, ttl=1000 + n)
+    assert len(store) <= 10 + store.maintain_every
+    assert store.get(99) == 99
+    assert store.stats()["evicted"] >= 85
+
+
+def test_limiter_counts_across_workers(tmp_path):
+    path = str(tmp_path / "state.db")
+    limiters = [SlidingWindowLimiter(SQLiteBackend(path, worker).store("rate_limits", max_entries=100))
+                for worker in ("0", "1")]
+    limits = [(("ip", "a"), 3, 60)]
+    results = [limiters[n % 2].hit(limits) for n in range(4)]
+    assert results[:3] == [None, None, None]
+    assert results[3][0] == ("ip", "a")
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_event_bus_delivers_to_other_workers_in_order(tmp_path):
+    path = str(tmp_path / "state.db")
+    first, second = SQLiteBackend(path, "0"), SQLiteBackend(path, "1")
+    first.events.poll_interval = second.events.poll_interval = 0.01
+    received = {"0": [], "1": []}
+    first.events.start(received["0"].append)
+    second.events.start(received["1"].append)
+
+    for n in range(20):
+        first.events.publish({"n": n})
+    second.events.publish({"line": "from worker 1"})
+    first.events.flush()
+    second.events.flush()
+
+    wait_for(lambda: len(received["1"]) == 20 and len(received["0"]) == 1)
+    assert received["1"] == [{"n": n} for n in range(20)]
+    # A worker never hears its own messages
+    assert received["0"] == [{"line": "from worker 1"}]
+    assert first.events.stats()["published"] == 20 and second.events.stats()["received"] == 20
+
+
+def test_make_backend():
+    assert isinstance(make_backend("memory"), MemoryBackend)
+    assert isinstance(make_backend("memory").store("x", 10), TTLStore)
+    with pytest.raises(ValueError):
+        make_backend("redis://localhost")
@@ -0,0 +1,52 @@
+from ttl_store import TTLStore
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire():
+    clock = Clock()
+    store = TTLStore(clock=clock)
+    store.set("a", 1, ttl=10)
+    store.set("b", 2, ttl=20)
+    # Overwriting moves the expiry
+    store.set("a", 3, ttl=30)
+
+    clock.now += 25
+    assert store.get("a") == 3
+    assert "b" not in store
+    clock.now += 10
+    assert store.get("a", "gone") == "gone"
+    assert store.stats()["expired"] == 2 and len(store) == 0
+
+
+def test_increment_is_a_fixed_window_counter():
+    clock = Clock()
+    store = TTLStore(clock=clock)
+    assert store.increment("k", ttl=10) == 1
+    clock.now += 9
+    assert store.increment("k", ttl=10) == 2
+    clock.now += 1
+    assert store.increment("k", ttl=10) == 1
+
+
+def test_size_cap_evicts_the_entry_closest_to_expiring():
+    clock = Clock()
+    store = TTLStore(max_entries=3, clock=clock)
+    for n in range(1000):
+        store.set(("attacker", n), n, ttl=100 + n)
+    store.set("kept", True, ttl=5000)
+    assert len(store) == 3
+    assert store.get("kept") is True
+    assert store.get(("attacker", 999)) == 999
+    assert store.stats()["evicted"] == 998
+
+    # Overwrites of one key never pile up in the heap
+    for _ in range(10000):
+        store.set("kept", True, ttl=5000)
+    assert len(store.heap) <= 2 * len(store.entries) + 64
@@ -0,0 +1,70 @@
+from user_cache import BloomFilter, CachedUser, UserCache
+
+
+class Table:
+    """A users table the cache reads through, counting queries."""
+
+    def __init__(self, **users):
+        self.rows = {name: CachedUser(n, name, password) for n, (name, password) in enumerate(users.items(), 1)}
+        self.queries = 0
+
+    def load_user(self, username):
+        self.queries += 1
+        return self.rows.get(username)
+
+    def load_usernames(self):
+        return iter(self.rows)
+
+    def signature(self):
+        return len(self.rows), max((row.id for row in self.rows.values()), default=0)
+
+    def cache(self, **kwargs):
+        return UserCache(self.load_user, self.load_usernames, self.signature, **kwargs)
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, error_rate=0.01)
+    names = [f"user{n}" for n in range(1000)]
+    for name in names:
+        bloom.add(name)
+    assert all(name in bloom for name in names)
+    false_positives = sum(f"other{n}" in bloom for n in range(10000))
+    assert false_positives < 300
+
+
+def test_unknown_users_are_turned_away_without_a_query():
+    table = Table(alice="hash-a", bob="hash-b")
+    cache = table.cache()
+    for n in range(1000):
+        assert cache.lookup(f"nobody{n}") is None
+    assert table.queries < 50
+    assert cache.stats()["bloom_rejects"] > 950
+
+    assert cache.lookup("alice") == CachedUser(1, "alice", "hash-a")
+    assert cache.lookup("alice").password == "hash-a"
+    assert cache.stats()["hits"] == 1
+
+
+def test_invalidate_drops_changed_rows():
+    table = Table(alice="hash-a")
+    cache = table.cache()
+    cache.lookup("alice")
+    table.rows["alice"] = table.rows["alice"]._replace(password="rehashed")
+    # Same count and max id, so only an invalidation notices the new hash
+    assert cache.lookup("alice").password == "hash-a"
+    cache.invalidate("alice")
+    assert cache.lookup("alice").password == "rehashed"
+
+    table.rows["carol"] = CachedUser(2, "carol", "hash-c")
+    cache.invalidate("carol")
+    assert cache.lookup("carol").id == 2
+
+
+def test_signature_change_rebuilds_the_filter():
+    table = Table(alice="hash-a")
+    cache = table.cache(refresh_interval=0)
+    assert cache.lookup("dave") is None
+    # Added by another process, which this one never hears about directly
+    table.rows["dave"] = CachedUser(2, "dave", "hash-d")
+    assert cache.lookup("dave").id == 2
+    assert cache.stats()["rebuilds"] == 2
@@ -0,0 +1,127 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class TTLStore:
+    """Thread-safe dict whose entries expire, with a cap on how many it holds.
+
+    Expiry times sit in a min-heap, so each call first drops whatever has
+    expired in O(log n) per entry; overwritten entries leave stale heap items
+    that are skipped when they surface and compacted away when they pile up.
+    When `max_entries` is reached the entry closest to expiring is evicted to
+    make room, so an attacker cycling through keys can only churn the store,
+    never grow it.
+    """
+
+    def __init__(self, max_entries=100000, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        # Re-entrant so callers can hold `atomic()` across several calls
+        self.lock = threading.RLock()
+        self.entries = {}
+        self.heap = []
+        self.counter = itertools.count()
+        self.expired = 0
+        self.evicted = 0
+        self.hits = 0
+        self.misses = 0
+
+    def purge(self, now):
+        heap, entries = self.heap, self.entries
+        while heap and heap[0][0] <= now:
+            expires_at, _, key = heapq.heappop(heap)
+            entry = entries.get(key)
+            if entry is not None and entry[1] == expires_at:
+                del entries[key]
+                self.expired += 1
+
+    def make_room(self):
+        while len(self.entries) >= self.max_entries and self.heap:
+            expires_at, _, key = heapq.heappop(self.heap)
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] == expires_at:
+                del self.entries[key]
+                self.evicted += 1
+
+    def store(self, key, value, expires_at):
+        if key not in self.entries:
+            self.make_room()
+        self.entries[key] = (value, expires_at)
+        heapq.heappush(self.heap, (expires_at, next(self.counter), key))
+        # Overwrites leave stale heap items behind; rebuild once they dominate
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self.heap = [(expires_at, next(self.counter), key) for key, (_, expires_at) in self.entries.items()]
+            heapq.heapify(self.heap)
+
+    def atomic(self):
+        """Context manager that makes a sequence of calls one atomic step."""
+        return self.lock
+
+    def get(self, key, default=None):
+        with self.lock:
+            self.purge(self.clock())
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return entry[0]
+
+    def __contains__(self, key):
+        with self.lock:
+            self.purge(self.clock())
+            return key in self.entries
+
+    def __len__(self):
+        with self.lock:
+            self.purge(self.clock())
+            return len(self.entries)
+
+    def set(self, key, value, ttl):
+        """Stores `value` for `ttl` seconds, replacing any previous value and expiry."""
+        with self.lock:
+            now = self.clock()
+            self.purge(now)
+            self.store(key, value, now + ttl)
+
+    def increment(self, key, ttl, amount=1):
+        """Adds `amount` to a counter and returns it; a new counter lives for `ttl` seconds.
+
+        The expiry is fixed when the counter is created, which makes this a
+        fixed-window counter: it does not slide forward on every increment.
+        """
+        with self.lock:
+            now = self.clock()
+            self.purge(now)
+            entry = self.entries.get(key)
+            if entry is None:
+                self.store(key, amount, now + ttl)
+                return amount
+            value = entry[0] + amount
+            self.entries[key] = (value, entry[1])
+            return value
+
+    def pop(self, key, default=None):
+        with self.lock:
+            self.purge(self.clock())
+            entry = self.entries.pop(key, None)
+            return default if entry is None else entry[0]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.heap.clear()
+
+    def stats(self):
+        with self.lock:
+            self.purge(self.clock())
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,164 @@
+import hashlib
+import math
+import threading
+import time
+from collections import namedtuple
+
+from ttl_store import TTLStore
+
+# What login needs from a User row, detached from the SQLAlchemy session
+CachedUser = namedtuple("CachedUser", ["id", "username", "password"])
+
+
+class BloomFilter:
+    """Fixed-size set of strings with no false negatives.
+
+    Sized for `capacity` items at about `error_rate` false positives; adding
+    more than that raises the false-positive rate but never loses an item.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, item):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self.positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(item))
+
+
+class UserCache:
+    """Read-through cache in front of the user-by-username query.
+
+    A Bloom filter of every username answers most lookups for unknown users
+    without touching the database. Usernames that get past it are looked up
+    once and the result kept: known users (id and password hash) for `ttl`
+    seconds, unknown ones (Bloom false positives) for `negative_ttl`.
+
+    `load_user(username)` returns a row with id/username/password or None;
+    `load_usernames()` yields every username; `signature()` returns something
+    that changes when users are added or removed (e.g. count and max id). It
+    is checked at most every `refresh_interval` seconds and the filter is
+    rebuilt when it changes, which is how users added or removed by other
+    processes are noticed. It does not see a changed password hash, so every
+    write to a user row must reach `invalidate` in each process that caches
+    it (App.py publishes committed changes on the worker event bus).
+    """
+
+    def __init__(self, load_user, load_usernames, signature, max_entries=10000, ttl=300, negative_ttl=60,
+                 refresh_interval=30, error_rate=0.01):
+        self.load_user = load_user
+        self.load_usernames = load_usernames
+        self.signature = signature
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.refresh_interval = refresh_interval
+        self.error_rate = error_rate
+        self.users = TTLStore(max_entries=max_entries)
+        self.unknown = TTLStore(max_entries=max_entries)
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.current_signature = None
+        self.checked_at = 0.0
+        self.lookups = 0
+        self.bloom_rejects = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.db_lookups = 0
+        self.rebuilds = 0
+
+    def tally(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def refresh(self):
+        """Returns the Bloom filter, rebuilt first if the user table changed since the last check."""
+        with self.lock:
+            bloom = self.bloom
+            if bloom is not None and time.monotonic() - self.checked_at < self.refresh_interval:
+                return bloom
+            self.checked_at = time.monotonic()
+        signature = self.signature()
+        if bloom is not None and signature == self.current_signature:
+            return bloom
+
+        usernames = list(self.load_usernames())
+        # Leave headroom so new users don't push the false-positive rate up straight away
+        bloom = BloomFilter(max(1000, 2 * len(usernames)), self.error_rate)
+        for username in usernames:
+            bloom.add(username)
+        with self.lock:
+            self.bloom = bloom
+            self.current_signature = signature
+            self.rebuilds += 1
+        # Anything cached may predate the change
+        self.users.clear()
+        self.unknown.clear()
+        return bloom
+
+    def lookup(self, username):
+        """Returns a CachedUser for `username`, or None if there is no such user."""
+        bloom = self.refresh()
+        self.tally("lookups")
+        if username not in bloom:
+            self.tally("bloom_rejects")
+            return None
+
+        cached = self.users.get(username)
+        if cached is not None:
+            self.tally("hits")
+            return cached
+        if username in self.unknown:
+            self.tally("negative_hits")
+            return None
+
+        self.tally("db_lookups")
+        user = self.load_user(username)
+        if user is None:
+            self.unknown.set(username, True, self.negative_ttl)
+            return None
+        cached = CachedUser(user.id, user.username, user.password)
+        self.users.set(username, cached, self.ttl)
+        return cached
+
+    def invalidate(self, username):
+        """Forgets what is cached for `username` after it was created, changed or deleted."""
+        with self.lock:
+            if self.bloom is not None:
+                self.bloom.add(username)
+                if self.bloom.count > self.bloom.capacity:
+                    # Oversubscribed: rebuild at the next lookup
+                    self.bloom = None
+        self.users.pop(username)
+        self.unknown.pop(username)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.lookups
+            answered = self.bloom_rejects + self.hits + self.negative_hits
+            return {
+                "lookups": lookups,
+                "bloom_rejects": self.bloom_rejects,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "db_lookups": self.db_lookups,
+                "hit_rate": answered / lookups if lookups else 0.0,
+                "rebuilds": self.rebuilds,
+                "bloom_items": self.bloom.count if self.bloom else 0,
+                "bloom_capacity": self.bloom.capacity if self.bloom else 0,
+                "cached_users": len(self.users),
+                "cached_unknown": len(self.unknown),
+            }